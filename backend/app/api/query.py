@@ -1,10 +1,21 @@
+import json
 import logging
 from typing import AsyncGenerator
 import uuid
 from fastapi import APIRouter, HTTPException
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import StreamingResponse
 from app.models import QueryRequest, QueryResponse
 from app.graph import rag_graph
+from app.services import (
+    semantic_cache,
+    embedding_service,
+    llm_service,
+    reranker_service,
+    query_router,
+    context_assembler,
+    latency_model,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -18,10 +29,14 @@ async def query_documents(request: QueryRequest):
         rag_state = {
             "query": request.query,
             "top_k": request.top_k,
+            "retrieval_top_k": request.retrieval_top_k,
+            "max_query_variants": request.max_query_variants,
+            "latency_budget_ms": request.latency_budget_ms,
+            "filters": request.filters.model_dump(exclude_none=True) if request.filters else {},
             "use_reranker": request.use_reranker,
         }
 
-        result = rag_graph.invoke(rag_state)
+        result = await rag_graph.ainvoke(rag_state)
 
         response = QueryResponse(
             query_id=str(uuid.uuid4()),
@@ -30,7 +45,12 @@ async def query_documents(request: QueryRequest):
             citations=result.get("citations", []),
             num_contexts_retrieved=result.get("num_contexts_retrieved", 0),
             num_contexts_used=result.get("num_contexts_used", 0),
-            processing_time_ms=result.get("processing_time_ms", 0.0)
+            processing_time_ms=result.get("processing_time_ms", 0.0),
+            node_timings_ms=result.get("node_timings_ms", {}),
+            routing=result.get("routing", {}),
+            context=result.get("context_stats", {}),
+            retrieval=result.get("retrieval_plan", {}),
+            cache_hit=result.get("cache_hit", False)
         )
 
         logger.info(f"Query processed successfully in {response.processing_time_ms:.2f}ms")
@@ -41,34 +61,64 @@ async def query_documents(request: QueryRequest):
         raise HTTPException(status_code=500, detail=f"Query processing failed: {str(e)}")
 
 
+def _sse_frame(payload: dict) -> str:
+    return f"data: {json.dumps(jsonable_encoder(payload))}\n\n"
+
+
 @router.post("/query/stream")
 async def query_documents_stream(request: QueryRequest):
     try:
         logger.info(f"Processing streaming query: {request.query}")
+        query_id = str(uuid.uuid4())
 
         async def generate() -> AsyncGenerator[str, None]:
             rag_state = {
                 "query": request.query,
                 "top_k": request.top_k,
+                "retrieval_top_k": request.retrieval_top_k,
+                "max_query_variants": request.max_query_variants,
+                "latency_budget_ms": request.latency_budget_ms,
+                "filters": request.filters.model_dump(exclude_none=True) if request.filters else {},
                 "use_reranker": request.use_reranker,
             }
 
-            result = rag_graph.invoke(rag_state)
-
-            yield f"data: {{'query_id': '{result.get('query_id', '')}', 'citations': {result.get('citations', [])}}}\n\n"
-
-            for chunk in result.get("response", "").split(" "):
-                yield f"data: {{'content': '{chunk} '}}\n\n"
-
-            yield f"data: {{'done': true, 'processing_time_ms': {result.get('processing_time_ms', 0.0)}}}\n\n"
-
-        return StreamingResponse(generate(), media_type="text/event-stream")
+            try:
+                async for event in rag_graph.astream(rag_state):
+                    if "citations" in event:
+                        event = {"query_id": query_id, **event}
+                    yield _sse_frame(event)
+            except Exception as e:
+                logger.error(f"Streaming query processing failed: {e}")
+                yield _sse_frame({"error": f"Query processing failed: {str(e)}"})
+                yield _sse_frame({"done": True})
+
+        return StreamingResponse(
+            generate(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
 
     except Exception as e:
         logger.error(f"Streaming query processing failed: {e}")
         raise HTTPException(status_code=500, detail=f"Query processing failed: {str(e)}")
 
 
+@router.get("/cache/stats")
+async def cache_stats():
+    return {
+        "semantic_cache": semantic_cache.get_stats(),
+        "query_embeddings": embedding_service.query_cache.get_stats(),
+        "query_rewrites": llm_service.rewrite_cache.get_stats(),
+        "llm": llm_service.get_stats(),
+        "query_router": query_router.get_stats(),
+        "context_assembly": context_assembler.get_stats(),
+        "latency_model": latency_model.get_stats(),
+        "query_embedding_batcher": embedding_service.get_batcher_stats(),
+        "embedding_store": embedding_service.get_store_stats(),
+        "reranker": reranker_service.get_stats()
+    }
+
+
 @router.get("/health")
 async def health_check():
     return {
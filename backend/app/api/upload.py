@@ -1,116 +1,158 @@
+import asyncio
+import hashlib
 import logging
 import uuid
+from datetime import datetime, timezone
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from app.models import UploadResponse, DocumentListResponse, DocumentMetadata, DocumentDeleteResponse
 from app.services import (
-    ocr_service,
-    chunking_service,
-    embedding_service,
     vector_store_service,
+    lexical_index_service,
+    semantic_cache,
+    ingestion_service,
+    document_manifest,
 )
+from app.services.ingestion import IngestionQueueFull
 from app.core import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-document_registry = {}
 
-
-def process_document(file_path: str, document_id: str, filename: str):
-    try:
-        logger.info(f"Processing document: {filename}")
-
-        ocr_result = ocr_service.process_document(file_path, filename)
-        if not ocr_result["success"]:
-            logger.error(f"OCR failed for {filename}: {ocr_result.get('error')}")
-            return
-
-        text = ocr_result["text"]
-
-        chunks = chunking_service.chunk_text(text, document_id)
-
-        chunk_texts = [chunk["text"] for chunk in chunks]
-        embeddings = embedding_service.embed_texts(chunk_texts)
-
-        metadata_list = []
-        chunk_ids = []
-        for chunk in chunks:
-            chunk_id = str(uuid.uuid4())
-            chunk_ids.append(chunk_id)
-            metadata_list.append({
-                "chunk_id": chunk_id,
-                "document_id": document_id,
-                "filename": filename,
-                "chunk_index": chunk["chunk_index"],
-                "page_number": chunk.get("page_number"),
-                "token_count": chunk["token_count"]
-            })
-
-        vector_store_service.add_documents(
-            chunk_texts=chunk_texts,
-            embeddings=embeddings.tolist(),
-            metadatas=metadata_list,
-            ids=chunk_ids
-        )
-
-        document_registry[document_id] = {
-            "filename": filename,
-            "file_type": Path(filename).suffix,
-            "file_size": Path(file_path).stat().st_size,
-            "num_chunks": len(chunks)
-        }
-
-        logger.info(f"Successfully processed {filename}, created {len(chunks)} chunks")
-        Path(file_path).unlink()
-
-    except Exception as e:
-        logger.error(f"Failed to process document {filename}: {e}")
-        if Path(file_path).exists():
-            Path(file_path).unlink()
+def _queue_full_error() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Ingestion queue is full, retry later",
+        headers={"Retry-After": str(settings.INGESTION_RETRY_AFTER_SECONDS)}
+    )
 
 
 @router.post("/upload", response_model=UploadResponse)
-async def upload_document(file: UploadFile = File(...), background_tasks: BackgroundTasks = None):
+async def upload_document(
+    file: UploadFile = File(...),
+    tenant: str = Form(settings.DEFAULT_TENANT),
+    document_id: Optional[str] = Form(None),
+    overwrite: bool = Form(False)
+):
     try:
-        document_id = str(uuid.uuid4())
         filename = file.filename
+        contents = await file.read()
+        file_hash = hashlib.sha256(contents).hexdigest()
+
+        if document_id:
+            existing = await asyncio.to_thread(document_manifest.get_document, document_id)
+            if not existing or existing["tenant"] != tenant:
+                raise HTTPException(status_code=404, detail=f"Document {document_id} not found")
+        else:
+            existing = await asyncio.to_thread(document_manifest.find_by_filename, filename, tenant)
+        if existing and existing["status"] == "processing":
+            raise HTTPException(
+                status_code=409,
+                detail=f"Document '{filename}' is still being processed"
+            )
+        if existing and existing["status"] == "completed" and existing["file_hash"] == file_hash:
+            return UploadResponse(
+                document_id=existing["document_id"],
+                filename=filename,
+                status="unchanged",
+                num_chunks=existing["num_chunks"],
+                message=f"Document '{filename}' is already indexed and unchanged"
+            )
+
+        duplicate = await asyncio.to_thread(document_manifest.find_by_hash, file_hash, tenant)
+        if duplicate:
+            return UploadResponse(
+                document_id=duplicate["document_id"],
+                filename=filename,
+                status="duplicate",
+                num_chunks=duplicate["num_chunks"],
+                message=f"Document '{filename}' has the same content as '{duplicate['filename']}'"
+            )
+
+        if existing and not document_id and not overwrite:
+            raise HTTPException(
+                status_code=409,
+                detail=(
+                    f"A different file named '{filename}' is already indexed as document {existing['document_id']}; "
+                    "upload it with overwrite=true or that document_id to replace it"
+                )
+            )
+
+        if ingestion_service.is_full():
+            raise _queue_full_error()
+
+        document_id = existing["document_id"] if existing else str(uuid.uuid4())
+        claimed = await asyncio.to_thread(
+            document_manifest.claim_document,
+            document_id,
+            filename,
+            Path(filename).suffix,
+            len(contents),
+            tenant,
+            existing["upload_time"] if existing else None
+        )
+        if not claimed:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Document '{filename}' is being uploaded by another request"
+            )
 
         settings.UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
         file_path = settings.UPLOADS_DIR / document_id
 
-        with open(file_path, "wb") as f:
-            contents = await file.read()
-            f.write(contents)
-
-        if background_tasks:
-            background_tasks.add_task(process_document, str(file_path), document_id, filename)
+        try:
+            with open(file_path, "wb") as f:
+                f.write(contents)
+            ingestion_service.submit(str(file_path), document_id, filename, file_hash, tenant)
+        except IngestionQueueFull:
+            await asyncio.to_thread(
+                document_manifest.finish_document, document_id, "failed", None, "Ingestion queue is full"
+            )
+            file_path.unlink(missing_ok=True)
+            raise _queue_full_error()
+        except Exception as e:
+            await asyncio.to_thread(document_manifest.finish_document, document_id, "failed", None, str(e))
+            file_path.unlink(missing_ok=True)
+            raise
 
         return UploadResponse(
             document_id=document_id,
             filename=filename,
             status="processing",
-            num_chunks=0,
+            num_chunks=existing["num_chunks"] if existing else 0,
             message=f"Document '{filename}' uploaded and is being processed"
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Upload failed: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
+@router.get("/ingestion/stats")
+async def ingestion_stats():
+    return {**ingestion_service.get_stats(), "vector_store": vector_store_service.get_collection_stats()}
+
+
 @router.get("/documents", response_model=DocumentListResponse)
-async def list_documents():
+async def list_documents(tenant: Optional[str] = None):
     try:
         documents = []
-        for doc_id, doc_info in document_registry.items():
+        for doc_info in await asyncio.to_thread(document_manifest.list_documents, tenant):
             documents.append(
                 DocumentMetadata(
-                    id=doc_id,
+                    id=doc_info["document_id"],
                     filename=doc_info["filename"],
                     file_type=doc_info["file_type"],
                     file_size=doc_info["file_size"],
-                    num_chunks=doc_info["num_chunks"]
+                    upload_time=datetime.fromtimestamp(doc_info["upload_time"], timezone.utc),
+                    num_chunks=doc_info["num_chunks"],
+                    num_pages=doc_info["num_pages"],
+                    status=doc_info["status"],
+                    tenant=doc_info["tenant"]
                 )
             )
 
@@ -126,12 +168,17 @@ async def list_documents():
 @router.delete("/documents/{document_id}", response_model=DocumentDeleteResponse)
 async def delete_document(document_id: str):
     try:
-        if document_id not in document_registry:
+        document = await asyncio.to_thread(document_manifest.get_document, document_id)
+        if not document:
             raise HTTPException(status_code=404, detail=f"Document {document_id} not found")
+        if document["status"] == "processing":
+            raise HTTPException(status_code=409, detail=f"Document {document_id} is still being processed")
 
-        vector_store_service.delete_document(document_id)
+        await asyncio.to_thread(vector_store_service.delete_document, document_id, document["tenant"])
+        await asyncio.to_thread(lexical_index_service.delete_document, document_id)
+        semantic_cache.invalidate(f"deleted document {document_id}")
 
-        del document_registry[document_id]
+        await asyncio.to_thread(document_manifest.delete_document, document_id)
 
         return DocumentDeleteResponse(
             document_id=document_id,
@@ -1,3 +1,4 @@
 from .config import settings, Settings
+from .concurrency import model_executor, run_in_model_executor
 
-__all__ = ["settings", "Settings"]
+__all__ = ["settings", "Settings", "model_executor", "run_in_model_executor"]
@@ -0,0 +1,25 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+model_executor = ThreadPoolExecutor(
+    max_workers=settings.MODEL_EXECUTOR_WORKERS,
+    thread_name_prefix="model-worker"
+)
+
+
+async def run_in_model_executor(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        model_executor,
+        functools.partial(func, *args, **kwargs)
+    )
+
+
+def shutdown_model_executor():
+    logger.info("Shutting down model executor")
+    model_executor.shutdown(wait=False, cancel_futures=True)
@@ -10,21 +10,136 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL_QUERY_REWRITER: str = "gpt-4o-mini"
     OPENAI_MODEL_GENERATOR: str = "gpt-4o-mini"
+    OPENAI_BASE_URL: str = ""
+
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_MAX_CONNECTIONS: int = 32
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 16
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_REWRITE_TIMEOUT_SECONDS: float = 10.0
+    LLM_GENERATE_TIMEOUT_SECONDS: float = 60.0
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    LLM_REWRITE_HEDGING_ENABLED: bool = False
+    LLM_HEDGE_MIN_DELAY_MS: float = 250.0
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_WINDOW: int = 200
+
+    QUERY_ROUTER_ENABLED: bool = True
+    QUERY_ROUTER_SIMPLE_THRESHOLD: float = 0.25
+    QUERY_ROUTER_COMPLEX_THRESHOLD: float = 0.85
+    QUERY_ROUTER_MIN_SAMPLES: int = 200
+    QUERY_ROUTER_LEARNING_RATE: float = 0.05
+    QUERY_ROUTER_L2: float = 0.0001
+    QUERY_ROUTER_SAVE_EVERY: int = 20
+    QUERY_ROUTER_EXPLORATION_RATE: float = 0.05
 
     DATABASE_PATH: Path = Path("./data/chroma")
     UPLOADS_DIR: Path = Path("./data/uploads")
     MODELS_CACHE_DIR: Path = Path("./data/models")
+    LEXICAL_INDEX_PATH: Path = Path("./data/lexical")
+    VECTOR_INDEX_PATH: Path = Path("./data/vector_index")
+    DOCUMENT_MANIFEST_PATH: Path = Path("./data/manifest/manifest.db")
 
     EMBEDDING_MODEL: str = "ibm-granite/granite-embedding-30m-english"
     RERANKER_MODEL: str = "ibm-granite/granite-embedding-reranker-english-r2"
     OCR_MODEL: str = "deepseek-ai/DeepSeek-OCR"
+    OCR_BACKEND: str = "auto"
+    OCR_RENDER_DPI: int = 200
+    OCR_RENDER_THREADS: int = 2
+    OCR_BATCH_SIZE: int = 4
+    OCR_TESSERACT_LANG: str = "eng"
+    OCR_TESSERACT_THREADS: int = 2
 
     CHUNK_SIZE: int = 450
     CHUNK_OVERLAP: int = 75
+
+    TEXT_LAYER_ENABLED: bool = True
+    TEXT_LAYER_MIN_CHARS: int = 50
+    TEXT_LAYER_MAX_GARBAGE_RATIO: float = 0.1
+    TEXT_LAYER_MIN_ALNUM_RATIO: float = 0.5
+    TEXT_LAYER_MAX_AVG_WORD_LENGTH: float = 20.0
+
+    INGESTION_PAGES_PER_RENDER: int = 2
+    INGESTION_QUEUE_SIZE: int = 4
+    INGESTION_FLUSH_CHUNKS: int = 256
+    INGESTION_OCR_WORKERS: int = 1
+    INGESTION_CHUNK_WORKERS: int = 2
+    INGESTION_MAX_ACTIVE_DOCUMENTS: int = 4
+    INGESTION_MAX_QUEUED_JOBS: int = 32
+    INGESTION_EMBED_BATCH_SIZE: int = 128
+    INGESTION_WORKER_NICENESS: int = 10
+    INGESTION_RETRY_AFTER_SECONDS: int = 30
+    VECTOR_STORE_ENGINE: str = "chroma"
+    VECTOR_STORE_WRITE_BATCH_SIZE: int = 4096
+    VECTOR_STORE_PARTITION_BY: str = "none"
+    VECTOR_INDEX_COMPACT_THRESHOLD: int = 50000
+    VECTOR_INDEX_HNSW_M: int = 32
+    VECTOR_INDEX_HNSW_EF_CONSTRUCTION: int = 100
+    VECTOR_INDEX_HNSW_EF_SEARCH: int = 128
+    VECTOR_INDEX_EXACT_SEARCH_MAX_ROWS: int = 20000
+    VECTOR_INDEX_CODEC: str = "float16"
+    VECTOR_INDEX_PQ_SUBVECTORS: int = 48
+    VECTOR_INDEX_RESCORE_FACTOR: int = 4
+    DEFAULT_TENANT: str = "default"
     RETRIEVAL_TOP_K: int = 100
+    RETRIEVAL_MAX_TOP_K: int = 500
     RERANK_TOP_K: int = 10
+    RERANK_MAX_TOP_K: int = 50
+    QUERY_MAX_VARIANTS: int = 5
+    LATENCY_BUDGET_RESERVE_MS: float = 50.0
+    RRF_K: int = 60
+
+    CONTEXT_ASSEMBLY_ENABLED: bool = True
+    CONTEXT_TOKEN_BUDGET: int = 2000
+    CONTEXT_MIN_TRUNCATED_TOKENS: int = 64
+    CONTEXT_MERGE_ADJACENT: bool = True
+    CONTEXT_DEDUP_ENABLED: bool = True
+    CONTEXT_DEDUP_THRESHOLD: float = 0.95
+    CONTEXT_SENTENCE_SELECTION_ENABLED: bool = False
+    CONTEXT_SENTENCE_MIN_SIMILARITY: float = 0.3
+
+    HYBRID_SEARCH_ENABLED: bool = True
+    LEXICAL_TOP_K: int = 50
+    HYBRID_LEXICAL_WEIGHT: float = 1.0
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+    LEXICAL_INDEX_COMPACT_THRESHOLD: int = 5000
+
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1000
+
+    QUERY_CACHE_MAX_ENTRIES: int = 10000
+    QUERY_CACHE_TTL_SECONDS: int = 86400
+    QUERY_CACHE_PERSIST: bool = False
+    QUERY_CACHE_DISK_MAX_ENTRIES: int = 100000
 
     DEVICE: str = "cuda"
+    INFERENCE_BACKEND: str = "torch"
+    ONNX_QUANTIZATION_CONFIG: str = "avx2"
+
+    MODEL_EXECUTOR_WORKERS: int = 4
+
+    EMBEDDING_MICROBATCH_ENABLED: bool = True
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0
+    EMBEDDING_MAX_BATCH_SIZE: int = 32
+
+    EMBEDDING_STORE_ENABLED: bool = True
+    EMBEDDING_STORE_DTYPE: str = "float16"
+    EMBEDDING_STORE_MAX_ENTRIES: int = 5000000
+
+    RERANK_BATCH_SIZE: int = 32
+    RERANK_MICROBATCH_ENABLED: bool = True
+    RERANK_BATCH_WINDOW_MS: float = 2.0
+    RERANK_MAX_BATCH_PAIRS: int = 256
+    RERANK_SCORE_CACHE_MAX_ENTRIES: int = 50000
+    RERANK_SCORE_CACHE_TTL_SECONDS: int = 3600
+    RERANK_CASCADE_ENABLED: bool = False
+    RERANK_CASCADE_CANDIDATES: int = 30
+    RERANK_CASCADE_LEXICAL_WEIGHT: float = 1.0
 
     CORS_ORIGINS: list = [
         "http://localhost:3000",
@@ -43,6 +158,7 @@ class Settings(BaseSettings):
         self.DATABASE_PATH.mkdir(parents=True, exist_ok=True)
         self.UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
         self.MODELS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        self.LEXICAL_INDEX_PATH.mkdir(parents=True, exist_ok=True)
 
 
 settings = Settings()
@@ -1,42 +1,97 @@
+import asyncio
 import logging
+import random
 import time
-from typing import Any, Dict, List
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, TypedDict
 from langgraph.graph import StateGraph, END
 from app.services import (
     llm_service,
     embedding_service,
     reranker_service,
     vector_store_service,
+    lexical_index_service,
+    reciprocal_rank_fusion,
+    semantic_cache,
+    query_router,
+    context_assembler,
+    latency_model,
+    document_manifest,
 )
+from app.services.latency_budget import LatencyBudget
 from app.models import Citation
 from app.core import settings
 
 logger = logging.getLogger(__name__)
 
-
-class RAGState(Dict[str, Any]):
-    pass
+NO_DOCUMENTS_RESPONSE = "I couldn't find any relevant documents to answer your question."
+DOCUMENT_FILTERS = ("document_ids", "filenames", "tenant", "uploaded_after", "uploaded_before")
+
+
+class RAGState(TypedDict, total=False):
+    query: str
+    top_k: Optional[int]
+    retrieval_top_k: Optional[int]
+    max_query_variants: Optional[int]
+    latency_budget_ms: Optional[float]
+    use_reranker: bool
+    filters: Dict[str, Any]
+    search_scope: Dict[str, Any]
+    request_start_time: float
+    retrieval_plan: Dict[str, Any]
+    query_embedding: Any
+    cache_hit: bool
+    classification_start_time: float
+    should_rewrite: bool
+    original_query: str
+    rewrite_result: Dict[str, Any]
+    num_rewriter_calls: int
+    routing: Dict[str, Any]
+    query_variants: List[str]
+    num_query_variants: int
+    all_retrieved_documents: List[Dict]
+    num_contexts_retrieved: int
+    final_documents: List[Dict]
+    context_documents: List[Dict]
+    context_stats: Dict[str, Any]
+    num_contexts_used: int
+    response: str
+    citations: List[Citation]
+    node_timings_ms: Dict[str, float]
+    processing_time_ms: float
 
 
 class RAGGraph:
     def __init__(self):
         self.graph = self._build_graph()
         self.compiled_graph = self.graph.compile()
+        self.compiled_retrieval_graph = self._build_graph(with_generation=False).compile()
+        self._label_tasks = set()
 
-    def _build_graph(self) -> StateGraph:
+    def _build_graph(self, with_generation: bool = True) -> StateGraph:
         workflow = StateGraph(RAGState)
 
-        workflow.add_node("classify_query", self.classify_query)
-        workflow.add_node("classify_and_rewrite", self.classify_and_rewrite)
-        workflow.add_node("rewrite_query", self.rewrite_query)
-        workflow.add_node("retrieve_single", self.retrieve_single)
-        workflow.add_node("retrieve_parallel", self.retrieve_parallel)
-        workflow.add_node("rerank", self.rerank)
-        workflow.add_node("generate", self.generate)
+        workflow.add_node("classify_query", self._timed("classify_query", self.classify_query))
+        workflow.add_node("classify_and_rewrite", self._timed("classify_and_rewrite", self.classify_and_rewrite))
+        workflow.add_node("rewrite_query", self._timed("rewrite_query", self.rewrite_query))
+        workflow.add_node("retrieve_single", self._timed("retrieve_single", self.retrieve_single))
+        workflow.add_node("retrieve_parallel", self._timed("retrieve_parallel", self.retrieve_parallel))
+        workflow.add_node("rerank", self._timed("rerank", self.rerank))
+        workflow.add_node("assemble_context", self._timed("assemble_context", self.assemble_context))
+        if with_generation:
+            workflow.add_node("generate", self._timed("generate", self.generate))
 
         workflow.set_entry_point("classify_query")
 
-        workflow.add_edge("classify_query", "classify_and_rewrite")
+        workflow.add_conditional_edges(
+            "classify_query",
+            self.route_query,
+            {
+                "direct": "retrieve_single",
+                "rewrite": "rewrite_query",
+                "llm": "classify_and_rewrite",
+            }
+        )
 
         workflow.add_conditional_edges(
             "classify_and_rewrite",
@@ -58,28 +113,109 @@ class RAGGraph:
 
         workflow.add_edge("retrieve_single", "rerank")
         workflow.add_edge("retrieve_parallel", "rerank")
-        workflow.add_edge("rerank", "generate")
-        workflow.add_edge("generate", END)
+        workflow.add_edge("rerank", "assemble_context")
+        if with_generation:
+            workflow.add_edge("assemble_context", "generate")
+            workflow.add_edge("generate", END)
+        else:
+            workflow.add_edge("assemble_context", END)
 
         return workflow
 
-    def classify_query(self, state: RAGState) -> RAGState:
+    def _timed(self, name: str, node):
+        async def timed_node(state: RAGState) -> RAGState:
+            start = time.perf_counter()
+            state = await node(state)
+            timings = state.setdefault("node_timings_ms", {})
+            timings[name] = timings.get(name, 0.0) + (time.perf_counter() - start) * 1000
+            return state
+
+        return timed_node
+
+    async def _call_rewriter(self, state: RAGState, query: str) -> dict:
+        state["num_rewriter_calls"] = state.get("num_rewriter_calls", 0) + 1
+        start = time.perf_counter()
+        rewrite_result = await llm_service.rewrite_query(query) or {}
+        if not rewrite_result.get("failed") and not rewrite_result.get("cached"):
+            latency_model.observe("rewrite", (time.perf_counter() - start) * 1000)
+        self._observe_route(query, state.get("query_embedding"), rewrite_result)
+        return rewrite_result
+
+    @staticmethod
+    def _observe_route(query: str, query_embedding, rewrite_result: dict):
+        if settings.QUERY_ROUTER_ENABLED and not rewrite_result.get("failed") and not rewrite_result.get("cached"):
+            query_router.observe(query, query_embedding, bool(rewrite_result.get("should_rewrite")))
+
+    async def _label_direct_query(self, query: str, query_embedding):
+        try:
+            self._observe_route(query, query_embedding, await llm_service.rewrite_query(query) or {})
+        except Exception as e:
+            logger.debug(f"Router label sampling failed: {e}")
+
+    def _sample_direct_query(self, query: str, query_embedding):
+        if query_embedding is None or random.random() >= settings.QUERY_ROUTER_EXPLORATION_RATE:
+            return
+        task = asyncio.create_task(self._label_direct_query(query, query_embedding))
+        self._label_tasks.add(task)
+        task.add_done_callback(self._label_tasks.discard)
+
+    async def classify_query(self, state: RAGState) -> RAGState:
         logger.info("Classifying query...")
         state["classification_start_time"] = time.time()
+
+        if not settings.QUERY_ROUTER_ENABLED:
+            state["routing"] = {"route": "llm", "source": "disabled"}
+            return self._apply_rewrite_budget(state)
+
+        query = state.get("query", "")
+        if state.get("query_embedding") is None:
+            try:
+                state["query_embedding"] = await embedding_service.aembed_query(query)
+            except Exception as e:
+                logger.warning(f"Query embedding for routing failed: {e}")
+
+        routing = query_router.route(query, state.get("query_embedding"))
+        if routing["route"] == "direct":
+            self._sample_direct_query(query, state.get("query_embedding"))
+        saved_ms = llm_service.rewrite_latency_ms() if routing["route"] == "direct" else None
+        routing["rewriter_skipped"] = routing["route"] == "direct"
+        routing["estimated_latency_saved_ms"] = saved_ms or 0.0
+        state["routing"] = routing
+        logger.info(
+            f"Routed query to {routing['route']} (p_complex={routing['p_complex']:.2f}, {routing['source']})"
+        )
+        return self._apply_rewrite_budget(state)
+
+    def _apply_rewrite_budget(self, state: RAGState) -> RAGState:
+        budget = self._budget(state)
+        routing = state["routing"]
+        plan = state["retrieval_plan"]
+        if not budget.enabled or routing["route"] == "direct":
+            return state
+
+        if not latency_model.can_afford_rewrite(budget.remaining_ms(), plan["rerank_top_k"]):
+            logger.info(f"Skipping query rewriting to stay within {budget.budget_ms:.0f}ms latency budget")
+            routing["route"] = "direct"
+            routing["rewriter_skipped"] = True
+            plan["rewriter_skipped_for_budget"] = True
+            plan["degraded"] = True
         return state
 
-    def classify_and_rewrite(self, state: RAGState) -> RAGState:
+    def route_query(self, state: RAGState) -> str:
+        return state.get("routing", {}).get("route", "llm")
+
+    async def classify_and_rewrite(self, state: RAGState) -> RAGState:
         query = state.get("query", "")
         logger.debug(f"Deciding if query needs rewriting: '{query}'")
 
         try:
-            rewrite_result = llm_service.rewrite_query(query)
-            if rewrite_result is None:
-                rewrite_result = {}
+            rewrite_result = await self._call_rewriter(state, query)
         except Exception as e:
             logger.warning(f"Query rewriting failed: {e}")
             rewrite_result = {"should_rewrite": False}
 
+        state["rewrite_result"] = rewrite_result
+
         if rewrite_result.get("should_rewrite", False):
             state["should_rewrite"] = True
             state["original_query"] = query
@@ -96,20 +232,37 @@ class RAGGraph:
         else:
             return "direct"
 
-    def rewrite_query(self, state: RAGState) -> RAGState:
+    async def rewrite_query(self, state: RAGState) -> RAGState:
         logger.info("Rewriting query...")
         query = state.get("original_query", state.get("query", ""))
 
-        rewrite_result = llm_service.rewrite_query(query)
-        rewritten_queries = rewrite_result.get("rewritten_queries", [])
+        rewrite_result = state.get("rewrite_result")
+        if rewrite_result is None:
+            rewrite_result = await self._call_rewriter(state, query)
+        else:
+            logger.debug("Reusing rewrite result from classification")
+        plan = state["retrieval_plan"]
+        rewritten_queries = (rewrite_result.get("rewritten_queries") or [])[:plan["max_query_variants"]]
+
+        budget = self._budget(state)
+        if budget.enabled and len(rewritten_queries) > 1:
+            affordable = latency_model.affordable_variants(
+                budget.remaining_ms(), len(rewritten_queries), plan["rerank_top_k"]
+            )
+            if affordable < len(rewritten_queries):
+                logger.info(f"Keeping {affordable} of {len(rewritten_queries)} query variants for latency budget")
+                plan["variants_dropped_for_budget"] = len(rewritten_queries) - affordable
+                plan["degraded"] = True
+                rewritten_queries = rewritten_queries[:affordable]
 
-        if rewritten_queries:
+        if len(rewritten_queries) > 1:
             state["query_variants"] = rewritten_queries
             state["num_query_variants"] = len(rewritten_queries)
             logger.info(f"Generated {len(rewritten_queries)} query variants")
         else:
             state["query_variants"] = [query]
             state["num_query_variants"] = 1
+        plan["query_variants_used"] = state["num_query_variants"]
 
         return state
 
@@ -123,79 +276,155 @@ class RAGGraph:
             logger.info("Using single retrieval")
             return "single"
 
-    def retrieve_single(self, state: RAGState) -> RAGState:
+    async def _lexical_search(self, queries: List[str], top_k: int, scope: Dict) -> List[List[Dict]]:
+        if not settings.HYBRID_SEARCH_ENABLED:
+            return []
+
+        try:
+            hit_lists = await asyncio.to_thread(
+                lexical_index_service.search_batch,
+                queries,
+                top_k=min(settings.LEXICAL_TOP_K, top_k),
+                document_ids=scope.get("lexical_document_ids")
+            )
+            chunk_ids = list(dict.fromkeys(chunk_id for hits in hit_lists for chunk_id, _ in hits))
+            docs = await asyncio.to_thread(vector_store_service.get_by_ids, chunk_ids, scope)
+            docs_by_id = {doc["metadata"].get("chunk_id"): doc for doc in docs}
+
+            result_lists = []
+            for hits in hit_lists:
+                results = []
+                for chunk_id, score in hits:
+                    if chunk_id in docs_by_id:
+                        results.append({**docs_by_id[chunk_id], "lexical_score": score})
+                result_lists.append(results)
+
+            logger.debug(f"Lexical search returned {sum(len(r) for r in result_lists)} results")
+            return result_lists
+        except Exception as e:
+            logger.warning(f"Lexical search failed: {e}, using dense results only")
+            return []
+
+    def _fuse_hybrid(self, dense_lists: List[List[Dict]], lexical_lists: List[List[Dict]]) -> List[Dict]:
+        weights = [1.0] * len(dense_lists) + [settings.HYBRID_LEXICAL_WEIGHT] * len(lexical_lists)
+        return reciprocal_rank_fusion(dense_lists + lexical_lists, k=settings.RRF_K, weights=weights)
+
+    def _retrieval_top_k(self, state: RAGState, num_queries: int) -> int:
+        plan = state["retrieval_plan"]
+        top_k = plan["retrieval_top_k"]
+        budget = self._budget(state)
+        if budget.enabled and state.get("use_reranker", True):
+            affordable = latency_model.affordable_candidates(budget.remaining_ms(), num_queries)
+            top_k = min(top_k, max(affordable, plan["rerank_top_k"]))
+            if top_k < plan["retrieval_top_k"]:
+                logger.info(f"Retrieving {top_k} candidates per query for latency budget")
+                plan["degraded"] = True
+        plan["retrieval_top_k_used"] = top_k
+        return top_k
+
+    async def retrieve_single(self, state: RAGState) -> RAGState:
         logger.info("Performing single retrieval...")
         query = state.get("query", "")
+        top_k = self._retrieval_top_k(state, 1)
+        scope = state.get("search_scope", {})
+        lexical_task = asyncio.ensure_future(self._lexical_search([query], top_k, scope))
 
         try:
-            query_embedding = embedding_service.embed_query(query)
+            query_embedding = state.get("query_embedding")
+            if query_embedding is None:
+                query_embedding = await embedding_service.aembed_query(query)
             if query_embedding is None:
                 raise ValueError("Query embedding returned None")
 
-            retrieved_docs = vector_store_service.search(
+            search_start = time.perf_counter()
+            retrieved_docs = await asyncio.to_thread(
+                vector_store_service.search,
                 query_embedding.tolist(),
-                top_k=settings.RETRIEVAL_TOP_K
+                top_k=top_k,
+                scope=scope
             )
+            latency_model.observe("search", (time.perf_counter() - search_start) * 1000)
 
             if retrieved_docs is None:
                 retrieved_docs = []
 
+            lexical_lists = await lexical_task
+            if lexical_lists:
+                retrieved_docs = self._fuse_hybrid([retrieved_docs], lexical_lists)[:top_k]
+
             state["all_retrieved_documents"] = retrieved_docs if isinstance(retrieved_docs, list) else []
             state["num_contexts_retrieved"] = len(state["all_retrieved_documents"])
 
             logger.info(f"Retrieved {len(state['all_retrieved_documents'])} documents")
         except Exception as e:
             logger.warning(f"Retrieval failed: {e}, continuing with empty results")
+            lexical_task.cancel()
             state["all_retrieved_documents"] = []
             state["num_contexts_retrieved"] = 0
 
         return state
 
-    def retrieve_parallel(self, state: RAGState) -> RAGState:
+    async def retrieve_parallel(self, state: RAGState) -> RAGState:
         logger.info("Performing parallel retrieval...")
         query_variants = state.get("query_variants", [])
 
         all_docs = []
-        seen_ids = set()
+        top_k = self._retrieval_top_k(state, len(query_variants))
+        scope = state.get("search_scope", {})
+        lexical_task = asyncio.ensure_future(self._lexical_search(query_variants, top_k, scope))
 
         try:
-            for variant in query_variants:
-                logger.debug(f"Retrieving for variant: '{variant}'")
-                query_embedding = embedding_service.embed_query(variant)
-                if query_embedding is None:
-                    logger.warning(f"Query embedding returned None for variant: '{variant}'")
-                    continue
-
-                retrieved_docs = vector_store_service.search(
-                    query_embedding.tolist(),
-                    top_k=settings.RETRIEVAL_TOP_K
-                )
-
-                if retrieved_docs is None:
-                    retrieved_docs = []
+            query_embeddings = await embedding_service.aembed_queries(query_variants)
+            if query_embeddings is None or len(query_embeddings) == 0:
+                raise ValueError("Query embeddings returned None")
+
+            search_start = time.perf_counter()
+            result_lists = await asyncio.to_thread(
+                vector_store_service.search_batch,
+                query_embeddings.tolist(),
+                top_k=top_k,
+                scope=scope
+            )
+            latency_model.observe("search", (time.perf_counter() - search_start) * 1000, len(query_variants))
 
-                for doc in retrieved_docs:
-                    doc_id = doc.get("metadata", {}).get("chunk_id")
-                    if doc_id not in seen_ids:
-                        all_docs.append(doc)
-                        seen_ids.add(doc_id)
+            all_docs = self._fuse_hybrid(result_lists, await lexical_task)
         except Exception as e:
-            logger.warning(f"Parallel retrieval failed: {e}, using retrieved documents so far")
+            logger.warning(f"Parallel retrieval failed: {e}, continuing with empty results")
+            lexical_task.cancel()
 
-        logger.info(f"Retrieved {len(all_docs)} unique documents from parallel retrieval")
+        logger.info(f"Retrieved {len(all_docs)} unique documents from {len(query_variants)} query variants")
         state["all_retrieved_documents"] = all_docs
         state["num_contexts_retrieved"] = len(all_docs)
 
         return state
 
-    def rerank(self, state: RAGState) -> RAGState:
+    async def rerank(self, state: RAGState) -> RAGState:
         logger.info("Reranking retrieved documents...")
         documents = state.get("all_retrieved_documents", [])
         query = state.get("query", "")
         use_reranker = state.get("use_reranker", True)
+        plan = state["retrieval_plan"]
+        rerank_top_k = plan["rerank_top_k"]
+
+        if use_reranker and documents:
+            documents = reranker_service.prune_candidates(query, documents, rerank_top_k, None)
+
+        budget = self._budget(state)
+        if use_reranker and documents and budget.enabled:
+            affordable = latency_model.affordable_candidates(budget.remaining_ms())
+            if affordable < min(rerank_top_k, len(documents)):
+                logger.info(f"Skipping reranking to stay within {budget.budget_ms:.0f}ms latency budget")
+                use_reranker = False
+                plan["reranker_skipped_for_budget"] = True
+                plan["degraded"] = True
+            elif affordable < len(documents):
+                logger.info(f"Reranking {affordable} of {len(documents)} candidates for latency budget")
+                documents = documents[:affordable]
+                plan["degraded"] = True
+        plan["rerank_candidates"] = len(documents) if use_reranker else 0
 
         if not use_reranker or len(documents) == 0:
-            state["final_documents"] = documents[:settings.RERANK_TOP_K]
+            state["final_documents"] = documents[:rerank_top_k]
             state["num_contexts_used"] = len(state["final_documents"])
             logger.info(f"Using top {len(state['final_documents'])} documents without reranking")
             return state
@@ -210,10 +439,15 @@ class RAGGraph:
                 for doc in documents
             ]
 
-            reranked = reranker_service.rerank_with_metadata(
+            rerank_start = time.perf_counter()
+            reranked = await reranker_service.arerank_with_metadata(
                 query,
                 docs_with_metadata,
-                top_k=settings.RERANK_TOP_K
+                top_k=rerank_top_k,
+                use_cascade=False
+            )
+            latency_model.observe(
+                "rerank_candidate", (time.perf_counter() - rerank_start) * 1000, len(docs_with_metadata)
             )
 
             final_documents = [
@@ -232,43 +466,81 @@ class RAGGraph:
 
         except Exception as e:
             logger.warning(f"Reranking failed, using original order: {e}")
-            state["final_documents"] = documents[:settings.RERANK_TOP_K]
+            state["final_documents"] = documents[:rerank_top_k]
             state["num_contexts_used"] = len(state["final_documents"])
 
         return state
 
-    def generate(self, state: RAGState) -> RAGState:
+    def _finish_plan(self, state: RAGState) -> RAGState:
+        budget = self._budget(state)
+        plan = state["retrieval_plan"]
+        plan["pre_generation_ms"] = budget.elapsed_ms()
+        if budget.enabled:
+            plan["within_budget"] = plan["pre_generation_ms"] <= budget.budget_ms
+        return state
+
+    async def assemble_context(self, state: RAGState) -> RAGState:
+        final_documents = state.get("final_documents", [])
+
+        if not settings.CONTEXT_ASSEMBLY_ENABLED or not final_documents:
+            state["context_documents"] = final_documents
+            state["context_stats"] = {}
+            return self._finish_plan(state)
+
+        logger.info("Assembling context...")
+        try:
+            contexts, stats = await context_assembler.aassemble(final_documents, state.get("query_embedding"))
+            state["context_documents"] = contexts
+            state["context_stats"] = stats
+            state["num_contexts_used"] = len(contexts)
+        except Exception as e:
+            logger.warning(f"Context assembly failed, using reranked chunks as-is: {e}")
+            state["context_documents"] = final_documents
+            state["context_stats"] = {}
+
+        return self._finish_plan(state)
+
+    @staticmethod
+    def _context_documents(state: RAGState) -> List[Dict]:
+        contexts = state.get("context_documents")
+        return contexts if contexts is not None else state.get("final_documents", [])
+
+    @staticmethod
+    def _build_citations(context_documents: List[Dict]) -> List[Citation]:
+        return [
+            Citation(
+                citation_id=idx + 1,
+                document_id=doc["metadata"].get("document_id", ""),
+                filename=doc["metadata"].get("filename", ""),
+                chunk_id=doc["metadata"].get("chunk_id", ""),
+                chunk_ids=doc.get("chunk_ids") or [doc["metadata"].get("chunk_id", "")],
+                text=doc["text"],
+                page_number=doc["metadata"].get("page_number"),
+                confidence_score=doc.get("rerank_score", doc.get("similarity_score", 0.0))
+            )
+            for idx, doc in enumerate(context_documents)
+        ]
+
+    async def generate(self, state: RAGState) -> RAGState:
         logger.info("Generating response...")
         query = state.get("query", "")
-        final_documents = state.get("final_documents", [])
+        context_documents = self._context_documents(state)
 
-        if not final_documents:
-            state["response"] = "I couldn't find any relevant documents to answer your question."
+        if not context_documents:
+            state["response"] = NO_DOCUMENTS_RESPONSE
             state["citations"] = []
             return state
 
-        contexts = [doc["text"] for doc in final_documents]
+        contexts = [doc["text"] for doc in context_documents]
 
         try:
-            response = llm_service.generate_response(
+            response = await llm_service.generate_response(
                 query,
                 contexts,
                 use_inline_citations=True
             )
 
-            citations = []
-            for idx, doc in enumerate(final_documents):
-                citations.append(
-                    Citation(
-                        citation_id=idx + 1,
-                        document_id=doc["metadata"].get("document_id", ""),
-                        filename=doc["metadata"].get("filename", ""),
-                        chunk_id=doc["metadata"].get("chunk_id", ""),
-                        text=doc["text"],
-                        page_number=doc["metadata"].get("page_number"),
-                        confidence_score=doc.get("rerank_score", doc.get("similarity_score", 0.0))
-                    )
-                )
+            citations = self._build_citations(context_documents)
 
             state["response"] = response
             state["citations"] = citations
@@ -281,11 +553,135 @@ class RAGGraph:
 
         return state
 
-    def invoke(self, state: RAGState) -> RAGState:
-        logger.info(f"Starting RAG pipeline for query: {state.get('query', '')}")
+    @staticmethod
+    def _budget(state: RAGState) -> LatencyBudget:
+        return LatencyBudget(state.get("latency_budget_ms"), state.get("request_start_time"))
+
+    @staticmethod
+    def _timestamp(value: Optional[datetime]) -> Optional[float]:
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+
+    def _resolve_scope(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        scope = {
+            "tenant": filters.get("tenant"),
+            "document_ids": None,
+            "lexical_document_ids": None,
+            "page_from": filters.get("page_from"),
+            "page_to": filters.get("page_to"),
+        }
+        active = [name for name in DOCUMENT_FILTERS if filters.get(name) is not None]
+        if not active:
+            if vector_store_service.partition_by == "document":
+                raise ValueError(
+                    "VECTOR_STORE_PARTITION_BY=document requires a document_ids, filenames, tenant or upload date filter"
+                )
+            return scope
+
+        document_ids = document_manifest.resolve_document_ids(
+            document_ids=filters.get("document_ids"),
+            filenames=filters.get("filenames"),
+            tenant=filters.get("tenant"),
+            uploaded_after=self._timestamp(filters.get("uploaded_after")),
+            uploaded_before=self._timestamp(filters.get("uploaded_before"))
+        )
+        scope["lexical_document_ids"] = document_ids
+        if not (active == ["tenant"] and vector_store_service.partition_by == "tenant"):
+            scope["document_ids"] = document_ids
+        return scope
+
+    @staticmethod
+    def _filters_key(filters: Dict[str, Any]) -> tuple:
+        return tuple(
+            (name, tuple(sorted(value)) if isinstance(value, list) else str(value))
+            for name, value in sorted(filters.items())
+        )
+
+    def _plan_request(self, state: RAGState) -> tuple:
+        state["request_start_time"] = time.perf_counter()
+        filters = state.get("filters") or {}
+        scope = self._resolve_scope(filters)
+        state["search_scope"] = scope
+        plan = {
+            "retrieval_top_k": min(
+                state.get("retrieval_top_k") or settings.RETRIEVAL_TOP_K, settings.RETRIEVAL_MAX_TOP_K
+            ),
+            "rerank_top_k": min(state.get("top_k") or settings.RERANK_TOP_K, settings.RERANK_MAX_TOP_K),
+            "max_query_variants": min(
+                state.get("max_query_variants") or settings.QUERY_MAX_VARIANTS, settings.QUERY_MAX_VARIANTS
+            ),
+            "latency_budget_ms": state.get("latency_budget_ms"),
+            "filters": {name: str(value) if isinstance(value, datetime) else value for name, value in filters.items()},
+            "documents_in_scope": (
+                len(scope["lexical_document_ids"]) if scope["lexical_document_ids"] is not None else None
+            ),
+            "degraded": False,
+        }
+        state["retrieval_plan"] = plan
+        return (
+            plan["rerank_top_k"],
+            plan["retrieval_top_k"],
+            plan["max_query_variants"],
+            state.get("use_reranker", True),
+            self._filters_key(filters),
+        )
+
+    async def _lookup_cache(self, state: RAGState, cache_params: tuple) -> Optional[Dict]:
+        if not semantic_cache.enabled:
+            return None
+
+        cache_start = time.perf_counter()
+        try:
+            state["query_embedding"] = await embedding_service.aembed_query(state.get("query", ""))
+            cached = semantic_cache.lookup(state["query_embedding"], cache_params)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            cached = None
+        state["node_timings_ms"] = {"semantic_cache": (time.perf_counter() - cache_start) * 1000}
+        return cached
+
+    def _store_cache(self, result: RAGState, cache_params: tuple, cache_generation: int):
+        if result.get("retrieval_plan", {}).get("degraded"):
+            return
+        if result.get("citations") and result.get("query_embedding") is not None:
+            semantic_cache.store(
+                result.get("query", ""),
+                result["query_embedding"],
+                cache_params,
+                {
+                    "response": result.get("response", ""),
+                    "citations": list(result.get("citations", [])),
+                    "num_contexts_retrieved": result.get("num_contexts_retrieved", 0),
+                    "num_contexts_used": result.get("num_contexts_used", 0),
+                },
+                cache_generation
+            )
+
+    async def ainvoke(self, state: RAGState) -> RAGState:
+        query = state.get("query", "")
+        logger.info(f"Starting RAG pipeline for query: {query}")
         start_time = time.time()
 
-        result = self.compiled_graph.invoke(state)
+        cache_params = self._plan_request(state)
+        cache_generation = semantic_cache.generation
+
+        cached = await self._lookup_cache(state, cache_params)
+        if cached is not None:
+            result = {
+                **state,
+                **cached,
+                "cache_hit": True,
+                "processing_time_ms": (time.time() - start_time) * 1000,
+            }
+            logger.info(f"RAG pipeline served from semantic cache in {result['processing_time_ms']:.2f}ms")
+            return result
+
+        result = await self.compiled_graph.ainvoke(state)
+        result["cache_hit"] = False
+        self._store_cache(result, cache_params, cache_generation)
 
         elapsed_time = time.time() - start_time
         result["processing_time_ms"] = elapsed_time * 1000
@@ -293,5 +689,89 @@ class RAGGraph:
         logger.info(f"RAG pipeline completed in {elapsed_time:.2f}s")
         return result
 
+    async def astream(self, state: RAGState) -> AsyncIterator[Dict[str, Any]]:
+        query = state.get("query", "")
+        logger.info(f"Starting streaming RAG pipeline for query: {query}")
+        start_time = time.time()
+
+        cache_params = self._plan_request(state)
+        cache_generation = semantic_cache.generation
+
+        cached = await self._lookup_cache(state, cache_params)
+        if cached is not None:
+            yield {"citations": cached["citations"]}
+            yield {"content": cached["response"]}
+            elapsed_ms = (time.time() - start_time) * 1000
+            yield {
+                "done": True,
+                "cache_hit": True,
+                "ttft_ms": elapsed_ms,
+                "processing_time_ms": elapsed_ms,
+                "num_contexts_retrieved": cached.get("num_contexts_retrieved", 0),
+                "num_contexts_used": cached.get("num_contexts_used", 0),
+                "node_timings_ms": state.get("node_timings_ms", {}),
+                "routing": {},
+                "context": {},
+                "retrieval": state.get("retrieval_plan", {}),
+            }
+            logger.info(f"Streaming RAG pipeline served from semantic cache in {elapsed_ms:.2f}ms")
+            return
+
+        result = await self.compiled_retrieval_graph.ainvoke(state)
+        context_documents = self._context_documents(result)
+        citations = self._build_citations(context_documents)
+        yield {"citations": citations}
+
+        generate_start = time.perf_counter()
+        ttft_ms = None
+        parts = []
+        error = None
+        if not context_documents:
+            parts.append(NO_DOCUMENTS_RESPONSE)
+            ttft_ms = (time.time() - start_time) * 1000
+            yield {"content": NO_DOCUMENTS_RESPONSE}
+        else:
+            try:
+                async for delta in llm_service.generate_response_stream(
+                    query,
+                    [doc["text"] for doc in context_documents],
+                    use_inline_citations=True
+                ):
+                    if ttft_ms is None:
+                        ttft_ms = (time.time() - start_time) * 1000
+                    parts.append(delta)
+                    yield {"content": delta}
+            except Exception as e:
+                logger.error(f"Streaming response generation failed: {e}")
+                error = f"Error generating response: {str(e)}"
+                yield {"error": error}
+
+        timings = result.setdefault("node_timings_ms", {})
+        timings["generate"] = (time.perf_counter() - generate_start) * 1000
+
+        if error is None:
+            result["response"] = "".join(parts)
+            result["citations"] = citations
+            self._store_cache(result, cache_params, cache_generation)
+
+        elapsed_ms = (time.time() - start_time) * 1000
+        yield {
+            "done": True,
+            "cache_hit": False,
+            "ttft_ms": ttft_ms,
+            "processing_time_ms": elapsed_ms,
+            "num_contexts_retrieved": result.get("num_contexts_retrieved", 0),
+            "num_contexts_used": result.get("num_contexts_used", 0),
+            "node_timings_ms": timings,
+            "routing": result.get("routing", {}),
+            "context": result.get("context_stats", {}),
+            "retrieval": result.get("retrieval_plan", {}),
+        }
+        ttft_log = f"{ttft_ms:.2f}ms" if ttft_ms is not None else "n/a"
+        logger.info(f"Streaming RAG pipeline completed in {elapsed_ms:.2f}ms (TTFT {ttft_log})")
+
+    def invoke(self, state: RAGState) -> RAGState:
+        return asyncio.run(self.ainvoke(state))
+
 
 rag_graph = RAGGraph()
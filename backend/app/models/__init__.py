@@ -3,6 +3,7 @@ from .schemas import (
     ChunkMetadata,
     UploadResponse,
     Citation,
+    SearchFilters,
     QueryRequest,
     QueryResponse,
     DocumentListResponse,
@@ -14,6 +15,7 @@ __all__ = [
     "ChunkMetadata",
     "UploadResponse",
     "Citation",
+    "SearchFilters",
     "QueryRequest",
     "QueryResponse",
     "DocumentListResponse",
@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Any, Optional, List, Dict
 from pydantic import BaseModel, Field
 from datetime import datetime
 import uuid
@@ -12,6 +12,8 @@ class DocumentMetadata(BaseModel):
     upload_time: datetime = Field(default_factory=datetime.utcnow)
     num_chunks: int = 0
     num_pages: Optional[int] = None
+    status: Optional[str] = None
+    tenant: Optional[str] = None
 
 
 class ChunkMetadata(BaseModel):
@@ -36,14 +38,29 @@ class Citation(BaseModel):
     document_id: str
     filename: str
     chunk_id: str
+    chunk_ids: List[str] = []
     text: str
     page_number: Optional[int] = None
     confidence_score: float
 
 
+class SearchFilters(BaseModel):
+    document_ids: Optional[List[str]] = None
+    filenames: Optional[List[str]] = None
+    tenant: Optional[str] = None
+    page_from: Optional[int] = None
+    page_to: Optional[int] = None
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+
+
 class QueryRequest(BaseModel):
     query: str
-    top_k: int = 10
+    filters: Optional[SearchFilters] = None
+    top_k: Optional[int] = Field(None, ge=1)
+    retrieval_top_k: Optional[int] = Field(None, ge=1)
+    max_query_variants: Optional[int] = Field(None, ge=1)
+    latency_budget_ms: Optional[float] = Field(None, gt=0)
     use_reranker: bool = True
     stream: bool = False
 
@@ -56,6 +73,11 @@ class QueryResponse(BaseModel):
     num_contexts_retrieved: int
     num_contexts_used: int
     processing_time_ms: float
+    node_timings_ms: Dict[str, float] = {}
+    routing: Dict[str, Any] = {}
+    context: Dict[str, Any] = {}
+    retrieval: Dict[str, Any] = {}
+    cache_hit: bool = False
 
 
 class DocumentListResponse(BaseModel):
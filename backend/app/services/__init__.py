@@ -1,15 +1,26 @@
-from .ocr_service import ocr_service
-from .embedding_service import embedding_service
-from .reranker_service import reranker_service
-from .chunking_service import chunking_service
-from .vector_store import vector_store_service
-from .llm_service import llm_service
-
-__all__ = [
-    "ocr_service",
-    "embedding_service",
-    "reranker_service",
-    "chunking_service",
-    "vector_store_service",
-    "llm_service",
-]
+import importlib
+
+_EXPORTS = {
+    "ocr_service": ".ocr",
+    "embedding_service": ".embedding",
+    "reranker_service": ".reranker",
+    "chunking_service": ".chunking",
+    "vector_store_service": ".vector_store",
+    "lexical_index_service": ".lexical_index",
+    "llm_service": ".llm",
+    "reciprocal_rank_fusion": ".fusion",
+    "semantic_cache": ".answer_cache",
+    "ingestion_service": ".ingestion",
+    "document_manifest": ".manifest",
+    "query_router": ".routing",
+    "context_assembler": ".context_assembly",
+    "latency_model": ".latency_budget",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
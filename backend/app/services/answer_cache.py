@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import numpy as np
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    def __init__(self):
+        self.enabled = settings.SEMANTIC_CACHE_ENABLED
+        self.threshold = settings.SEMANTIC_CACHE_THRESHOLD
+        self.ttl_seconds = settings.SEMANTIC_CACHE_TTL_SECONDS
+        self.max_entries = settings.SEMANTIC_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._next_entry_id = 0
+        self._generation = 0
+        self._matrix = None
+        self._matrix_ids = []
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "lookup_time_ms_total": 0.0,
+        }
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _normalize(self, embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def _expire(self, now: float):
+        expired = [
+            entry_id for entry_id, entry in self._entries.items()
+            if now - entry["created_at"] > self.ttl_seconds
+        ]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        if expired:
+            self._stats["expirations"] += len(expired)
+            self._matrix = None
+
+    def _get_matrix(self) -> Tuple[Optional[np.ndarray], list]:
+        if self._matrix is None and self._entries:
+            self._matrix_ids = list(self._entries.keys())
+            self._matrix = np.stack([self._entries[i]["embedding"] for i in self._matrix_ids])
+        return self._matrix, self._matrix_ids
+
+    def lookup(self, query_embedding: np.ndarray, params: Tuple) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+
+        start = time.perf_counter()
+        with self._lock:
+            try:
+                self._expire(time.time())
+                matrix, entry_ids = self._get_matrix()
+                if matrix is None:
+                    self._stats["misses"] += 1
+                    return None
+
+                similarities = matrix @ self._normalize(query_embedding)
+                for idx in np.argsort(-similarities):
+                    if similarities[idx] < self.threshold:
+                        break
+                    entry = self._entries[entry_ids[idx]]
+                    if entry["params"] != params:
+                        continue
+
+                    self._entries.move_to_end(entry_ids[idx])
+                    self._stats["hits"] += 1
+                    logger.info(
+                        f"Semantic cache hit (similarity {similarities[idx]:.3f}) "
+                        f"for cached query: '{entry['query']}'"
+                    )
+                    return {**entry["result"], "cache_similarity": float(similarities[idx])}
+
+                self._stats["misses"] += 1
+                return None
+            finally:
+                self._stats["lookup_time_ms_total"] += (time.perf_counter() - start) * 1000
+
+    def store(
+        self,
+        query: str,
+        query_embedding: np.ndarray,
+        params: Tuple,
+        result: Dict,
+        generation: int
+    ):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if generation != self._generation:
+                logger.debug("Skipping semantic cache store, documents changed during query")
+                return
+
+            self._entries[self._next_entry_id] = {
+                "query": query,
+                "embedding": self._normalize(query_embedding),
+                "params": params,
+                "result": result,
+                "created_at": time.time(),
+            }
+            self._next_entry_id += 1
+            self._stats["stores"] += 1
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+            self._matrix = None
+
+    def invalidate(self, reason: str = ""):
+        with self._lock:
+            num_entries = len(self._entries)
+            self._entries.clear()
+            self._matrix = None
+            self._generation += 1
+            self._stats["invalidations"] += 1
+        logger.info(f"Invalidated semantic cache ({num_entries} entries){': ' + reason if reason else ''}")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "avg_lookup_time_ms": self._stats["lookup_time_ms_total"] / lookups if lookups else 0.0,
+            }
+
+
+semantic_cache = SemanticCache()
@@ -0,0 +1,111 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        name: str,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int,
+        max_wait_ms: float
+    ):
+        self.name = name
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "max_batch_size_seen": 0,
+            "process_time_ms_total": 0.0,
+        }
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=f"{self.name}-batcher",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future))
+        return future
+
+    def submit_many(self, items: List[Any]) -> List[Future]:
+        futures = []
+        self._ensure_worker()
+        for item in items:
+            future = Future()
+            self._queue.put((item, future))
+            futures.append(future)
+        return futures
+
+    def _collect_batch(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                results = self.process_batch([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"{self.name} batch returned {len(results)} results for {len(batch)} items"
+                    )
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["items"] += len(batch)
+                self._stats["max_batch_size_seen"] = max(self._stats["max_batch_size_seen"], len(batch))
+                self._stats["process_time_ms_total"] += elapsed_ms
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            batches = self._stats["batches"]
+            return {
+                **self._stats,
+                "queue_depth": self._queue.qsize(),
+                "avg_batch_size": self._stats["items"] / batches if batches else 0.0,
+            }
@@ -0,0 +1,165 @@
+import logging
+import re
+from typing import List, Optional
+import numpy as np
+from transformers import AutoTokenizer
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+BREAK_NONE = 0
+BREAK_WORD = 1
+BREAK_SENTENCE = 2
+BREAK_LINE = 3
+BREAK_PARAGRAPH = 4
+
+SENTENCE_END_CHARS = frozenset(".!?")
+
+
+class ChunkingService:
+    def __init__(self):
+        self.chunk_size = settings.CHUNK_SIZE
+        self.chunk_overlap = settings.CHUNK_OVERLAP
+        self.tokenizer = None
+        self._load_tokenizer()
+        self.num_special_tokens = self.tokenizer.num_special_tokens_to_add(pair=False)
+        self.max_content_tokens = self.chunk_size - self.num_special_tokens
+        if self.chunk_overlap >= self.max_content_tokens:
+            raise ValueError(
+                f"CHUNK_OVERLAP ({self.chunk_overlap}) must be smaller than CHUNK_SIZE minus "
+                f"special tokens ({self.max_content_tokens})"
+            )
+
+    def _load_tokenizer(self):
+        logger.info(f"Loading tokenizer for: {settings.EMBEDDING_MODEL}")
+        try:
+            self.tokenizer = AutoTokenizer.from_pretrained(
+                settings.EMBEDDING_MODEL,
+                cache_dir=str(settings.MODELS_CACHE_DIR)
+            )
+            logger.info("Tokenizer loaded successfully")
+        except Exception as e:
+            logger.error(f"Failed to load tokenizer: {e}")
+            raise
+
+    def _tokenize_with_offsets(self, text: str) -> np.ndarray:
+        encoding = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            verbose=False
+        )
+        offsets = np.asarray(encoding["offset_mapping"], dtype=np.int64).reshape(-1, 2)
+        return offsets[offsets[:, 1] > offsets[:, 0]]
+
+    def _break_priorities(self, text: str, offsets: np.ndarray) -> np.ndarray:
+        gap_starts = offsets[:-1, 1]
+        gap_ends = offsets[1:, 0]
+
+        newline_positions = np.asarray([m.start() for m in re.finditer("\n", text)], dtype=np.int64)
+        newlines_in_gap = (
+            np.searchsorted(newline_positions, gap_ends) - np.searchsorted(newline_positions, gap_starts)
+        )
+        has_gap = gap_ends > gap_starts
+        ends_sentence = np.fromiter(
+            (text[end - 1] in SENTENCE_END_CHARS for end in gap_starts),
+            dtype=bool,
+            count=len(gap_starts)
+        )
+
+        priorities = np.full(len(offsets) + 1, BREAK_NONE, dtype=np.int8)
+        gap_priorities = priorities[1:-1]
+        gap_priorities[has_gap] = BREAK_WORD
+        gap_priorities[has_gap & ends_sentence] = BREAK_SENTENCE
+        gap_priorities[newlines_in_gap >= 1] = BREAK_LINE
+        gap_priorities[newlines_in_gap >= 2] = BREAK_PARAGRAPH
+        priorities[-1] = BREAK_PARAGRAPH
+        return priorities
+
+    def _choose_end(self, priorities: np.ndarray, start: int, num_tokens: int) -> int:
+        hard_end = min(start + self.max_content_tokens, num_tokens)
+        if hard_end == num_tokens:
+            return num_tokens
+
+        earliest = start + max(1, self.max_content_tokens // 2)
+        window = priorities[earliest:hard_end + 1]
+        best = window.max()
+        if best == BREAK_NONE:
+            return hard_end
+        return earliest + int(np.flatnonzero(window == best)[-1])
+
+    def _next_start(self, priorities: np.ndarray, start: int, end: int) -> int:
+        overlap_start = max(end - self.chunk_overlap, start + 1)
+        if overlap_start >= end:
+            return end
+        word_starts = np.flatnonzero(priorities[overlap_start:end] >= BREAK_WORD)
+        if len(word_starts) == 0:
+            return overlap_start
+        return overlap_start + int(word_starts[0])
+
+    def split_text(self, text: str) -> List[dict]:
+        offsets = self._tokenize_with_offsets(text)
+        num_tokens = len(offsets)
+        if num_tokens == 0:
+            return []
+
+        priorities = self._break_priorities(text, offsets)
+
+        spans = []
+        start = 0
+        while start < num_tokens:
+            end = self._choose_end(priorities, start, num_tokens)
+            spans.append({
+                "text": text[offsets[start, 0]:offsets[end - 1, 1]],
+                "token_count": end - start + self.num_special_tokens,
+                "start_char": int(offsets[start, 0]),
+                "end_char": int(offsets[end - 1, 1]),
+            })
+            if end >= num_tokens:
+                break
+            start = self._next_start(priorities, start, end)
+
+        return spans
+
+    def chunk_text(
+        self,
+        text: str,
+        document_id: str,
+        page_number: Optional[int] = None,
+        start_index: int = 0
+    ) -> List[dict]:
+        try:
+            spans = self.split_text(text)
+
+            chunked_data = []
+            for idx, span in enumerate(spans, start=start_index):
+                chunked_data.append({
+                    "chunk_index": idx,
+                    "document_id": document_id,
+                    "text": span["text"],
+                    "token_count": span["token_count"],
+                    "page_number": page_number
+                })
+
+            if chunked_data:
+                logger.info(f"Chunked text into {len(chunked_data)} chunks, avg tokens: {sum(c['token_count'] for c in chunked_data) / len(chunked_data):.1f}")
+            else:
+                logger.info("No text to chunk")
+            return chunked_data
+
+        except Exception as e:
+            logger.error(f"Failed to chunk text: {e}")
+            raise
+
+    def estimate_chunks(self, text: str) -> int:
+        try:
+            token_count = len(self.tokenizer.encode(text, verbose=False))
+            estimated_chunks = max(1, (token_count + self.chunk_overlap) // (self.chunk_size - self.chunk_overlap))
+            return estimated_chunks
+        except Exception as e:
+            logger.error(f"Failed to estimate chunks: {e}")
+            return 1
+
+
+chunking_service = ChunkingService()
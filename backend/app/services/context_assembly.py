@@ -0,0 +1,233 @@
+import logging
+import re
+from typing import Dict, List, Optional
+import numpy as np
+from app.core import settings, run_in_model_executor
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+MIN_OVERLAP_CHARS = 16
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _join_overlapping(left: str, right: str) -> str:
+    if len(right) >= MIN_OVERLAP_CHARS:
+        probe = right[:MIN_OVERLAP_CHARS]
+        position = left.find(probe, max(0, len(left) - len(right)))
+        while position >= 0:
+            if right.startswith(left[position:]):
+                return left + right[len(left) - position:]
+            position = left.find(probe, position + 1)
+    return f"{left}\n{right}"
+
+
+class ContextAssembler:
+    def __init__(self):
+        self._tokenizer = None
+        self._stats = {
+            "requests": 0,
+            "chunks_in": 0,
+            "contexts_out": 0,
+            "tokens_in": 0,
+            "tokens_out": 0,
+            "chunks_deduplicated": 0,
+            "chunks_merged": 0,
+            "chunks_dropped_for_budget": 0,
+            "sentences_dropped": 0,
+        }
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            from app.services.chunking import chunking_service
+            self._tokenizer = chunking_service.tokenizer
+        return self._tokenizer
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        encoding = self.tokenizer(texts, add_special_tokens=False, return_attention_mask=False, verbose=False)
+        return [len(ids) for ids in encoding["input_ids"]]
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        encoding = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            verbose=False
+        )
+        offsets = encoding["offset_mapping"]
+        if len(offsets) <= max_tokens:
+            return text
+        cut = offsets[max_tokens - 1][1]
+        sentence_end = max(text.rfind(mark, 0, cut) for mark in (". ", "! ", "? ", "\n"))
+        if sentence_end > cut // 2:
+            cut = sentence_end + 1
+        return text[:cut].rstrip()
+
+    def _deduplicate(self, documents: List[Dict], stats: Dict) -> List[Dict]:
+        from app.services.embedding import embedding_service
+
+        texts = [doc["text"] for doc in documents]
+        embeddings = _normalize(embedding_service.embed_texts(texts, show_progress_bar=False))
+        kept = []
+        for i in range(len(documents)):
+            if kept and float(np.max(embeddings[kept] @ embeddings[i])) >= settings.CONTEXT_DEDUP_THRESHOLD:
+                stats["chunks_deduplicated"] += 1
+                continue
+            kept.append(i)
+        return [documents[i] for i in kept]
+
+    def _merge_adjacent(self, documents: List[Dict], stats: Dict) -> List[Dict]:
+        groups: Dict[tuple, List[int]] = {}
+        for rank, doc in enumerate(documents):
+            metadata = doc["metadata"]
+            if metadata.get("chunk_index") is None:
+                groups[("rank", rank)] = [rank]
+                continue
+            groups.setdefault((metadata.get("document_id"), metadata.get("page_number")), []).append(rank)
+
+        passages = []
+        for ranks in groups.values():
+            ranks.sort(key=lambda rank: documents[rank]["metadata"].get("chunk_index", 0))
+            run = [ranks[0]]
+            for rank in ranks[1:]:
+                previous = documents[run[-1]]["metadata"].get("chunk_index")
+                if documents[rank]["metadata"].get("chunk_index") == previous + 1:
+                    run.append(rank)
+                else:
+                    passages.append(self._passage(documents, run))
+                    run = [rank]
+            passages.append(self._passage(documents, run))
+
+        stats["chunks_merged"] += len(documents) - len(passages)
+        passages.sort(key=lambda passage: passage["rank"])
+        return passages
+
+    @staticmethod
+    def _passage(documents: List[Dict], run: List[int]) -> Dict:
+        best = min(run)
+        text = documents[run[0]]["text"]
+        for rank in run[1:]:
+            text = _join_overlapping(text, documents[rank]["text"])
+        return {
+            **documents[best],
+            "text": text,
+            "rank": best,
+            "chunk_ids": [documents[rank]["metadata"].get("chunk_id", "") for rank in run],
+        }
+
+    def _select_sentences(self, passages: List[Dict], query_embedding: np.ndarray, stats: Dict) -> List[Dict]:
+        from app.services.embedding import embedding_service
+
+        sentences = [
+            [sentence for sentence in SENTENCE_SPLIT_PATTERN.split(passage["text"]) if sentence.strip()]
+            for passage in passages
+        ]
+        flat = [sentence for passage_sentences in sentences for sentence in passage_sentences]
+        if not flat:
+            return passages
+
+        embeddings = embedding_service.embed_texts(flat, use_store=False, show_progress_bar=False)
+        similarities = _normalize(embeddings) @ _normalize(query_embedding)
+        selected = []
+        offset = 0
+        for passage, passage_sentences in zip(passages, sentences):
+            scores = similarities[offset:offset + len(passage_sentences)]
+            offset += len(passage_sentences)
+            if len(passage_sentences) <= 1:
+                selected.append(passage)
+                continue
+            keep = (scores >= settings.CONTEXT_SENTENCE_MIN_SIMILARITY) | (scores == scores.max())
+            stats["sentences_dropped"] += int((~keep).sum())
+            text = " ".join(sentence.strip() for sentence, flag in zip(passage_sentences, keep) if flag)
+            selected.append({**passage, "text": text})
+        return selected
+
+    def _fit_budget(self, passages: List[Dict], stats: Dict) -> List[Dict]:
+        budget = settings.CONTEXT_TOKEN_BUDGET
+        token_counts = self.count_tokens([passage["text"] for passage in passages])
+        fitted = []
+        used = 0
+        for passage, num_tokens in zip(passages, token_counts):
+            remaining = budget - used
+            if num_tokens <= remaining:
+                fitted.append({**passage, "token_count": num_tokens})
+                used += num_tokens
+            elif not fitted or remaining >= settings.CONTEXT_MIN_TRUNCATED_TOKENS:
+                text = self._truncate(passage["text"], max(remaining, settings.CONTEXT_MIN_TRUNCATED_TOKENS))
+                truncated_tokens = self.count_tokens([text])[0]
+                fitted.append({**passage, "text": text, "token_count": truncated_tokens})
+                used += truncated_tokens
+            else:
+                stats["chunks_dropped_for_budget"] += len(passage["chunk_ids"])
+        return fitted
+
+    def assemble(self, documents: List[Dict], query_embedding: Optional[np.ndarray] = None) -> tuple:
+        stats = {
+            "chunks_in": len(documents),
+            "tokens_in": 0,
+            "chunks_deduplicated": 0,
+            "chunks_merged": 0,
+            "chunks_dropped_for_budget": 0,
+            "sentences_dropped": 0,
+        }
+        if not documents:
+            return [], {**stats, "contexts_out": 0, "tokens_out": 0}
+
+        stats["tokens_in"] = sum(self.count_tokens([doc["text"] for doc in documents]))
+
+        if settings.CONTEXT_DEDUP_ENABLED and len(documents) > 1:
+            try:
+                documents = self._deduplicate(documents, stats)
+            except Exception as e:
+                logger.warning(f"Context deduplication failed, keeping all chunks: {e}")
+
+        if settings.CONTEXT_MERGE_ADJACENT:
+            passages = self._merge_adjacent(documents, stats)
+        else:
+            passages = [
+                {**doc, "rank": rank, "chunk_ids": [doc["metadata"].get("chunk_id", "")]}
+                for rank, doc in enumerate(documents)
+            ]
+
+        if settings.CONTEXT_SENTENCE_SELECTION_ENABLED and query_embedding is not None:
+            try:
+                passages = self._select_sentences(passages, query_embedding, stats)
+            except Exception as e:
+                logger.warning(f"Sentence selection failed, using whole passages: {e}")
+
+        contexts = self._fit_budget(passages, stats)
+        stats["contexts_out"] = len(contexts)
+        stats["tokens_out"] = sum(context["token_count"] for context in contexts)
+
+        self._stats["requests"] += 1
+        for key, value in stats.items():
+            self._stats[key] += value
+
+        logger.info(
+            f"Assembled {stats['contexts_out']} contexts from {stats['chunks_in']} chunks "
+            f"({stats['tokens_in']} -> {stats['tokens_out']} tokens)"
+        )
+        return contexts, stats
+
+    async def aassemble(self, documents: List[Dict], query_embedding: Optional[np.ndarray] = None) -> tuple:
+        return await run_in_model_executor(self.assemble, documents, query_embedding)
+
+    def get_stats(self) -> Dict:
+        tokens_in = self._stats["tokens_in"]
+        return {
+            **self._stats,
+            "token_budget": settings.CONTEXT_TOKEN_BUDGET,
+            "token_reduction": 1 - self._stats["tokens_out"] / tokens_in if tokens_in else 0.0,
+        }
+
+
+context_assembler = ContextAssembler()
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from concurrent.futures import Future
+from typing import Dict, List
+import numpy as np
+from app.core import settings, run_in_model_executor
+from app.services.batching import MicroBatcher
+from app.services.embedding_store import EmbeddingStore
+from app.services.inference_backend import load_sentence_transformer, resolve_backend
+from app.services.lru_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingService:
+    def __init__(self):
+        self.model = None
+        self.backend = resolve_backend()
+        self.query_cache = TTLCache(
+            name="query_embeddings",
+            max_entries=settings.QUERY_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS,
+            persist_path=settings.MODELS_CACHE_DIR / "query_cache.sqlite3" if settings.QUERY_CACHE_PERSIST else None,
+            max_disk_entries=settings.QUERY_CACHE_DISK_MAX_ENTRIES
+        )
+        self.query_batcher = None
+        if settings.EMBEDDING_MICROBATCH_ENABLED:
+            self.query_batcher = MicroBatcher(
+                name="query-embedding",
+                process_batch=self._encode_query_batch,
+                max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+                max_wait_ms=settings.EMBEDDING_BATCH_WINDOW_MS
+            )
+        self.store = None
+        self._load_model()
+        if settings.EMBEDDING_STORE_ENABLED:
+            self._open_store()
+
+    def _open_store(self):
+        try:
+            self.store = EmbeddingStore(
+                root=settings.MODELS_CACHE_DIR / "embedding_store",
+                model_name=settings.EMBEDDING_MODEL,
+                dimension=self.get_embedding_dimension(),
+                dtype=settings.EMBEDDING_STORE_DTYPE,
+                max_entries=settings.EMBEDDING_STORE_MAX_ENTRIES,
+                backend=self.backend
+            )
+        except Exception as e:
+            logger.warning(f"Failed to open embedding store, embedding without it: {e}")
+            self.store = None
+
+    def _load_model(self):
+        logger.info(f"Loading embedding model: {settings.EMBEDDING_MODEL}")
+        try:
+            self.model = load_sentence_transformer(settings.EMBEDDING_MODEL, self.backend)
+            logger.info(f"Embedding model loaded successfully")
+            logger.info(f"Model dimension: {self.model.get_sentence_embedding_dimension()}")
+        except Exception as e:
+            logger.error(f"Failed to load embedding model: {e}")
+            raise
+
+    def _encode_texts(self, texts: List[str], show_progress_bar: bool = True) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=32,
+            show_progress_bar=show_progress_bar,
+            convert_to_numpy=True
+        )
+
+    def embed_texts(self, texts: List[str], use_store: bool = True, show_progress_bar: bool = True) -> np.ndarray:
+        try:
+            if self.store is None or not use_store or not texts:
+                embeddings = self._encode_texts(texts, show_progress_bar)
+                logger.debug(f"Embedded {len(texts)} texts, shape: {embeddings.shape}")
+                return embeddings
+
+            digests = [EmbeddingStore.digest(text) for text in texts]
+            embeddings, misses = self.store.lookup(digests)
+            if misses:
+                unique = {}
+                for i in misses:
+                    unique.setdefault(digests[i], texts[i])
+                encoded = np.asarray(self._encode_texts(list(unique.values()), show_progress_bar), dtype=np.float32)
+                self.store.put(list(unique), encoded)
+                rows = dict(zip(unique, encoded))
+                for i in misses:
+                    embeddings[i] = rows[digests[i]]
+
+            logger.debug(
+                f"Embedded {len(texts)} texts ({len(texts) - len(misses)} from store), shape: {embeddings.shape}"
+            )
+            return embeddings
+        except Exception as e:
+            logger.error(f"Failed to embed texts: {e}")
+            raise
+
+    def _query_cache_key(self, query: str) -> str:
+        return TTLCache.make_key(query, f"{settings.EMBEDDING_MODEL}:{self.backend}")
+
+    def _cache_query_embedding(self, query: str, embedding: np.ndarray):
+        embedding.setflags(write=False)
+        self.query_cache.set(self._query_cache_key(query), embedding)
+
+    def _encode_query_batch(self, queries: List[str]) -> List[np.ndarray]:
+        embeddings = self.model.encode(
+            queries,
+            batch_size=max(1, len(queries)),
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
+        results = []
+        for query, embedding in zip(queries, embeddings):
+            embedding = embedding.copy()
+            self._cache_query_embedding(query, embedding)
+            results.append(embedding)
+        return results
+
+    def _submit_queries(self, queries: List[str]) -> List[Future]:
+        if self.query_batcher is not None:
+            return self.query_batcher.submit_many(queries)
+
+        futures = []
+        for embedding in self._encode_query_batch(queries):
+            future = Future()
+            future.set_result(embedding)
+            futures.append(future)
+        return futures
+
+    def embed_query(self, query: str) -> np.ndarray:
+        try:
+            cached = self.query_cache.get(self._query_cache_key(query))
+            if cached is not None:
+                return cached
+
+            embedding = self._submit_queries([query])[0].result()
+            logger.debug(f"Embedded query, shape: {embedding.shape}")
+            return embedding
+        except Exception as e:
+            logger.error(f"Failed to embed query: {e}")
+            raise
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        try:
+            cached = [self.query_cache.get(self._query_cache_key(query)) for query in queries]
+            misses = [i for i, embedding in enumerate(cached) if embedding is None]
+
+            if misses:
+                futures = self._submit_queries([queries[i] for i in misses])
+                for i, future in zip(misses, futures):
+                    cached[i] = future.result()
+
+            embeddings = np.stack(cached)
+            logger.debug(f"Embedded {len(queries)} queries ({len(misses)} computed), shape: {embeddings.shape}")
+            return embeddings
+        except Exception as e:
+            logger.error(f"Failed to embed queries: {e}")
+            raise
+
+    async def aembed_query(self, query: str) -> np.ndarray:
+        cached = self.query_cache.get(self._query_cache_key(query))
+        if cached is not None:
+            return cached
+        if self.query_batcher is None:
+            return await run_in_model_executor(self.embed_query, query)
+        return await asyncio.wrap_future(self.query_batcher.submit(query))
+
+    async def aembed_queries(self, queries: List[str]) -> np.ndarray:
+        if self.query_batcher is None:
+            return await run_in_model_executor(self.embed_queries, queries)
+        embeddings = await asyncio.gather(*[self.aembed_query(query) for query in queries])
+        return np.stack(embeddings)
+
+    def get_batcher_stats(self) -> Dict:
+        if self.query_batcher is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.query_batcher.get_stats()}
+
+    def get_store_stats(self) -> Dict:
+        if self.store is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.store.get_stats()}
+
+    def get_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+
+embedding_service = EmbeddingService()
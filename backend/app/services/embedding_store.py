@@ -0,0 +1,132 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 32
+
+
+class EmbeddingStore:
+    def __init__(
+        self,
+        root: Path,
+        model_name: str,
+        dimension: int,
+        dtype: str = "float16",
+        max_entries: int = 0,
+        backend: str = "torch"
+    ):
+        self.model_name = model_name
+        self.backend = backend
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self.max_entries = max_entries
+        self.path = root / re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name)
+        self._vectors_path = self.path / f"vectors.{self.dtype.name}"
+        self._keys_path = self.path / "keys.bin"
+        self._lock = threading.Lock()
+        self._rows: Dict[bytes, int] = {}
+        self._mmap: Optional[np.memmap] = None
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "skipped_full": 0}
+        self._open()
+
+    @staticmethod
+    def digest(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    @property
+    def _row_bytes(self) -> int:
+        return self.dimension * self.dtype.itemsize
+
+    def _open(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta_path = self.path / "meta.json"
+        meta = {
+            "model": self.model_name,
+            "backend": self.backend,
+            "dimension": self.dimension,
+            "dtype": self.dtype.name,
+        }
+        if meta_path.exists() and json.loads(meta_path.read_text()) != meta:
+            logger.warning(f"Embedding store at {self.path} does not match {meta}, resetting it")
+            self._vectors_path.unlink(missing_ok=True)
+            self._keys_path.unlink(missing_ok=True)
+        meta_path.write_text(json.dumps(meta))
+
+        keys = self._keys_path.read_bytes() if self._keys_path.exists() else b""
+        vector_bytes = self._vectors_path.stat().st_size if self._vectors_path.exists() else 0
+        count = min(len(keys) // DIGEST_SIZE, vector_bytes // self._row_bytes)
+        if count * DIGEST_SIZE != len(keys) or count * self._row_bytes != vector_bytes:
+            logger.warning(f"Truncating embedding store at {self.path} to {count} complete entries")
+            with open(self._keys_path, "ab") as f:
+                f.truncate(count * DIGEST_SIZE)
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(count * self._row_bytes)
+
+        self._rows = {keys[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE]: i for i in range(count)}
+        logger.info(f"Opened embedding store at {self.path} with {count} entries")
+
+    def _vectors(self) -> np.memmap:
+        if self._mmap is None or len(self._mmap) < len(self._rows):
+            self._mmap = np.memmap(
+                self._vectors_path, dtype=self.dtype, mode="r", shape=(len(self._rows), self.dimension)
+            )
+        return self._mmap
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def lookup(self, digests: List[bytes]) -> Tuple[np.ndarray, List[int]]:
+        embeddings = np.zeros((len(digests), self.dimension), dtype=np.float32)
+        misses = []
+        with self._lock:
+            rows = [self._rows.get(digest) for digest in digests]
+            hits = [i for i, row in enumerate(rows) if row is not None]
+            if hits:
+                embeddings[hits] = self._vectors()[[rows[i] for i in hits]]
+            misses = [i for i, row in enumerate(rows) if row is None]
+            self._stats["hits"] += len(hits)
+            self._stats["misses"] += len(misses)
+        return embeddings, misses
+
+    def put(self, digests: List[bytes], embeddings: np.ndarray):
+        with self._lock:
+            new = {}
+            for digest, embedding in zip(digests, embeddings):
+                if digest not in self._rows and digest not in new:
+                    new[digest] = embedding
+            if self.max_entries and len(self._rows) + len(new) > self.max_entries:
+                self._stats["skipped_full"] += len(new)
+                return
+            if not new:
+                return
+
+            vectors = np.asarray(list(new.values()), dtype=self.dtype)
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._keys_path, "ab") as f:
+                f.write(b"".join(new))
+
+            for digest in new:
+                self._rows[digest] = len(self._rows)
+            self._stats["writes"] += len(new)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "model": self.model_name,
+                "backend": self.backend,
+                "entries": len(self._rows),
+                "max_entries": self.max_entries,
+                "dtype": self.dtype.name,
+                "size_bytes": len(self._rows) * self._row_bytes,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                **self._stats,
+            }
@@ -0,0 +1,196 @@
+import hashlib
+import logging
+import string
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+from app.core import settings
+from app.services.ocr import IMAGE_EXTENSIONS, ocr_service
+
+logger = logging.getLogger(__name__)
+
+PLAIN_TEXT_EXTENSIONS = (".txt", ".md")
+SUPPORTED_EXTENSIONS = (".pdf", ".pptx", ".docx") + PLAIN_TEXT_EXTENSIONS + IMAGE_EXTENSIONS
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+COMMON_PUNCTUATION = frozenset(string.punctuation + "‘’“”–—• ")
+
+
+def text_layer_is_usable(text: str) -> bool:
+    stripped = text.strip()
+    if len(stripped) < settings.TEXT_LAYER_MIN_CHARS:
+        return False
+
+    num_chars = len(stripped)
+    alphanumeric = sum(1 for ch in stripped if ch.isalnum())
+    garbage = sum(1 for ch in stripped if not (ch.isalnum() or ch.isspace() or ch in COMMON_PUNCTUATION))
+    if garbage / num_chars > settings.TEXT_LAYER_MAX_GARBAGE_RATIO:
+        return False
+    if alphanumeric / num_chars < settings.TEXT_LAYER_MIN_ALNUM_RATIO:
+        return False
+
+    words = stripped.split()
+    return num_chars / len(words) <= settings.TEXT_LAYER_MAX_AVG_WORD_LENGTH
+
+
+class ExtractionService:
+    @staticmethod
+    def _file_extension(file_path: str, original_filename: str = None) -> str:
+        return Path(original_filename or file_path).suffix.lower()
+
+    def get_page_count(self, file_path: str, original_filename: str = None) -> int:
+        file_ext = self._file_extension(file_path, original_filename)
+
+        if file_ext == ".pdf":
+            from pypdf import PdfReader
+            return len(PdfReader(file_path).pages)
+        elif file_ext == ".pptx":
+            from pptx import Presentation
+            return len(Presentation(file_path).slides)
+        elif file_ext in SUPPORTED_EXTENSIONS:
+            return 1
+        else:
+            raise ValueError(f"Unsupported file format: {file_ext}")
+
+    def page_fingerprints(self, file_path: str, original_filename: str = None) -> List[str]:
+        file_ext = self._file_extension(file_path, original_filename)
+
+        if file_ext == ".pdf":
+            return self._pdf_page_fingerprints(file_path)
+        elif file_ext == ".pptx":
+            return self._pptx_slide_fingerprints(file_path)
+        elif file_ext in SUPPORTED_EXTENSIONS:
+            digest = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            return [digest.hexdigest()]
+        else:
+            raise ValueError(f"Unsupported file format: {file_ext}")
+
+    def _pdf_page_fingerprints(self, pdf_path: str) -> List[str]:
+        from pypdf import PdfReader
+
+        fingerprints = []
+        for page in PdfReader(pdf_path).pages:
+            digest = hashlib.sha256()
+            contents = page.get_contents()
+            if contents is not None:
+                digest.update(contents.get_data())
+            resources = page.get("/Resources")
+            xobjects = resources.get_object().get("/XObject") if resources is not None else None
+            if xobjects is not None:
+                for name, xobject in sorted(xobjects.get_object().items()):
+                    digest.update(name.encode("utf-8"))
+                    digest.update(xobject.get_object().get_data())
+            fingerprints.append(digest.hexdigest())
+        return fingerprints
+
+    def _pptx_slide_fingerprints(self, pptx_path: str) -> List[str]:
+        from pptx import Presentation
+
+        fingerprints = []
+        for slide in Presentation(pptx_path).slides:
+            digest = hashlib.sha256(slide.part.blob)
+            for rel in sorted(slide.part.rels.values(), key=lambda rel: rel.rId):
+                if not rel.is_external:
+                    digest.update(rel.target_part.blob)
+            fingerprints.append(digest.hexdigest())
+        return fingerprints
+
+    def extract_pages(
+        self,
+        file_path: str,
+        original_filename: str = None,
+        first_page: int = 1,
+        last_page: Optional[int] = None
+    ) -> List[Tuple[int, str]]:
+        file_ext = self._file_extension(file_path, original_filename)
+        last_page = last_page or self.get_page_count(file_path, original_filename)
+
+        if file_ext == ".pdf":
+            return self._extract_pdf_pages(file_path, first_page, last_page)
+        elif file_ext == ".pptx":
+            return self._extract_pptx_slides(file_path, first_page, last_page)
+        elif file_ext == ".docx":
+            return [(1, self._extract_docx(file_path))]
+        elif file_ext in PLAIN_TEXT_EXTENSIONS:
+            return [(1, Path(file_path).read_text(encoding="utf-8", errors="replace"))]
+        elif file_ext in IMAGE_EXTENSIONS:
+            return [(1, ocr_service.extract_text_from_image(file_path))]
+        else:
+            raise ValueError(f"Unsupported file format: {file_ext}")
+
+    def extract_text(self, file_path: str, original_filename: str = None) -> str:
+        return "\n\n".join(text for _, text in self.extract_pages(file_path, original_filename))
+
+    def _extract_pdf_pages(self, pdf_path: str, first_page: int, last_page: int) -> List[Tuple[int, str]]:
+        from pypdf import PdfReader
+
+        reader = PdfReader(pdf_path)
+        pages = {}
+        for page_number in range(first_page, last_page + 1):
+            text = ""
+            if settings.TEXT_LAYER_ENABLED:
+                try:
+                    text = reader.pages[page_number - 1].extract_text() or ""
+                except Exception as e:
+                    logger.warning(f"Failed to read text layer of {pdf_path} page {page_number}: {e}")
+            pages[page_number] = text
+
+        needs_ocr = [
+            page_number for page_number, text in pages.items()
+            if not settings.TEXT_LAYER_ENABLED or not text_layer_is_usable(text)
+        ]
+        if needs_ocr:
+            pages.update(self._ocr_pdf_pages(pdf_path, needs_ocr))
+        return sorted(pages.items())
+
+    def _ocr_pdf_pages(self, pdf_path: str, page_numbers: List[int]) -> Dict[int, str]:
+        try:
+            return ocr_service.ocr_pdf_pages(pdf_path, page_numbers)
+        except Exception as e:
+            logger.warning(f"OCR failed for {pdf_path} pages {page_numbers}, keeping their text layer: {e}")
+            return {}
+
+    def _extract_pptx_slides(self, pptx_path: str, first_slide: int, last_slide: int) -> List[Tuple[int, str]]:
+        from pptx import Presentation
+
+        slides = Presentation(pptx_path).slides
+        pages = []
+        for slide_number in range(first_slide, last_slide + 1):
+            slide = slides[slide_number - 1]
+            blocks = []
+            for shape in slide.shapes:
+                if shape.has_text_frame and shape.text_frame.text.strip():
+                    blocks.append(shape.text_frame.text)
+                elif shape.has_table:
+                    rows = shape.table.rows
+                    blocks.append("\n".join(" | ".join(cell.text for cell in row.cells) for row in rows))
+            if slide.has_notes_slide and slide.notes_slide.notes_text_frame.text.strip():
+                blocks.append(slide.notes_slide.notes_text_frame.text)
+            pages.append((slide_number, "\n\n".join(blocks)))
+        return pages
+
+    def _extract_docx(self, docx_path: str) -> str:
+        with zipfile.ZipFile(docx_path) as archive:
+            root = ElementTree.fromstring(archive.read("word/document.xml"))
+
+        paragraphs = []
+        for paragraph in root.iter(f"{WORD_NAMESPACE}p"):
+            parts = []
+            for node in paragraph.iter():
+                if node.tag == f"{WORD_NAMESPACE}t" and node.text:
+                    parts.append(node.text)
+                elif node.tag == f"{WORD_NAMESPACE}tab":
+                    parts.append("\t")
+                elif node.tag in (f"{WORD_NAMESPACE}br", f"{WORD_NAMESPACE}cr"):
+                    parts.append("\n")
+            text = "".join(parts).strip()
+            if text:
+                paragraphs.append(text)
+        return "\n\n".join(paragraphs)
+
+
+extraction_service = ExtractionService()
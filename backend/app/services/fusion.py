@@ -0,0 +1,63 @@
+import logging
+from typing import Dict, List, Optional
+import numpy as np
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[Dict]],
+    k: int = None,
+    weights: Optional[List[float]] = None
+) -> List[Dict]:
+    if k is None:
+        k = settings.RRF_K
+    if weights is None:
+        weights = [1.0] * len(result_lists)
+
+    docs = []
+    groups = {}
+    first_index = []
+    inverse = []
+    ranks = []
+    list_weights = []
+    for results, weight in zip(result_lists, weights):
+        for rank, doc in enumerate(results, start=1):
+            key = doc.get("metadata", {}).get("chunk_id") or id(doc)
+            if key not in groups:
+                groups[key] = len(first_index)
+                first_index.append(len(docs))
+            inverse.append(groups[key])
+            docs.append(doc)
+            ranks.append(rank)
+            list_weights.append(weight)
+
+    if not docs:
+        return []
+
+    inverse = np.asarray(inverse, dtype=np.int64)
+
+    contributions = np.asarray(list_weights, dtype=np.float64) / (k + np.asarray(ranks, dtype=np.float64))
+    fused_scores = np.zeros(len(first_index), dtype=np.float64)
+    np.add.at(fused_scores, inverse, contributions)
+
+    similarities = np.asarray(
+        [doc.get("similarity_score", 0.0) for doc in docs],
+        dtype=np.float64
+    )
+    best_similarity = np.full(len(first_index), -np.inf)
+    np.maximum.at(best_similarity, inverse, similarities)
+
+    order = np.argsort(-fused_scores, kind="stable")
+
+    fused = []
+    for rank, idx in enumerate(order, start=1):
+        doc = dict(docs[first_index[idx]])
+        doc["similarity_score"] = float(best_similarity[idx])
+        doc["fusion_score"] = float(fused_scores[idx])
+        doc["rank"] = rank
+        fused.append(doc)
+
+    logger.debug(f"Fused {len(docs)} results from {len(result_lists)} lists into {len(fused)} unique documents")
+    return fused
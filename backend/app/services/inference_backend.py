@@ -0,0 +1,119 @@
+import logging
+from pathlib import Path
+from typing import Optional
+import torch
+from sentence_transformers import CrossEncoder, SentenceTransformer
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+
+def _device() -> str:
+    return settings.DEVICE if settings.DEVICE == "cuda" else "cpu"
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    backend = (backend or settings.INFERENCE_BACKEND).lower()
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported inference backend: {backend}. Choose one of {SUPPORTED_BACKENDS}")
+    if backend == "torch-int8" and _device() == "cuda":
+        logger.warning("Dynamic int8 quantization is CPU-only, using fp32 torch on CUDA")
+        return "torch"
+    return backend
+
+
+def _export_dir(model_name: str) -> Path:
+    return settings.MODELS_CACHE_DIR / "onnx" / model_name.replace("/", "__")
+
+
+def _quantized_file_name() -> str:
+    return f"onnx/model_qint8_{settings.ONNX_QUANTIZATION_CONFIG}.onnx"
+
+
+def _quantize_dynamic_int8(module: torch.nn.Module) -> torch.nn.Module:
+    return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _ensure_onnx_export(model_cls, model_name: str, quantized: bool) -> str:
+    export_dir = _export_dir(model_name)
+    file_name = _quantized_file_name() if quantized else "onnx/model.onnx"
+
+    if not (export_dir / "onnx" / "model.onnx").exists():
+        logger.info(f"Exporting {model_name} to ONNX at {export_dir}")
+        try:
+            model = model_cls(
+                model_name,
+                backend="onnx",
+                cache_folder=str(settings.MODELS_CACHE_DIR),
+                device="cpu"
+            )
+        except ImportError:
+            logger.error("ONNX backend requires optimum. Install with: pip install optimum[onnxruntime]")
+            raise
+        model.save_pretrained(str(export_dir))
+
+    if quantized and not (export_dir / file_name).exists():
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        logger.info(f"Quantizing ONNX export of {model_name} ({settings.ONNX_QUANTIZATION_CONFIG})")
+        model = model_cls(
+            str(export_dir),
+            backend="onnx",
+            device="cpu",
+            model_kwargs={"file_name": "onnx/model.onnx"}
+        )
+        export_dynamic_quantized_onnx_model(
+            model,
+            quantization_config=settings.ONNX_QUANTIZATION_CONFIG,
+            model_name_or_path=str(export_dir)
+        )
+
+    return file_name
+
+
+def load_sentence_transformer(model_name: str, backend: Optional[str] = None) -> SentenceTransformer:
+    backend = resolve_backend(backend)
+    logger.info(f"Loading sentence transformer {model_name} with {backend} backend")
+
+    if backend.startswith("onnx"):
+        file_name = _ensure_onnx_export(SentenceTransformer, model_name, quantized=backend == "onnx-int8")
+        return SentenceTransformer(
+            str(_export_dir(model_name)),
+            backend="onnx",
+            device=_device(),
+            model_kwargs={"file_name": file_name}
+        )
+
+    model = SentenceTransformer(
+        model_name,
+        cache_folder=str(settings.MODELS_CACHE_DIR),
+        device=_device()
+    )
+    if backend == "torch-int8":
+        model = _quantize_dynamic_int8(model)
+    return model
+
+
+def load_cross_encoder(model_name: str, backend: Optional[str] = None) -> CrossEncoder:
+    backend = resolve_backend(backend)
+    logger.info(f"Loading cross-encoder {model_name} with {backend} backend")
+
+    if backend.startswith("onnx"):
+        file_name = _ensure_onnx_export(CrossEncoder, model_name, quantized=backend == "onnx-int8")
+        return CrossEncoder(
+            str(_export_dir(model_name)),
+            backend="onnx",
+            device=_device(),
+            model_kwargs={"file_name": file_name}
+        )
+
+    model = CrossEncoder(
+        model_name,
+        cache_folder=str(settings.MODELS_CACHE_DIR),
+        device=_device()
+    )
+    if backend == "torch-int8":
+        model.model = _quantize_dynamic_int8(model.model)
+    return model
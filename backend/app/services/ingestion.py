@@ -0,0 +1,442 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+import numpy as np
+from app.core import settings
+from app.services.ingestion_tasks import chunk_pages, extract_pages, fingerprint_pages, init_worker
+from app.services.manifest import document_manifest
+from app.services.embedding import embedding_service
+from app.services.vector_store import vector_store_service
+from app.services.lexical_index import lexical_index_service
+from app.services.answer_cache import semantic_cache
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionQueueFull(Exception):
+    pass
+
+
+class IngestionJob:
+    def __init__(self, document_id: str, file_path: str, filename: str, file_hash: str, tenant: str):
+        self.document_id = document_id
+        self.file_path = file_path
+        self.filename = filename
+        self.file_hash = file_hash
+        self.tenant = tenant
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.page_hashes: Dict[int, str] = {}
+        self.num_groups = 0
+        self.groups_written = 0
+        self.pages_changed = 0
+        self.chunks_embedded = 0
+        self.chunks_reused = 0
+
+    @property
+    def failed(self) -> bool:
+        return self.status == "failed"
+
+
+class IngestionService:
+    def __init__(self):
+        self._jobs: Optional[asyncio.Queue] = None
+        self._embed_queue: Optional[asyncio.Queue] = None
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._ocr_slots: Optional[asyncio.Semaphore] = None
+        self._chunk_slots: Optional[asyncio.Semaphore] = None
+        self._ocr_pool: Optional[ProcessPoolExecutor] = None
+        self._chunk_pool: Optional[ProcessPoolExecutor] = None
+        self._embed_executor: Optional[ThreadPoolExecutor] = None
+        self._write_executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+        self._active_jobs: Dict[str, IngestionJob] = {}
+        self._jobs_completed = 0
+        self._jobs_failed = 0
+        self._jobs_rejected = 0
+        self._pages_processed = 0
+        self._pages_skipped = 0
+        self._chunks_written = 0
+        self._chunks_reused = 0
+        self._chunks_deleted = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        if self.running:
+            return
+
+        interrupted = await asyncio.to_thread(document_manifest.fail_processing, "Interrupted by a restart")
+        if interrupted:
+            logger.warning(f"Marked {interrupted} interrupted ingestion jobs as failed")
+
+        self._ocr_pool = self._create_pool(settings.INGESTION_OCR_WORKERS)
+        self._chunk_pool = self._create_pool(settings.INGESTION_CHUNK_WORKERS)
+        self._embed_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-embed")
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-write")
+
+        self._jobs = asyncio.Queue(maxsize=settings.INGESTION_MAX_QUEUED_JOBS)
+        self._embed_queue = asyncio.Queue(maxsize=settings.INGESTION_QUEUE_SIZE)
+        self._write_queue = asyncio.Queue(maxsize=settings.INGESTION_QUEUE_SIZE)
+        self._ocr_slots = asyncio.Semaphore(settings.INGESTION_OCR_WORKERS)
+        self._chunk_slots = asyncio.Semaphore(settings.INGESTION_CHUNK_WORKERS)
+
+        self._tasks = [
+            asyncio.create_task(self._job_worker(), name=f"ingest-job-{i}")
+            for i in range(settings.INGESTION_MAX_ACTIVE_DOCUMENTS)
+        ]
+        self._tasks.append(asyncio.create_task(self._embed_stage(), name="ingest-embed"))
+        self._tasks.append(asyncio.create_task(self._write_stage(), name="ingest-write"))
+        logger.info(
+            f"Ingestion workers started: {settings.INGESTION_OCR_WORKERS} OCR, "
+            f"{settings.INGESTION_CHUNK_WORKERS} chunking, {settings.INGESTION_MAX_ACTIVE_DOCUMENTS} active documents"
+        )
+
+    @staticmethod
+    def _create_pool(max_workers: int) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker
+        )
+
+    async def _run_in_pool(self, pool_attr: str, max_workers: int, func: Callable, *args):
+        pool = getattr(self, pool_attr)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+        except BrokenProcessPool:
+            if getattr(self, pool_attr) is pool:
+                logger.error(f"Ingestion worker died, restarting {pool_attr.strip('_')}")
+                pool.shutdown(wait=False, cancel_futures=True)
+                setattr(self, pool_attr, self._create_pool(max_workers))
+            raise
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        for executor in (self._ocr_pool, self._chunk_pool, self._embed_executor, self._write_executor):
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Ingestion workers stopped")
+
+    def is_full(self) -> bool:
+        return self._jobs is not None and self._jobs.full()
+
+    def submit(
+        self,
+        file_path: str,
+        document_id: str,
+        filename: str,
+        file_hash: str,
+        tenant: str = None
+    ) -> IngestionJob:
+        if not self.running:
+            raise RuntimeError("Ingestion service is not running")
+
+        job = IngestionJob(document_id, file_path, filename, file_hash, tenant or settings.DEFAULT_TENANT)
+        try:
+            self._jobs.put_nowait(job)
+        except asyncio.QueueFull:
+            self._jobs_rejected += 1
+            raise IngestionQueueFull(f"Ingestion queue is full ({self._jobs.maxsize} documents waiting)")
+        return job
+
+    async def _job_worker(self):
+        while True:
+            job = await self._jobs.get()
+            try:
+                await self._run_job(job)
+            except Exception as e:
+                await self._fail_job(job, e)
+
+    @staticmethod
+    def _pipeline_signature() -> str:
+        return (
+            f"{settings.EMBEDDING_MODEL}|{settings.CHUNK_SIZE}|{settings.CHUNK_OVERLAP}|"
+            f"{settings.TEXT_LAYER_ENABLED}"
+        )
+
+    @staticmethod
+    def _page_groups(page_numbers: List[int]) -> List[List[int]]:
+        groups = []
+        for page_number in page_numbers:
+            if (
+                groups
+                and page_number == groups[-1][1] + 1
+                and page_number - groups[-1][0] < settings.INGESTION_PAGES_PER_RENDER
+            ):
+                groups[-1][1] = page_number
+            else:
+                groups.append([page_number, page_number])
+        return groups
+
+    async def _run_job(self, job: IngestionJob):
+        job.status = "processing"
+        job.started_at = time.perf_counter()
+        self._active_jobs[job.document_id] = job
+        logger.info(f"Processing document: {job.filename}")
+
+        async with self._ocr_slots:
+            fingerprints = await self._run_in_pool(
+                "_ocr_pool", settings.INGESTION_OCR_WORKERS, fingerprint_pages, job.file_path, job.filename
+            )
+        if not fingerprints:
+            raise ValueError(f"{job.filename} has no pages")
+
+        signature = self._pipeline_signature()
+        job.page_hashes = {
+            page_number: hashlib.sha256(f"{fingerprint}|{signature}".encode("utf-8")).hexdigest()
+            for page_number, fingerprint in enumerate(fingerprints, start=1)
+        }
+        indexed = await asyncio.to_thread(document_manifest.get_page_hashes, job.document_id)
+        changed = [n for n, page_hash in job.page_hashes.items() if indexed.get(n) != page_hash]
+        removed = [n for n in indexed if n not in job.page_hashes]
+        job.pages_changed = len(changed)
+        self._pages_skipped += len(job.page_hashes) - len(changed)
+        logger.info(
+            f"{job.filename}: {len(changed)} of {len(job.page_hashes)} pages changed, {len(removed)} removed"
+        )
+
+        if removed:
+            await asyncio.get_running_loop().run_in_executor(
+                self._write_executor, self._delete_pages, job.document_id, job.tenant, removed
+            )
+
+        groups = self._page_groups(changed)
+        job.num_groups = len(groups)
+        if not groups:
+            await self._finalize_job(job)
+            return
+        pending = iter(groups)
+        workers = min(settings.INGESTION_OCR_WORKERS, len(groups))
+        await asyncio.gather(*(self._process_groups(job, pending) for _ in range(workers)))
+
+    async def _process_groups(self, job: IngestionJob, pending: Iterator[List[int]]):
+        for first_page, last_page in pending:
+            if job.failed:
+                return
+            await self._process_group(job, first_page, last_page)
+
+    async def _process_group(self, job: IngestionJob, first_page: int, last_page: int):
+        try:
+            async with self._ocr_slots:
+                if job.failed:
+                    return
+                pages = await self._run_in_pool(
+                    "_ocr_pool", settings.INGESTION_OCR_WORKERS,
+                    extract_pages, job.file_path, job.filename, first_page, last_page
+                )
+
+            async with self._chunk_slots:
+                if job.failed:
+                    return
+                chunks = await self._run_in_pool(
+                    "_chunk_pool", settings.INGESTION_CHUNK_WORKERS, chunk_pages, pages, job.document_id
+                )
+
+            page_numbers = range(first_page, last_page + 1)
+            indexed = await asyncio.to_thread(document_manifest.get_page_chunk_ids, job.document_id, page_numbers)
+        except Exception as e:
+            await self._fail_job(job, e)
+            return
+
+        indexed_ids = {chunk_id for chunk_ids in indexed.values() for chunk_id in chunk_ids}
+        page_chunk_ids = {page_number: [] for page_number in page_numbers}
+        for chunk in chunks:
+            page_chunk_ids[chunk["page_number"]].append(chunk["chunk_id"])
+        current_ids = {chunk["chunk_id"] for chunk in chunks}
+
+        await self._embed_queue.put({
+            "job": job,
+            "pages": {n: (job.page_hashes[n], page_chunk_ids[n]) for n in page_numbers},
+            "chunks": [chunk for chunk in chunks if chunk["chunk_id"] not in indexed_ids],
+            "stale_ids": sorted(indexed_ids - current_ids),
+            "num_reused": len(current_ids & indexed_ids)
+        })
+
+    async def _drain(self, source: asyncio.Queue, max_chunks: int) -> List[dict]:
+        items = [await source.get()]
+        num_chunks = len(items[0]["chunks"])
+        while num_chunks < max_chunks and not source.empty():
+            item = source.get_nowait()
+            items.append(item)
+            num_chunks += len(item["chunks"])
+        return [item for item in items if not item["job"].failed]
+
+    async def _embed_stage(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._drain(self._embed_queue, settings.INGESTION_EMBED_BATCH_SIZE)
+            texts = [chunk["text"] for item in items for chunk in item["chunks"]]
+
+            embeddings = None
+            try:
+                if texts:
+                    embeddings = await loop.run_in_executor(
+                        self._embed_executor, embedding_service.embed_texts, texts
+                    )
+            except Exception as e:
+                for job in {id(item["job"]): item["job"] for item in items}.values():
+                    await self._fail_job(job, e)
+                continue
+
+            offset = 0
+            for item in items:
+                num_chunks = len(item["chunks"])
+                item["embeddings"] = embeddings[offset:offset + num_chunks] if num_chunks else None
+                offset += num_chunks
+                await self._write_queue.put(item)
+
+    async def _write_stage(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._drain(self._write_queue, settings.INGESTION_FLUSH_CHUNKS)
+            if not items:
+                continue
+
+            jobs = list({id(item["job"]): item["job"] for item in items}.values())
+            try:
+                await loop.run_in_executor(self._write_executor, self._write_items, items)
+            except Exception as e:
+                for job in jobs:
+                    await self._fail_job(job, e)
+                continue
+
+            for item in items:
+                job = item["job"]
+                job.groups_written += 1
+                job.chunks_embedded += len(item["chunks"])
+                job.chunks_reused += item["num_reused"]
+                self._pages_processed += len(item["pages"])
+                self._chunks_written += len(item["chunks"])
+                self._chunks_reused += item["num_reused"]
+                self._chunks_deleted += len(item["stale_ids"])
+
+            for job in jobs:
+                if not job.failed and job.groups_written == job.num_groups:
+                    await self._finalize_job(job)
+
+    def _write_items(self, items: List[dict]):
+        new_items = [item for item in items if item["chunks"]]
+        stale_items = [item for item in items if item["stale_ids"]]
+
+        if new_items:
+            chunk_texts = []
+            metadata_list = []
+            chunk_ids = []
+            document_ids = []
+            for item in new_items:
+                job = item["job"]
+                for chunk in item["chunks"]:
+                    chunk_ids.append(chunk["chunk_id"])
+                    chunk_texts.append(chunk["text"])
+                    document_ids.append(job.document_id)
+                    metadata_list.append({
+                        "chunk_id": chunk["chunk_id"],
+                        "document_id": job.document_id,
+                        "filename": job.filename,
+                        "tenant": job.tenant,
+                        "chunk_index": chunk["chunk_index"],
+                        "page_number": chunk["page_number"],
+                        "token_count": chunk["token_count"]
+                    })
+            embeddings = np.vstack([item["embeddings"] for item in new_items])
+
+            vector_store_service.upsert_documents(
+                chunk_texts=chunk_texts,
+                embeddings=embeddings,
+                metadatas=metadata_list,
+                ids=chunk_ids
+            )
+            lexical_index_service.add_chunks(chunk_ids, chunk_texts, document_ids)
+
+        for item in stale_items:
+            vector_store_service.delete_chunks(item["stale_ids"], item["job"].document_id, item["job"].tenant)
+        if stale_items:
+            lexical_index_service.delete_chunks([chunk_id for item in stale_items for chunk_id in item["stale_ids"]])
+
+        for item in items:
+            document_manifest.replace_pages(item["job"].document_id, item["pages"])
+        for document_id in {item["job"].document_id for item in items}:
+            document_manifest.update_progress(document_id)
+
+        if new_items or stale_items:
+            semantic_cache.invalidate(f"updated {len(items)} page groups")
+
+    def _delete_pages(self, document_id: str, tenant: str, page_numbers: List[int]):
+        chunk_ids = document_manifest.delete_pages(document_id, page_numbers)
+        if chunk_ids:
+            vector_store_service.delete_chunks(chunk_ids, document_id, tenant)
+            lexical_index_service.delete_chunks(chunk_ids)
+            semantic_cache.invalidate(f"removed {len(page_numbers)} pages of document {document_id}")
+        document_manifest.update_progress(document_id)
+
+    def _finish_job(self, job: IngestionJob):
+        self._active_jobs.pop(job.document_id, None)
+        Path(job.file_path).unlink(missing_ok=True)
+
+    async def _finalize_job(self, job: IngestionJob):
+        await asyncio.to_thread(document_manifest.finish_document, job.document_id, "completed", job.file_hash)
+        document = await asyncio.to_thread(document_manifest.get_document, job.document_id)
+        if not document or not document["num_chunks"]:
+            await self._fail_job(job, ValueError(f"No text could be extracted from {job.filename}"))
+            return
+
+        job.status = "completed"
+        self._jobs_completed += 1
+        self._finish_job(job)
+        elapsed = time.perf_counter() - job.started_at
+        logger.info(
+            f"Successfully processed {job.filename}: {job.pages_changed} of {document['num_pages']} pages "
+            f"changed, {job.chunks_embedded} chunks embedded, {job.chunks_reused} reused, "
+            f"{document['num_chunks']} indexed, in {elapsed:.1f}s"
+        )
+
+    async def _fail_job(self, job: IngestionJob, error: Exception):
+        if job.failed:
+            return
+        job.status = "failed"
+        job.error = str(error)
+        self._jobs_failed += 1
+        logger.error(f"Failed to process document {job.filename}: {error}")
+
+        try:
+            await asyncio.to_thread(document_manifest.finish_document, job.document_id, "failed", None, job.error)
+        except Exception as e:
+            logger.error(f"Failed to record failure of document {job.document_id}: {e}")
+        self._finish_job(job)
+
+    def get_stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued_jobs": self._jobs.qsize() if self._jobs else 0,
+            "max_queued_jobs": settings.INGESTION_MAX_QUEUED_JOBS,
+            "active_jobs": len(self._active_jobs),
+            "embed_queue_depth": self._embed_queue.qsize() if self._embed_queue else 0,
+            "write_queue_depth": self._write_queue.qsize() if self._write_queue else 0,
+            "ocr_workers": settings.INGESTION_OCR_WORKERS,
+            "chunk_workers": settings.INGESTION_CHUNK_WORKERS,
+            "jobs_completed": self._jobs_completed,
+            "jobs_failed": self._jobs_failed,
+            "jobs_rejected": self._jobs_rejected,
+            "pages_processed": self._pages_processed,
+            "pages_skipped": self._pages_skipped,
+            "chunks_written": self._chunks_written,
+            "chunks_reused": self._chunks_reused,
+            "chunks_deleted": self._chunks_deleted,
+        }
+
+
+ingestion_service = IngestionService()
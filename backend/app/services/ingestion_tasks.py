@@ -0,0 +1,43 @@
+import hashlib
+import logging
+import os
+from typing import List, Tuple
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+def init_worker():
+    if settings.INGESTION_WORKER_NICENESS:
+        try:
+            os.nice(settings.INGESTION_WORKER_NICENESS)
+        except OSError as e:
+            logger.warning(f"Could not lower ingestion worker priority: {e}")
+
+
+def make_chunk_id(document_id: str, page_number: int, chunk_index: int, text: str) -> str:
+    key = f"{document_id}\0{page_number}\0{chunk_index}\0{text}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def fingerprint_pages(file_path: str, filename: str) -> List[str]:
+    from app.services.extraction_service import extraction_service
+
+    return extraction_service.page_fingerprints(file_path, filename)
+
+
+def extract_pages(file_path: str, filename: str, first_page: int, last_page: int) -> List[Tuple[int, str]]:
+    from app.services.extraction_service import extraction_service
+
+    return extraction_service.extract_pages(file_path, filename, first_page, last_page)
+
+
+def chunk_pages(pages: List[Tuple[int, str]], document_id: str) -> List[dict]:
+    from app.services.chunking import chunking_service
+
+    chunks = []
+    for page_number, text in pages:
+        for chunk in chunking_service.chunk_text(text, document_id, page_number=page_number):
+            chunk["chunk_id"] = make_chunk_id(document_id, page_number, chunk["chunk_index"], chunk["text"])
+            chunks.append(chunk)
+    return chunks
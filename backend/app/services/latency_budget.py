@@ -0,0 +1,74 @@
+import threading
+import time
+from typing import Dict, Optional
+from app.core import settings
+
+DEFAULT_COSTS_MS = {
+    "rewrite": 800.0,
+    "search": 30.0,
+    "rerank_candidate": 5.0,
+}
+EWMA_ALPHA = 0.2
+
+
+class LatencyModel:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._estimates = dict(DEFAULT_COSTS_MS)
+        self._samples = {stage: 0 for stage in DEFAULT_COSTS_MS}
+
+    def observe(self, stage: str, elapsed_ms: float, units: int = 1):
+        if units <= 0:
+            return
+        per_unit = elapsed_ms / units
+        with self._lock:
+            if self._samples[stage] == 0:
+                self._estimates[stage] = per_unit
+            else:
+                self._estimates[stage] += EWMA_ALPHA * (per_unit - self._estimates[stage])
+            self._samples[stage] += 1
+
+    def estimate(self, stage: str) -> float:
+        return self._estimates[stage]
+
+    def rerank_ms(self, num_candidates: int) -> float:
+        return self.estimate("rerank_candidate") * num_candidates
+
+    def can_afford_rewrite(self, remaining_ms: float, rerank_top_k: int) -> bool:
+        return remaining_ms >= self.estimate("rewrite") + self.estimate("search") + self.rerank_ms(rerank_top_k)
+
+    def affordable_variants(self, remaining_ms: float, requested: int, rerank_top_k: int) -> int:
+        available = remaining_ms - self.rerank_ms(rerank_top_k)
+        return max(1, min(requested, int(available // max(self.estimate("search"), 1e-3))))
+
+    def affordable_candidates(self, remaining_ms: float, num_queries: int = 0) -> int:
+        available = remaining_ms - self.estimate("search") * num_queries
+        return max(0, int(available // max(self.estimate("rerank_candidate"), 1e-3)))
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                stage: {"estimate_ms": self._estimates[stage], "samples": self._samples[stage]}
+                for stage in self._estimates
+            }
+
+
+class LatencyBudget:
+    def __init__(self, budget_ms: Optional[float], start_time: Optional[float] = None):
+        self.budget_ms = budget_ms
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_ms is not None
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start_time) * 1000
+
+    def remaining_ms(self) -> float:
+        if self.budget_ms is None:
+            return float("inf")
+        return self.budget_ms - settings.LATENCY_BUDGET_RESERVE_MS - self.elapsed_ms()
+
+
+latency_model = LatencyModel()
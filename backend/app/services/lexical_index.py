@@ -0,0 +1,490 @@
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app.core import settings
+from app.services.lexical_scoring import tokenize
+
+logger = logging.getLogger(__name__)
+
+ID_DTYPE = "S64"
+MAX_TERM_BYTES = 64
+
+
+def _term_counts(text: str) -> Dict[str, int]:
+    return {
+        term: count
+        for term, count in Counter(tokenize(text)).items()
+        if len(term.encode("utf-8")) <= MAX_TERM_BYTES
+    }
+
+
+class _Segment:
+    def __init__(self, path: Optional[Path]):
+        if path is not None and (path / "terms.npy").exists():
+            self.terms = np.load(path / "terms.npy", mmap_mode="r")
+            self.offsets = np.load(path / "offsets.npy", mmap_mode="r")
+            self.postings_docs = np.load(path / "postings_docs.npy", mmap_mode="r")
+            self.postings_tfs = np.load(path / "postings_tfs.npy", mmap_mode="r")
+            self.doc_lengths = np.load(path / "doc_lengths.npy", mmap_mode="r")
+            self.chunk_ids = np.load(path / "chunk_ids.npy", mmap_mode="r")
+            self.document_ids = np.load(path / "document_ids.npy", mmap_mode="r")
+        else:
+            self.terms = np.zeros(0, dtype=f"S{MAX_TERM_BYTES}")
+            self.offsets = np.zeros(1, dtype=np.int64)
+            self.postings_docs = np.zeros(0, dtype=np.int32)
+            self.postings_tfs = np.zeros(0, dtype=np.uint16)
+            self.doc_lengths = np.zeros(0, dtype=np.int32)
+            self.chunk_ids = np.zeros(0, dtype=ID_DTYPE)
+            self.document_ids = np.zeros(0, dtype=ID_DTYPE)
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.doc_lengths)
+
+    def postings(self, term: bytes) -> Tuple[np.ndarray, np.ndarray]:
+        idx = int(np.searchsorted(self.terms, term))
+        if idx >= len(self.terms) or self.terms[idx] != term:
+            return self.postings_docs[:0], self.postings_tfs[:0]
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return self.postings_docs[start:end], self.postings_tfs[start:end]
+
+    @staticmethod
+    def write(
+        path: Path,
+        term_postings: Dict[bytes, Tuple[np.ndarray, np.ndarray]],
+        doc_lengths: np.ndarray,
+        chunk_ids: np.ndarray,
+        document_ids: np.ndarray
+    ):
+        path.mkdir(parents=True, exist_ok=True)
+        terms = sorted(term_postings.keys())
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(term_postings[term][0])
+
+        postings_docs = np.empty(int(offsets[-1]), dtype=np.int32)
+        postings_tfs = np.empty(int(offsets[-1]), dtype=np.uint16)
+        for i, term in enumerate(terms):
+            docs, tfs = term_postings[term]
+            postings_docs[offsets[i]:offsets[i + 1]] = docs
+            postings_tfs[offsets[i]:offsets[i + 1]] = tfs
+
+        np.save(path / "terms.npy", np.asarray(terms, dtype=f"S{MAX_TERM_BYTES}"))
+        np.save(path / "offsets.npy", offsets)
+        np.save(path / "postings_docs.npy", postings_docs)
+        np.save(path / "postings_tfs.npy", postings_tfs)
+        np.save(path / "doc_lengths.npy", doc_lengths.astype(np.int32))
+        np.save(path / "chunk_ids.npy", chunk_ids.astype(ID_DTYPE))
+        np.save(path / "document_ids.npy", document_ids.astype(ID_DTYPE))
+
+
+class LexicalIndexService:
+    def __init__(self):
+        self.index_dir = settings.LEXICAL_INDEX_PATH
+        self.k1 = settings.BM25_K1
+        self.b = settings.BM25_B
+        self.compact_threshold = settings.LEXICAL_INDEX_COMPACT_THRESHOLD
+        self._lock = threading.RLock()
+        self._log = None
+        self._compacting = False
+        self._initialize_index()
+
+    def _base_dir(self, generation: int) -> Path:
+        return self.index_dir / f"base-{generation}"
+
+    def _log_path(self, generation: int) -> Path:
+        return self.index_dir / f"delta-{generation}.jsonl"
+
+    def _initialize_index(self):
+        logger.info(f"Initializing lexical index at {self.index_dir}")
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            current = self.index_dir / "CURRENT"
+            self._generation = int(current.read_text().strip()) if current.exists() else 0
+            self._base = _Segment(self._base_dir(self._generation))
+
+            self._delta_chunk_ids: List[str] = []
+            self._delta_document_ids: List[str] = []
+            self._delta_lengths: List[int] = []
+            self._delta_positions: Dict[str, List[int]] = {}
+            self._delta_postings: Dict[bytes, List[Tuple[int, int]]] = {}
+            self._tombstones = set()
+            self._live_docs = self._base.num_docs
+            self._live_length = int(np.sum(self._base.doc_lengths, dtype=np.int64))
+
+            self._log_generation = self._generation
+            self._replay_log(self._generation)
+            while self._log_path(self._log_generation + 1).exists():
+                self._log_generation += 1
+                logger.warning("Replaying lexical index log left by an unfinished compaction")
+                self._replay_log(self._log_generation)
+            self._log = open(self._log_path(self._log_generation), "a", encoding="utf-8")
+            logger.info(
+                f"Lexical index loaded: {self._live_docs} live chunks "
+                f"({self._base.num_docs} in base segment, {len(self._delta_chunk_ids)} in delta)"
+            )
+        except Exception as e:
+            logger.error(f"Failed to initialize lexical index: {e}")
+            raise
+
+    def _replay_log(self, generation: int):
+        log_path = self._log_path(generation)
+        if not log_path.exists():
+            return
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping truncated lexical index log entry")
+                    continue
+                if entry["op"] == "add":
+                    self._apply_add(entry["chunk_id"], entry["document_id"], entry["terms"])
+                elif entry["op"] == "delete":
+                    self._apply_delete(entry.get("document_id"), entry.get("chunk_ids"))
+
+    def _write_log(self, entries: List[Dict]):
+        self._log.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        self._log.flush()
+        os.fsync(self._log.fileno())
+
+    @property
+    def _num_docs(self) -> int:
+        return self._base.num_docs + len(self._delta_chunk_ids)
+
+    def _apply_add(self, chunk_id: str, document_id: str, terms: Dict[str, int]):
+        local_idx = len(self._delta_chunk_ids)
+        length = sum(terms.values())
+        self._delta_chunk_ids.append(chunk_id)
+        self._delta_document_ids.append(document_id)
+        self._delta_lengths.append(length)
+        self._delta_positions.setdefault(chunk_id, []).append(local_idx)
+        for term, tf in terms.items():
+            self._delta_postings.setdefault(term.encode("utf-8"), []).append((local_idx, tf))
+        self._live_docs += 1
+        self._live_length += length
+
+    def _apply_delete(self, document_id: Optional[str] = None, chunk_ids: Optional[List[str]] = None) -> int:
+        base_n = self._base.num_docs
+        if document_id is not None:
+            base_hits = np.nonzero(self._base.document_ids == document_id.encode("utf-8"))[0]
+            delta_hits = [i for i, doc_id in enumerate(self._delta_document_ids) if doc_id == document_id]
+        else:
+            wanted = set(chunk_ids or [])
+            base_hits = np.nonzero(np.isin(self._base.chunk_ids, [c.encode("utf-8") for c in wanted]))[0]
+            delta_hits = [i for chunk_id in wanted for i in self._delta_positions.get(chunk_id, [])]
+
+        removed = 0
+        for idx in base_hits.tolist():
+            if idx not in self._tombstones:
+                self._tombstones.add(idx)
+                self._live_docs -= 1
+                self._live_length -= int(self._base.doc_lengths[idx])
+                removed += 1
+        for local_idx in delta_hits:
+            idx = base_n + local_idx
+            if idx not in self._tombstones:
+                self._tombstones.add(idx)
+                self._live_docs -= 1
+                self._live_length -= self._delta_lengths[local_idx]
+                removed += 1
+        return removed
+
+    def add_chunks(self, chunk_ids: List[str], texts: List[str], document_ids: List[str]):
+        try:
+            with self._lock:
+                self._add_unlocked(list(zip(chunk_ids, texts, document_ids)))
+                compact = len(self._delta_chunk_ids) >= self.compact_threshold
+            if compact:
+                self._compact()
+            logger.info(f"Added {len(chunk_ids)} chunks to lexical index")
+        except Exception as e:
+            logger.error(f"Failed to add chunks to lexical index: {e}")
+            raise
+
+    def delete_document(self, document_id: str) -> int:
+        try:
+            with self._lock:
+                self._write_log([{"op": "delete", "document_id": document_id}])
+                removed = self._apply_delete(document_id=document_id)
+                compact = self._needs_tombstone_compaction()
+            if compact:
+                self._compact()
+            logger.info(f"Deleted {removed} chunks of document {document_id} from lexical index")
+            return removed
+        except Exception as e:
+            logger.error(f"Failed to delete document {document_id} from lexical index: {e}")
+            raise
+
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        try:
+            with self._lock:
+                self._write_log([{"op": "delete", "chunk_ids": list(chunk_ids)}])
+                removed = self._apply_delete(chunk_ids=chunk_ids)
+                compact = self._needs_tombstone_compaction()
+            if compact:
+                self._compact()
+            logger.debug(f"Deleted {removed} chunks from lexical index")
+            return removed
+        except Exception as e:
+            logger.error(f"Failed to delete chunks from lexical index: {e}")
+            raise
+
+    def _needs_tombstone_compaction(self) -> bool:
+        return bool(self._tombstones) and len(self._tombstones) >= max(self.compact_threshold, self._num_docs // 4)
+
+    def _doc_lengths(self, docs: np.ndarray) -> np.ndarray:
+        base_n = self._base.num_docs
+        lengths = np.empty(len(docs), dtype=np.float32)
+        in_base = docs < base_n
+        lengths[in_base] = self._base.doc_lengths[docs[in_base]]
+        if not in_base.all():
+            delta_lengths = np.asarray(self._delta_lengths, dtype=np.float32)
+            lengths[~in_base] = delta_lengths[docs[~in_base] - base_n]
+        return lengths
+
+    def _term_postings(self, term: bytes) -> Tuple[np.ndarray, np.ndarray]:
+        base_docs, base_tfs = self._base.postings(term)
+        delta = self._delta_postings.get(term)
+        if not delta:
+            return np.asarray(base_docs, dtype=np.int64), np.asarray(base_tfs, dtype=np.float32)
+        delta_arr = np.asarray(delta, dtype=np.int64)
+        docs = np.concatenate([np.asarray(base_docs, dtype=np.int64), delta_arr[:, 0] + self._base.num_docs])
+        tfs = np.concatenate([np.asarray(base_tfs, dtype=np.float32), delta_arr[:, 1].astype(np.float32)])
+        return docs, tfs
+
+    def _chunk_id(self, idx: int) -> str:
+        if idx < self._base.num_docs:
+            return self._base.chunk_ids[idx].decode("utf-8")
+        return self._delta_chunk_ids[idx - self._base.num_docs]
+
+    def _excluded(self, document_ids: List[str]) -> np.ndarray:
+        wanted = set(document_ids)
+        allowed = np.concatenate([
+            np.isin(self._base.document_ids, [document_id.encode("utf-8") for document_id in wanted]),
+            np.fromiter((doc_id in wanted for doc_id in self._delta_document_ids), dtype=bool)
+        ])
+        return ~allowed
+
+    def search(
+        self,
+        query: str,
+        top_k: int = None,
+        document_ids: Optional[List[str]] = None
+    ) -> List[Tuple[str, float]]:
+        if top_k is None:
+            top_k = settings.LEXICAL_TOP_K
+
+        terms = {term.encode("utf-8") for term in _term_counts(query)}
+        with self._lock:
+            if not terms or self._live_docs == 0:
+                return []
+
+            if document_ids is not None and not document_ids:
+                return []
+
+            avg_length = self._live_length / self._live_docs if self._live_docs else 1.0
+            scores = np.zeros(self._num_docs, dtype=np.float32)
+            dead = np.fromiter(self._tombstones, dtype=np.int64) if self._tombstones else None
+
+            for term in terms:
+                docs, tfs = self._term_postings(term)
+                if dead is not None:
+                    alive = ~np.isin(docs, dead)
+                    docs, tfs = docs[alive], tfs[alive]
+                if len(docs) == 0:
+                    continue
+                doc_freq = len(docs)
+                idf = math.log(1 + (self._live_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths(docs) / avg_length)
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+            if document_ids is not None:
+                scores[self._excluded(document_ids)] = 0
+
+            candidates = np.nonzero(scores > 0)[0]
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+            return [(self._chunk_id(int(idx)), float(scores[idx])) for idx in candidates]
+
+    def search_batch(
+        self,
+        queries: List[str],
+        top_k: int = None,
+        document_ids: Optional[List[str]] = None
+    ) -> List[List[Tuple[str, float]]]:
+        return [self.search(query, top_k=top_k, document_ids=document_ids) for query in queries]
+
+    def _begin_compaction(self) -> Dict:
+        logger.info(
+            f"Compacting lexical index: {self._base.num_docs} base + {len(self._delta_chunk_ids)} delta chunks, "
+            f"{len(self._tombstones)} tombstones"
+        )
+        self._compacting = True
+        snapshot = {
+            "generation": self._log_generation + 1,
+            "base": self._base,
+            "delta_chunk_ids": list(self._delta_chunk_ids),
+            "delta_document_ids": list(self._delta_document_ids),
+            "delta_lengths": list(self._delta_lengths),
+            "delta_postings": dict(self._delta_postings),
+            "tombstones": set(self._tombstones),
+        }
+        self._log.close()
+        self._log_generation = snapshot["generation"]
+        self._log = open(self._log_path(self._log_generation), "a", encoding="utf-8")
+        return snapshot
+
+    def _write_base(self, snapshot: Dict):
+        base = snapshot["base"]
+        base_n = base.num_docs
+        num_delta = len(snapshot["delta_chunk_ids"])
+        live = np.ones(base_n + num_delta, dtype=bool)
+        if snapshot["tombstones"]:
+            live[np.fromiter(snapshot["tombstones"], dtype=np.int64)] = False
+        remap = np.cumsum(live) - 1
+
+        doc_lengths = np.concatenate([
+            np.asarray(base.doc_lengths, dtype=np.int32),
+            np.asarray(snapshot["delta_lengths"], dtype=np.int32)
+        ])[live]
+        chunk_ids = np.concatenate([
+            np.asarray(base.chunk_ids),
+            np.asarray(snapshot["delta_chunk_ids"], dtype=ID_DTYPE)
+        ])[live]
+        document_ids = np.concatenate([
+            np.asarray(base.document_ids),
+            np.asarray(snapshot["delta_document_ids"], dtype=ID_DTYPE)
+        ])[live]
+
+        term_postings = {}
+        all_terms = set(snapshot["delta_postings"].keys())
+        all_terms.update(bytes(term) for term in base.terms)
+        for term in all_terms:
+            base_docs, base_tfs = base.postings(term)
+            delta = [posting for posting in snapshot["delta_postings"].get(term, ()) if posting[0] < num_delta]
+            delta_arr = np.asarray(delta, dtype=np.int64).reshape(-1, 2)
+            docs = np.concatenate([np.asarray(base_docs, dtype=np.int64), delta_arr[:, 0] + base_n])
+            tfs = np.concatenate([np.asarray(base_tfs, dtype=np.int64), delta_arr[:, 1]])
+            keep = live[docs]
+            if keep.any():
+                term_postings[term] = (
+                    remap[docs[keep]].astype(np.int32),
+                    np.minimum(tfs[keep], np.iinfo(np.uint16).max).astype(np.uint16)
+                )
+
+        target = self._base_dir(snapshot["generation"])
+        tmp_dir = self.index_dir / f"{target.name}.tmp"
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        _Segment.write(tmp_dir, term_postings, doc_lengths, chunk_ids, document_ids)
+        if target.exists():
+            shutil.rmtree(target)
+        os.replace(tmp_dir, target)
+
+    def _finish_compaction(self, new_generation: int):
+        current_tmp = self.index_dir / "CURRENT.tmp"
+        current_tmp.write_text(str(new_generation))
+        os.replace(current_tmp, self.index_dir / "CURRENT")
+
+        old_generation = self._generation
+        self._log.close()
+        self._compacting = False
+        self._initialize_index()
+        for generation in range(old_generation, new_generation):
+            shutil.rmtree(self._base_dir(generation), ignore_errors=True)
+            self._log_path(generation).unlink(missing_ok=True)
+
+    def _compact(self):
+        with self._lock:
+            if self._compacting:
+                return
+            snapshot = self._begin_compaction()
+        try:
+            self._write_base(snapshot)
+        except Exception:
+            with self._lock:
+                self._compacting = False
+            raise
+        with self._lock:
+            self._finish_compaction(snapshot["generation"])
+
+    def compact(self):
+        self._compact()
+
+    def bulk_load(self, chunks: Iterable[Tuple[str, str, str]], batch_size: int = 1000):
+        logger.info("Bulk loading lexical index")
+        with self._lock:
+            batch = []
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    self._add_unlocked(batch)
+                    batch = []
+            if batch:
+                self._add_unlocked(batch)
+        self._compact()
+
+    def _live_chunk_ids(self, chunk_ids: List[str]) -> List[str]:
+        base_n = self._base.num_docs
+        live = [
+            chunk_id for chunk_id in chunk_ids
+            if any(base_n + i not in self._tombstones for i in self._delta_positions.get(chunk_id, []))
+        ]
+        if base_n:
+            base_hits = np.nonzero(np.isin(self._base.chunk_ids, [c.encode("utf-8") for c in chunk_ids]))[0]
+            live.extend(
+                self._base.chunk_ids[idx].decode("utf-8") for idx in base_hits.tolist() if idx not in self._tombstones
+            )
+        return list(dict.fromkeys(live))
+
+    def _add_unlocked(self, chunks: List[Tuple[str, str, str]]):
+        latest = {chunk_id: (text, document_id) for chunk_id, text, document_id in chunks}
+        existing = self._live_chunk_ids(list(latest))
+        entries = [
+            {"op": "add", "chunk_id": chunk_id, "document_id": document_id, "terms": _term_counts(text)}
+            for chunk_id, (text, document_id) in latest.items()
+        ]
+        self._write_log(([{"op": "delete", "chunk_ids": existing}] if existing else []) + entries)
+        if existing:
+            self._apply_delete(chunk_ids=existing)
+        for entry in entries:
+            self._apply_add(entry["chunk_id"], entry["document_id"], entry["terms"])
+
+    def ensure_built(self, vector_store) -> bool:
+        with self._lock:
+            if self._num_docs > 0:
+                return False
+        total_chunks = vector_store.get_collection_stats().get("total_chunks", 0)
+        if not total_chunks:
+            return False
+
+        logger.info(f"Lexical index is empty, building it from {total_chunks} chunks in the vector store")
+        self.bulk_load(
+            (chunk_id, text, metadata.get("document_id", ""))
+            for chunk_id, text, metadata in vector_store.iter_documents()
+        )
+        return True
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "live_chunks": self._live_docs,
+                "base_chunks": self._base.num_docs,
+                "delta_chunks": len(self._delta_chunk_ids),
+                "tombstones": len(self._tombstones),
+                "terms": len(self._base.terms),
+                "generation": self._generation,
+            }
+
+
+lexical_index_service = LexicalIndexService()
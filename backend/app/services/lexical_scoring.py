@@ -0,0 +1,43 @@
+import math
+import re
+from collections import Counter
+from typing import List
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if any(sep in token for sep in "-_./"):
+            tokens.extend(part for part in re.split(r"[-_./]", token) if part)
+    return tokens
+
+
+def bm25_scores(
+    query: str,
+    texts: List[str],
+    k1: float = 1.2,
+    b: float = 0.75
+) -> np.ndarray:
+    query_terms = set(tokenize(query))
+    scores = np.zeros(len(texts), dtype=np.float32)
+    if not query_terms or not texts:
+        return scores
+
+    term_counts = [Counter(tokenize(text)) for text in texts]
+    doc_lengths = np.asarray([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+    avg_length = float(doc_lengths.mean()) or 1.0
+    num_docs = len(texts)
+
+    for term in query_terms:
+        tfs = np.asarray([counts.get(term, 0) for counts in term_counts], dtype=np.float32)
+        doc_freq = int(np.count_nonzero(tfs))
+        if doc_freq == 0:
+            continue
+        idf = math.log(1 + (num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        scores += idf * tfs * (k1 + 1) / (tfs + k1 * (1 - b + b * doc_lengths / avg_length))
+
+    return scores
@@ -0,0 +1,340 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, List
+import httpx
+import numpy as np
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
+from app.core import settings
+from app.services.lru_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, RateLimitError, InternalServerError, asyncio.TimeoutError)
+
+
+class LLMService:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_client: Optional[AsyncOpenAI] = None
+        self.query_rewriter_model = settings.OPENAI_MODEL_QUERY_REWRITER
+        self.generator_model = settings.OPENAI_MODEL_GENERATOR
+        self.rewrite_cache = TTLCache(
+            name="query_rewrites",
+            max_entries=settings.QUERY_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS,
+            persist_path=settings.MODELS_CACHE_DIR / "query_cache.sqlite3" if settings.QUERY_CACHE_PERSIST else None,
+            max_disk_entries=settings.QUERY_CACHE_DISK_MAX_ENTRIES
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._rewrite_latencies = deque(maxlen=settings.LLM_HEDGE_WINDOW)
+        self._stats = {
+            "calls": 0,
+            "failures": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "hedges_launched": 0,
+            "hedges_won": 0,
+            "in_flight": 0,
+        }
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        self._loop = loop
+        self._async_client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL or None,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS
+                ),
+                timeout=httpx.Timeout(
+                    settings.LLM_GENERATE_TIMEOUT_SECONDS,
+                    connect=settings.LLM_CONNECT_TIMEOUT_SECONDS
+                )
+            ),
+            max_retries=0
+        )
+        self._slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        self._bind_loop()
+        return self._async_client
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        self._bind_loop()
+        return self._slots
+
+    @staticmethod
+    def _backoff(attempt: int, error: Exception) -> float:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+        cap = min(settings.LLM_RETRY_MAX_DELAY_SECONDS, settings.LLM_RETRY_BASE_DELAY_SECONDS * 2 ** attempt)
+        delay = random.uniform(0, cap)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    async def _call(
+        self,
+        name: str,
+        request: Callable[[], Awaitable[Any]],
+        timeout_seconds: float,
+        acquire_slot: bool = True
+    ) -> Any:
+        deadline = time.monotonic() + timeout_seconds
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                if acquire_slot:
+                    async with self.slots:
+                        return await self._attempt(request, deadline)
+                return await self._attempt(request, deadline)
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, (asyncio.TimeoutError, APITimeoutError)):
+                    self._stats["timeouts"] += 1
+                delay = self._backoff(attempt, e)
+                if attempt >= settings.LLM_MAX_RETRIES or time.monotonic() + delay >= deadline:
+                    self._stats["failures"] += 1
+                    raise
+                attempt += 1
+                self._stats["retries"] += 1
+                logger.warning(f"{name} failed ({type(e).__name__}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            except Exception:
+                self._stats["failures"] += 1
+                raise
+
+    async def _attempt(self, request: Callable[[], Awaitable[Any]], deadline: float) -> Any:
+        self._stats["calls"] += 1
+        self._stats["in_flight"] += 1
+        try:
+            return await asyncio.wait_for(request(), timeout=deadline - time.monotonic())
+        finally:
+            self._stats["in_flight"] -= 1
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not settings.LLM_REWRITE_HEDGING_ENABLED:
+            return None
+        if len(self._rewrite_latencies) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return settings.LLM_HEDGE_MIN_DELAY_MS / 1000
+        p95 = float(np.percentile(self._rewrite_latencies, 95))
+        return max(p95, settings.LLM_HEDGE_MIN_DELAY_MS / 1000)
+
+    async def _hedged(self, request: Callable[[], Awaitable[Any]], delay: Optional[float]) -> Any:
+        primary = asyncio.ensure_future(request())
+        if delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self._stats["hedges_launched"] += 1
+        hedge = asyncio.ensure_future(request())
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._stats["hedges_won"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def rewrite_query(self, query: str) -> dict:
+        cache_key = TTLCache.make_key(query, self.query_rewriter_model)
+        cached = self.rewrite_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Query rewrite served from cache")
+            return {**cached, "cached": True}
+
+        async def request():
+            return await self._call(
+                "Query rewrite",
+                lambda: self.async_client.chat.completions.create(
+                    model=self.query_rewriter_model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": (
+                                "You are a query optimization assistant. "
+                                "Analyze if the user's query is complex, vague, or would benefit from being broken down into multiple queries. "
+                                "Respond with a JSON object containing: "
+                                '{"should_rewrite": boolean, "rewritten_queries": [list of rewrites] or null}'
+                            )
+                        },
+                        {
+                            "role": "user",
+                            "content": f"Query: {query}"
+                        }
+                    ],
+                    temperature=0.1,
+                    max_tokens=200
+                ),
+                settings.LLM_REWRITE_TIMEOUT_SECONDS
+            )
+
+        try:
+            start = time.perf_counter()
+            response = await self._hedged(request, self._hedge_delay())
+            self._rewrite_latencies.append(time.perf_counter() - start)
+
+            content = response.choices[0].message.content
+            logger.debug(f"Query rewrite response: {content}")
+
+            try:
+                result = json.loads(content)
+                self.rewrite_cache.set(cache_key, result)
+                return dict(result)
+            except json.JSONDecodeError:
+                return {"should_rewrite": False, "rewritten_queries": None, "failed": True}
+
+        except Exception as e:
+            logger.error(f"Failed to rewrite query: {e}")
+            return {"should_rewrite": False, "rewritten_queries": None, "failed": True}
+
+    def _generation_messages(
+        self,
+        query: str,
+        contexts: List[str],
+        use_inline_citations: bool = True
+    ) -> List[Dict[str, str]]:
+        context_str = "\n\n".join(
+            [f"[{i+1}] {context}" for i, context in enumerate(contexts)]
+        )
+
+        system_prompt = (
+            "You are a helpful assistant that answers questions based on provided contexts. "
+            "Provide accurate, concise answers grounded in the contexts provided. "
+        )
+
+        if use_inline_citations:
+            system_prompt += (
+                "When referencing information from a context, use inline citations like [1], [2], etc. "
+                "to indicate which context the information comes from."
+            )
+
+        return [
+            {
+                "role": "system",
+                "content": system_prompt
+            },
+            {
+                "role": "user",
+                "content": f"Contexts:\n{context_str}\n\nQuestion: {query}"
+            }
+        ]
+
+    async def generate_response(
+        self,
+        query: str,
+        contexts: List[str],
+        use_inline_citations: bool = True
+    ) -> str:
+        try:
+            response = await self._call(
+                "Response generation",
+                lambda: self.async_client.chat.completions.create(
+                    model=self.generator_model,
+                    messages=self._generation_messages(query, contexts, use_inline_citations),
+                    temperature=0.3,
+                    max_tokens=1000
+                ),
+                settings.LLM_GENERATE_TIMEOUT_SECONDS
+            )
+
+            answer = response.choices[0].message.content
+            logger.debug(f"Generated response of length: {len(answer)}")
+            return answer
+
+        except Exception as e:
+            logger.error(f"Failed to generate response: {e}")
+            raise
+
+    async def generate_response_stream(
+        self,
+        query: str,
+        contexts: List[str],
+        use_inline_citations: bool = True
+    ) -> AsyncIterator[str]:
+        try:
+            async with self.slots:
+                stream = await self._call(
+                    "Streaming response generation",
+                    lambda: self.async_client.chat.completions.create(
+                        model=self.generator_model,
+                        messages=self._generation_messages(query, contexts, use_inline_citations),
+                        temperature=0.3,
+                        max_tokens=1000,
+                        stream=True
+                    ),
+                    settings.LLM_GENERATE_TIMEOUT_SECONDS,
+                    acquire_slot=False
+                )
+
+                async with stream:
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+
+        except Exception as e:
+            logger.error(f"Failed to generate streaming response: {e}")
+            raise
+
+    def rewrite_latency_ms(self) -> Optional[float]:
+        if not self._rewrite_latencies:
+            return None
+        return float(np.mean(self._rewrite_latencies)) * 1000
+
+    def get_stats(self) -> Dict:
+        latencies = list(self._rewrite_latencies)
+        return {
+            **self._stats,
+            "max_concurrency": settings.LLM_MAX_CONCURRENCY,
+            "hedging_enabled": settings.LLM_REWRITE_HEDGING_ENABLED,
+            "rewrite_p95_ms": float(np.percentile(latencies, 95)) * 1000 if latencies else 0.0,
+        }
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.close()
+        self._async_client = None
+        self._loop = None
+
+    def set_generator_model(self, model_name: str):
+        self.generator_model = model_name
+        logger.info(f"Generator model set to: {model_name}")
+
+    def set_query_rewriter_model(self, model_name: str):
+        self.query_rewriter_model = model_name
+        logger.info(f"Query rewriter model set to: {model_name}")
+
+
+llm_service = LLMService()
@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class TTLCache:
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        ttl_seconds: float,
+        persist_path: Optional[Path] = None,
+        max_disk_entries: int = 100000
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._sets_since_prune = 0
+        self._stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+        if persist_path is not None:
+            self._init_db(persist_path)
+
+    def _init_db(self, persist_path: Path):
+        try:
+            persist_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(persist_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._table} "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute(f"DELETE FROM {self._table} WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+            logger.info(f"Opened persistent cache '{self.name}' at {persist_path}")
+        except Exception as e:
+            logger.warning(f"Failed to open persistent cache '{self.name}', using memory only: {e}")
+            self._db = None
+
+    @property
+    def _table(self) -> str:
+        return f"cache_{self.name}"
+
+    @staticmethod
+    def make_key(text: str, model_name: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{model_name}:{digest}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._data.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._data[key]
+                self._stats["expirations"] += 1
+
+            value, expires_at = self._get_from_disk(key, now)
+            if value is not _MISSING:
+                self._put_in_memory(key, value, expires_at)
+                self._stats["disk_hits"] += 1
+                return value
+
+            self._stats["misses"] += 1
+            return default
+
+    def set(self, key: str, value: Any):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._put_in_memory(key, value, expires_at)
+            self._stats["sets"] += 1
+            self._put_on_disk(key, value, expires_at)
+
+    def _put_in_memory(self, key: str, value: Any, expires_at: float):
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _get_from_disk(self, key: str, now: float) -> tuple:
+        if self._db is None:
+            return _MISSING, None
+        try:
+            row = self._db.execute(
+                f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                return _MISSING, None
+            return pickle.loads(row[0]), row[1]
+        except Exception as e:
+            logger.warning(f"Persistent cache '{self.name}' read failed: {e}")
+            return _MISSING, None
+
+    def _put_on_disk(self, key: str, value: Any, expires_at: float):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires_at)
+            )
+            self._sets_since_prune += 1
+            if self._sets_since_prune >= 1000:
+                self._prune_disk()
+            self._db.commit()
+        except Exception as e:
+            logger.warning(f"Persistent cache '{self.name}' write failed: {e}")
+
+    def _prune_disk(self):
+        self._sets_since_prune = 0
+        self._db.execute(f"DELETE FROM {self._table} WHERE expires_at < ?", (time.time(),))
+        self._db.execute(
+            f"DELETE FROM {self._table} WHERE key IN ("
+            f"SELECT key FROM {self._table} ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self._table}")
+                self._db.commit()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            hits = self._stats["hits"] + self._stats["disk_hits"]
+            return {
+                **self._stats,
+                "entries": len(self._data),
+                "persistent": self._db is not None,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
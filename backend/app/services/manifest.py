@@ -0,0 +1,228 @@
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_COLUMNS = (
+    "document_id", "filename", "file_type", "file_size", "file_hash",
+    "status", "error", "num_pages", "num_chunks", "upload_time", "tenant"
+)
+
+
+class DocumentManifest:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._db = None
+        self._initialize_db()
+
+    def _initialize_db(self):
+        logger.info(f"Opening document manifest at {settings.DOCUMENT_MANIFEST_PATH}")
+        try:
+            settings.DOCUMENT_MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(settings.DOCUMENT_MANIFEST_PATH), check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " document_id TEXT PRIMARY KEY, filename TEXT NOT NULL, file_type TEXT, file_size INTEGER,"
+                " file_hash TEXT, status TEXT NOT NULL, error TEXT, num_pages INTEGER DEFAULT 0,"
+                " num_chunks INTEGER DEFAULT 0, upload_time REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS documents_filename ON documents (filename);"
+                "CREATE INDEX IF NOT EXISTS documents_file_hash ON documents (file_hash);"
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " document_id TEXT NOT NULL, page_number INTEGER NOT NULL, page_hash TEXT NOT NULL,"
+                " PRIMARY KEY (document_id, page_number));"
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                " chunk_id TEXT PRIMARY KEY, document_id TEXT NOT NULL, page_number INTEGER NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS chunks_page ON chunks (document_id, page_number);"
+            )
+            columns = {row["name"] for row in self._db.execute("PRAGMA table_info(documents)")}
+            if "tenant" not in columns:
+                self._db.execute(
+                    f"ALTER TABLE documents ADD COLUMN tenant TEXT NOT NULL DEFAULT '{settings.DEFAULT_TENANT}'"
+                )
+            self._db.execute("CREATE INDEX IF NOT EXISTS documents_tenant ON documents (tenant, upload_time)")
+            self._db.commit()
+        except Exception as e:
+            logger.error(f"Failed to open document manifest: {e}")
+            raise
+
+    def _fetch_document(self, where: str, params: tuple) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(DOCUMENT_COLUMNS)} FROM documents WHERE {where} "
+                "ORDER BY upload_time DESC LIMIT 1",
+                params
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_document(self, document_id: str) -> Optional[Dict]:
+        return self._fetch_document("document_id = ?", (document_id,))
+
+    def find_by_filename(self, filename: str, tenant: str) -> Optional[Dict]:
+        return self._fetch_document("filename = ? AND tenant = ?", (filename, tenant))
+
+    def find_by_hash(self, file_hash: str, tenant: str) -> Optional[Dict]:
+        return self._fetch_document("file_hash = ? AND tenant = ? AND status = 'completed'", (file_hash, tenant))
+
+    def resolve_document_ids(
+        self,
+        document_ids: Optional[List[str]] = None,
+        filenames: Optional[List[str]] = None,
+        tenant: Optional[str] = None,
+        uploaded_after: Optional[float] = None,
+        uploaded_before: Optional[float] = None
+    ) -> List[str]:
+        clauses = []
+        params = []
+        for column, values in (("document_id", document_ids), ("filename", filenames)):
+            if values is not None:
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if tenant is not None:
+            clauses.append("tenant = ?")
+            params.append(tenant)
+        if uploaded_after is not None:
+            clauses.append("upload_time >= ?")
+            params.append(uploaded_after)
+        if uploaded_before is not None:
+            clauses.append("upload_time <= ?")
+            params.append(uploaded_before)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db.execute(f"SELECT document_id FROM documents {where}", params).fetchall()
+        return [row["document_id"] for row in rows]
+
+    def list_documents(self, tenant: Optional[str] = None) -> List[Dict]:
+        where = "WHERE tenant = ?" if tenant is not None else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(DOCUMENT_COLUMNS)} FROM documents {where} ORDER BY upload_time",
+                (tenant,) if tenant is not None else ()
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def claim_document(
+        self,
+        document_id: str,
+        filename: str,
+        file_type: str,
+        file_size: int,
+        tenant: str,
+        expected_upload_time: Optional[float] = None
+    ) -> bool:
+        with self._lock:
+            if expected_upload_time is None:
+                cursor = self._db.execute(
+                    "INSERT INTO documents "
+                    "(document_id, filename, file_type, file_size, file_hash, status, upload_time, tenant) "
+                    "SELECT ?, ?, ?, ?, NULL, 'processing', ?, ? WHERE NOT EXISTS ("
+                    "SELECT 1 FROM documents WHERE document_id = ? OR (filename = ? AND tenant = ?))",
+                    (document_id, filename, file_type, file_size, time.time(), tenant, document_id, filename, tenant)
+                )
+            else:
+                cursor = self._db.execute(
+                    "UPDATE documents SET filename = ?, file_type = ?, file_size = ?, file_hash = NULL, "
+                    "status = 'processing', error = NULL, upload_time = ? "
+                    "WHERE document_id = ? AND tenant = ? AND status != 'processing' AND upload_time = ?",
+                    (filename, file_type, file_size, time.time(), document_id, tenant, expected_upload_time)
+                )
+            self._db.commit()
+        return cursor.rowcount == 1
+
+    def finish_document(self, document_id: str, status: str, file_hash: Optional[str] = None, error: str = None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE documents SET status = ?, file_hash = ?, error = ?, "
+                "num_pages = (SELECT COUNT(*) FROM pages WHERE document_id = ?), "
+                "num_chunks = (SELECT COUNT(*) FROM chunks WHERE document_id = ?) "
+                "WHERE document_id = ?",
+                (status, file_hash, error, document_id, document_id, document_id)
+            )
+            self._db.commit()
+
+    def fail_processing(self, error: str) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE documents SET status = 'failed', error = ? WHERE status = 'processing'", (error,)
+            )
+            self._db.commit()
+        return cursor.rowcount
+
+    def update_progress(self, document_id: str):
+        with self._lock:
+            self._db.execute(
+                "UPDATE documents SET "
+                "num_pages = (SELECT COUNT(*) FROM pages WHERE document_id = ?), "
+                "num_chunks = (SELECT COUNT(*) FROM chunks WHERE document_id = ?) "
+                "WHERE document_id = ?",
+                (document_id, document_id, document_id)
+            )
+            self._db.commit()
+
+    def get_page_hashes(self, document_id: str) -> Dict[int, str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT page_number, page_hash FROM pages WHERE document_id = ?", (document_id,)
+            ).fetchall()
+        return {row["page_number"]: row["page_hash"] for row in rows}
+
+    def get_page_chunk_ids(self, document_id: str, page_numbers: Iterable[int]) -> Dict[int, List[str]]:
+        page_numbers = list(page_numbers)
+        chunk_ids = {page_number: [] for page_number in page_numbers}
+        if not page_numbers:
+            return chunk_ids
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT chunk_id, page_number FROM chunks WHERE document_id = ? "
+                f"AND page_number IN ({', '.join('?' * len(page_numbers))})",
+                (document_id, *page_numbers)
+            ).fetchall()
+        for row in rows:
+            chunk_ids[row["page_number"]].append(row["chunk_id"])
+        return chunk_ids
+
+    def replace_pages(self, document_id: str, pages: Dict[int, tuple]):
+        with self._lock:
+            for page_number, (page_hash, chunk_ids) in pages.items():
+                self._db.execute(
+                    "DELETE FROM chunks WHERE document_id = ? AND page_number = ?", (document_id, page_number)
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO chunks (chunk_id, document_id, page_number) VALUES (?, ?, ?)",
+                    [(chunk_id, document_id, page_number) for chunk_id in chunk_ids]
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO pages (document_id, page_number, page_hash) VALUES (?, ?, ?)",
+                    (document_id, page_number, page_hash)
+                )
+            self._db.commit()
+
+    def delete_pages(self, document_id: str, page_numbers: Iterable[int]) -> List[str]:
+        page_numbers = list(page_numbers)
+        removed = self.get_page_chunk_ids(document_id, page_numbers)
+        with self._lock:
+            for page_number in page_numbers:
+                self._db.execute(
+                    "DELETE FROM chunks WHERE document_id = ? AND page_number = ?", (document_id, page_number)
+                )
+                self._db.execute(
+                    "DELETE FROM pages WHERE document_id = ? AND page_number = ?", (document_id, page_number)
+                )
+            self._db.commit()
+        return [chunk_id for chunk_ids in removed.values() for chunk_id in chunk_ids]
+
+    def delete_document(self, document_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+            self._db.execute("DELETE FROM pages WHERE document_id = ?", (document_id,))
+            self._db.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+            self._db.commit()
+
+
+document_manifest = DocumentManifest()
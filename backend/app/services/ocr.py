@@ -0,0 +1,343 @@
+import io
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, List, Tuple, Union
+import os
+import torch
+from app.core import settings
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
+SUPPORTED_OCR_BACKENDS = ("auto", "deepseek", "tesseract")
+
+Page = Union[str, "Image.Image"]
+
+os.environ['FLASH_ATTENTION_SKIP_TORCH_CHECK'] = '1'
+
+
+class DeepSeekOCRBackend:
+    name = "deepseek"
+
+    def __init__(self):
+        self.device = settings.DEVICE if torch.cuda.is_available() else "cpu"
+        self.tokenizer = None
+        self.model = None
+        self._model_loaded = False
+        self._load_attempted = False
+
+    def _load_model(self):
+        if self._load_attempted:
+            return
+        self._load_attempted = True
+        logger.info(f"Loading DeepSeek-OCR model on device: {self.device}")
+        try:
+            from transformers import AutoTokenizer, AutoModel
+
+            self.tokenizer = AutoTokenizer.from_pretrained(
+                settings.OCR_MODEL,
+                cache_dir=str(settings.MODELS_CACHE_DIR),
+                trust_remote_code=True
+            )
+            try:
+                self.model = AutoModel.from_pretrained(
+                    settings.OCR_MODEL,
+                    cache_dir=str(settings.MODELS_CACHE_DIR),
+                    torch_dtype=torch.bfloat16,
+                    device_map=self.device,
+                    trust_remote_code=True,
+                    _attn_implementation='flash_attention_2'
+                )
+                logger.info("DeepSeek-OCR model loaded with flash_attention_2")
+            except (ImportError, ValueError) as flash_err:
+                logger.warning(f"Flash-attention not available: {flash_err}. Falling back to eager attention.")
+                self.model = AutoModel.from_pretrained(
+                    settings.OCR_MODEL,
+                    cache_dir=str(settings.MODELS_CACHE_DIR),
+                    torch_dtype=torch.bfloat16,
+                    device_map=self.device,
+                    trust_remote_code=True,
+                    attn_implementation='eager'
+                )
+                logger.info("DeepSeek-OCR model loaded with eager attention")
+
+            self.model = self.model.eval()
+            self._model_loaded = True
+            logger.info("DeepSeek-OCR model loaded successfully")
+        except Exception as e:
+            logger.error(f"Failed to load DeepSeek-OCR model: {e}", exc_info=True)
+            self._model_loaded = False
+
+    def recognize(self, images: List["Image.Image"]) -> List[str]:
+        if not self._model_loaded:
+            self._load_model()
+
+        if not self._model_loaded:
+            raise RuntimeError("DeepSeek-OCR model failed to load. OCR functionality is unavailable.")
+
+        if not torch.cuda.is_available():
+            raise RuntimeError(
+                "DeepSeek-OCR requires CUDA/GPU to run. Set OCR_BACKEND=tesseract for CPU-only machines."
+            )
+
+        texts = []
+        for image in images:
+            buffer = io.BytesIO()
+            image.save(buffer, "PNG", compress_level=1)
+            buffer.seek(0)
+            result = self.model.infer(
+                self.tokenizer,
+                prompt="<image>\nFree OCR.",
+                image_file=buffer,
+                output_path=None,
+                base_size=1024,
+                image_size=640,
+                crop_mode=True,
+                save_results=False
+            )
+            texts.append((result if isinstance(result, str) else str(result)).strip())
+        return texts
+
+
+class TesseractOCRBackend:
+    name = "tesseract"
+
+    def __init__(self):
+        try:
+            import pytesseract
+        except ImportError:
+            logger.error("pytesseract not installed. Install with: pip install pytesseract (and tesseract-ocr)")
+            raise
+        self._pytesseract = pytesseract
+        self._pool = ThreadPoolExecutor(
+            max_workers=settings.OCR_TESSERACT_THREADS, thread_name_prefix="tesseract"
+        )
+
+    def _recognize_one(self, image: "Image.Image") -> str:
+        return self._pytesseract.image_to_string(image, lang=settings.OCR_TESSERACT_LANG).strip()
+
+    def recognize(self, images: List["Image.Image"]) -> List[str]:
+        return list(self._pool.map(self._recognize_one, images))
+
+
+def create_ocr_backend(backend: Optional[str] = None):
+    backend = (backend or settings.OCR_BACKEND).lower()
+    if backend not in SUPPORTED_OCR_BACKENDS:
+        raise ValueError(f"Unsupported OCR backend: {backend}. Choose one of {SUPPORTED_OCR_BACKENDS}")
+    if backend == "auto":
+        backend = "deepseek" if torch.cuda.is_available() else "tesseract"
+    logger.info(f"Using {backend} OCR backend")
+    return DeepSeekOCRBackend() if backend == "deepseek" else TesseractOCRBackend()
+
+
+class OCRService:
+    def __init__(self):
+        self._backend = None
+        self._backend_lock = threading.Lock()
+        self._stats = {"pages": 0, "batches": 0, "render_seconds": 0.0, "ocr_seconds": 0.0}
+
+    @property
+    def backend(self):
+        with self._backend_lock:
+            if self._backend is None:
+                self._backend = create_ocr_backend()
+            return self._backend
+
+    def _recognize(self, images: List["Image.Image"]) -> List[str]:
+        start = time.perf_counter()
+        texts = self.backend.recognize(images)
+        self._stats["ocr_seconds"] += time.perf_counter() - start
+        self._stats["pages"] += len(images)
+        self._stats["batches"] += 1
+        return texts
+
+    def extract_text_from_image(self, image_path: str) -> str:
+        from PIL import Image
+
+        try:
+            with Image.open(image_path) as image:
+                text = self._recognize([image.convert("RGB")])[0]
+            logger.info(f"Extracted text from {image_path}: {len(text)} characters")
+            return text
+        except Exception as e:
+            logger.error(f"Failed to extract text from image {image_path}: {e}", exc_info=True)
+            raise
+
+    def get_pdf_page_count(self, pdf_path: str) -> int:
+        try:
+            import pdf2image
+            return int(pdf2image.pdfinfo_from_path(pdf_path)["Pages"])
+        except ImportError:
+            logger.error("pdf2image not installed. Install with: pip install pdf2image poppler-utils")
+            raise
+
+    def iter_pdf_pages(
+        self,
+        pdf_path: str,
+        pages_per_render: int = 1,
+        first_page: int = 1,
+        last_page: Optional[int] = None
+    ) -> Iterator[Tuple[int, "Image.Image"]]:
+        import pdf2image
+
+        last_page = last_page or self.get_pdf_page_count(pdf_path)
+        for group_start in range(first_page, last_page + 1, pages_per_render):
+            group_end = min(group_start + pages_per_render - 1, last_page)
+            start = time.perf_counter()
+            images = pdf2image.convert_from_path(
+                pdf_path,
+                dpi=settings.OCR_RENDER_DPI,
+                first_page=group_start,
+                last_page=group_end,
+                thread_count=min(pages_per_render, settings.OCR_RENDER_THREADS)
+            )
+            self._stats["render_seconds"] += time.perf_counter() - start
+            for offset, image in enumerate(images):
+                yield group_start + offset, image
+
+    @staticmethod
+    def _page_runs(page_numbers: List[int]) -> List[Tuple[int, int]]:
+        runs = []
+        for page_number in sorted(set(page_numbers)):
+            if runs and page_number == runs[-1][1] + 1:
+                runs[-1] = (runs[-1][0], page_number)
+            else:
+                runs.append((page_number, page_number))
+        return runs
+
+    @staticmethod
+    def _put(pages: queue.Queue, item, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _render_pages(self, pdf_path: str, page_numbers: List[int], pages: queue.Queue, stop: threading.Event):
+        try:
+            for first_page, last_page in self._page_runs(page_numbers):
+                for page in self.iter_pdf_pages(pdf_path, settings.OCR_BATCH_SIZE, first_page, last_page):
+                    if not self._put(pages, page, stop):
+                        page[1].close()
+                        return
+            self._put(pages, None, stop)
+        except Exception as e:
+            self._put(pages, e, stop)
+
+    @staticmethod
+    def _next_page(pages: queue.Queue, block: bool):
+        item = pages.get(block=block)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def ocr_pdf_pages(self, pdf_path: str, page_numbers: List[int]) -> Dict[int, str]:
+        pages: queue.Queue = queue.Queue(maxsize=settings.OCR_BATCH_SIZE * 2)
+        stop = threading.Event()
+        renderer = threading.Thread(
+            target=self._render_pages, args=(pdf_path, page_numbers, pages, stop), name="ocr-render", daemon=True
+        )
+        renderer.start()
+
+        results = {}
+        try:
+            finished = False
+            while not finished:
+                page = self._next_page(pages, block=True)
+                if page is None:
+                    break
+                batch = [page]
+                while len(batch) < settings.OCR_BATCH_SIZE:
+                    try:
+                        page = self._next_page(pages, block=False)
+                    except queue.Empty:
+                        break
+                    if page is None:
+                        finished = True
+                        break
+                    batch.append(page)
+
+                try:
+                    texts = self._recognize([image for _, image in batch])
+                finally:
+                    for _, image in batch:
+                        image.close()
+                results.update((page_number, text) for (page_number, _), text in zip(batch, texts))
+        finally:
+            stop.set()
+            renderer.join()
+        return results
+
+    def extract_text_from_page(self, page: Page) -> str:
+        if isinstance(page, str):
+            return self.extract_text_from_image(page)
+        try:
+            return self._recognize([page])[0]
+        finally:
+            page.close()
+
+    def extract_text_from_pdf(self, pdf_path: str) -> str:
+        try:
+            page_texts = self.ocr_pdf_pages(pdf_path, list(range(1, self.get_pdf_page_count(pdf_path) + 1)))
+            combined_text = "\n".join(page_texts[page_number] for page_number in sorted(page_texts))
+            logger.info(f"Extracted text from PDF {pdf_path}: {len(combined_text)} characters")
+            return combined_text
+        except ImportError:
+            logger.error("pdf2image not installed. Install with: pip install pdf2image poppler-utils")
+            raise
+        except Exception as e:
+            logger.error(f"Failed to extract text from PDF {pdf_path}: {e}")
+            raise
+
+    @staticmethod
+    def _file_extension(file_path: str, original_filename: str = None) -> str:
+        if original_filename:
+            return Path(original_filename).suffix.lower()
+        return Path(file_path).suffix.lower()
+
+    def extract_text(self, file_path: str, original_filename: str = None) -> str:
+        file_ext = self._file_extension(file_path, original_filename)
+
+        if file_ext in IMAGE_EXTENSIONS:
+            return self.extract_text_from_image(file_path)
+        elif file_ext == ".pdf":
+            return self.extract_text_from_pdf(file_path)
+        else:
+            raise ValueError(f"Unsupported file format: {file_ext}")
+
+    def process_document(self, file_path: str, original_filename: str = None) -> dict:
+        try:
+            text = self.extract_text(file_path, original_filename)
+            return {
+                "success": True,
+                "text": text,
+                "file_path": file_path,
+                "num_characters": len(text)
+            }
+        except Exception as e:
+            logger.error(f"Failed to process document {file_path}: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "file_path": file_path
+            }
+
+    def get_stats(self) -> Dict:
+        ocr_seconds = self._stats["ocr_seconds"]
+        return {
+            "backend": self._backend.name if self._backend is not None else None,
+            **self._stats,
+            "pages_per_second": self._stats["pages"] / ocr_seconds if ocr_seconds else 0.0,
+        }
+
+
+ocr_service = OCRService()
@@ -0,0 +1,290 @@
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import Future
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+from app.core import settings, run_in_model_executor
+from app.services.batching import MicroBatcher
+from app.services.inference_backend import load_cross_encoder, resolve_backend
+from app.services.lexical_scoring import bm25_scores
+from app.services.lru_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class RerankerService:
+    def __init__(self):
+        self.model = None
+        self._model_loaded = False
+        self._load_attempted = False
+        self.backend = resolve_backend()
+        self.batch_size = settings.RERANK_BATCH_SIZE
+        self.score_cache = TTLCache(
+            name="rerank_scores",
+            max_entries=settings.RERANK_SCORE_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.RERANK_SCORE_CACHE_TTL_SECONDS
+        )
+        self.pair_batcher = None
+        if settings.RERANK_MICROBATCH_ENABLED:
+            self.pair_batcher = MicroBatcher(
+                name="rerank",
+                process_batch=self._score_pairs,
+                max_batch_size=settings.RERANK_MAX_BATCH_PAIRS,
+                max_wait_ms=settings.RERANK_BATCH_WINDOW_MS
+            )
+
+    def _load_model(self):
+        if self._load_attempted:
+            return
+        self._load_attempted = True
+        logger.info(f"Loading reranker model: {settings.RERANKER_MODEL}")
+        try:
+            self.model = load_cross_encoder(settings.RERANKER_MODEL, self.backend)
+            self._model_loaded = True
+            logger.info("Reranker model loaded successfully")
+        except Exception as e:
+            logger.error(f"Failed to load reranker model: {e}")
+            self._model_loaded = False
+
+    def _ensure_model(self):
+        if not self._model_loaded:
+            self._load_model()
+
+        if not self._model_loaded:
+            raise RuntimeError("Reranker model failed to load. Reranking functionality is unavailable.")
+
+    def _score_pairs(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+        sorted_scores = self.model.predict(
+            [[pairs[i][0], pairs[i][1]] for i in order],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
+
+        scores = [0.0] * len(pairs)
+        for position, pair_idx in enumerate(order):
+            scores[pair_idx] = float(sorted_scores[position])
+        return scores
+
+    def _submit_pairs(self, pairs: List[Tuple[str, str]]) -> List[Future]:
+        if self.pair_batcher is not None:
+            return self.pair_batcher.submit_many(pairs)
+
+        futures = []
+        for score in self._score_pairs(pairs):
+            future = Future()
+            future.set_result(score)
+            futures.append(future)
+        return futures
+
+    def _cache_keys(self, query: str, documents: List[str], doc_keys: Optional[List[str]]) -> List[str]:
+        query_hash = hashlib.sha256(query.encode("utf-8")).hexdigest()
+        if doc_keys is None:
+            doc_keys = [hashlib.sha256(doc.encode("utf-8")).hexdigest() for doc in documents]
+        return [f"{settings.RERANKER_MODEL}:{self.backend}:{query_hash}:{doc_key}" for doc_key in doc_keys]
+
+    def _lookup_scores(self, cache_keys: List[str]) -> Tuple[List[Optional[float]], List[int]]:
+        scores = [self.score_cache.get(key) for key in cache_keys]
+        misses = [i for i, score in enumerate(scores) if score is None]
+        return scores, misses
+
+    def score(
+        self,
+        query: str,
+        documents: List[str],
+        doc_keys: Optional[List[str]] = None
+    ) -> List[float]:
+        self._ensure_model()
+
+        cache_keys = self._cache_keys(query, documents, doc_keys)
+        scores, misses = self._lookup_scores(cache_keys)
+
+        if misses:
+            futures = self._submit_pairs([(query, documents[i]) for i in misses])
+            for i, future in zip(misses, futures):
+                scores[i] = future.result()
+                self.score_cache.set(cache_keys[i], scores[i])
+
+        logger.debug(f"Scored {len(documents)} pairs, {len(documents) - len(misses)} from cache")
+        return scores
+
+    async def ascore(
+        self,
+        query: str,
+        documents: List[str],
+        doc_keys: Optional[List[str]] = None
+    ) -> List[float]:
+        if self.pair_batcher is None:
+            return await run_in_model_executor(self.score, query, documents, doc_keys)
+
+        if not self._model_loaded:
+            await run_in_model_executor(self._ensure_model)
+
+        cache_keys = self._cache_keys(query, documents, doc_keys)
+        scores, misses = self._lookup_scores(cache_keys)
+
+        if misses:
+            futures = self.pair_batcher.submit_many([(query, documents[i]) for i in misses])
+            miss_scores = await asyncio.gather(*[asyncio.wrap_future(future) for future in futures])
+            for i, miss_score in zip(misses, miss_scores):
+                scores[i] = miss_score
+                self.score_cache.set(cache_keys[i], miss_score)
+
+        logger.debug(f"Scored {len(documents)} pairs, {len(documents) - len(misses)} from cache")
+        return scores
+
+    def _doc_keys(self, documents_with_metadata: List[Dict]) -> Optional[List[str]]:
+        doc_keys = [doc.get("metadata", {}).get("chunk_id") for doc in documents_with_metadata]
+        if any(key is None for key in doc_keys):
+            return None
+        return doc_keys
+
+    def cascade_prune(
+        self,
+        query: str,
+        documents_with_metadata: List[Dict],
+        top_n: int = None
+    ) -> List[Dict]:
+        if top_n is None:
+            top_n = settings.RERANK_CASCADE_CANDIDATES
+        if len(documents_with_metadata) <= top_n:
+            return documents_with_metadata
+
+        similarities = np.asarray(
+            [doc.get("similarity_score", 0.0) for doc in documents_with_metadata],
+            dtype=np.float32
+        )
+        lexical = bm25_scores(
+            query,
+            [doc["text"] for doc in documents_with_metadata],
+            k1=settings.BM25_K1,
+            b=settings.BM25_B
+        )
+
+        similarity_ranks = np.empty(len(similarities))
+        similarity_ranks[np.argsort(-similarities, kind="stable")] = np.arange(1, len(similarities) + 1)
+        lexical_ranks = np.empty(len(lexical))
+        lexical_ranks[np.argsort(-lexical, kind="stable")] = np.arange(1, len(lexical) + 1)
+
+        fused = (
+            1.0 / (settings.RRF_K + similarity_ranks)
+            + settings.RERANK_CASCADE_LEXICAL_WEIGHT / (settings.RRF_K + lexical_ranks)
+        )
+        survivors = np.argsort(-fused, kind="stable")[:top_n]
+
+        logger.debug(f"Cascade pruned {len(documents_with_metadata)} candidates to {len(survivors)}")
+        return [documents_with_metadata[i] for i in sorted(survivors)]
+
+    def prune_candidates(
+        self,
+        query: str,
+        documents_with_metadata: List[Dict],
+        top_k: int,
+        use_cascade: Optional[bool]
+    ) -> List[Dict]:
+        if use_cascade is None:
+            use_cascade = settings.RERANK_CASCADE_ENABLED
+        if not use_cascade:
+            return documents_with_metadata
+        return self.cascade_prune(
+            query,
+            documents_with_metadata,
+            top_n=max(settings.RERANK_CASCADE_CANDIDATES, top_k)
+        )
+
+    def _rank_with_metadata(
+        self,
+        documents_with_metadata: List[Dict],
+        scores: List[float],
+        top_k: int
+    ) -> List[Tuple[Dict, float]]:
+        ranked_data = [
+            (doc, float(score))
+            for doc, score in zip(documents_with_metadata, scores)
+        ]
+        ranked_data.sort(key=lambda x: x[1], reverse=True)
+        return ranked_data[:top_k]
+
+    def rerank(
+        self,
+        query: str,
+        documents: List[str],
+        top_k: int = None
+    ) -> List[Tuple[int, float]]:
+        try:
+            if top_k is None:
+                top_k = settings.RERANK_TOP_K
+
+            scores = self.score(query, documents)
+
+            ranked_indices = sorted(
+                range(len(scores)),
+                key=lambda i: scores[i],
+                reverse=True
+            )[:top_k]
+
+            results = [(idx, float(scores[idx])) for idx in ranked_indices]
+
+            logger.debug(f"Reranked {len(documents)} documents, returning top {len(results)}")
+            return results
+
+        except Exception as e:
+            logger.error(f"Failed to rerank documents: {e}")
+            raise
+
+    def rerank_with_metadata(
+        self,
+        query: str,
+        documents_with_metadata: List[Dict],
+        top_k: int = None,
+        use_cascade: Optional[bool] = None
+    ) -> List[Tuple[Dict, float]]:
+        try:
+            if top_k is None:
+                top_k = settings.RERANK_TOP_K
+
+            documents_with_metadata = self.prune_candidates(query, documents_with_metadata, top_k, use_cascade)
+            documents = [doc["text"] for doc in documents_with_metadata]
+            scores = self.score(query, documents, self._doc_keys(documents_with_metadata))
+            results = self._rank_with_metadata(documents_with_metadata, scores, top_k)
+
+            logger.debug(f"Reranked {len(documents_with_metadata)} documents, returning top {len(results)}")
+            return results
+
+        except Exception as e:
+            logger.error(f"Failed to rerank documents with metadata: {e}")
+            raise
+
+    async def arerank_with_metadata(
+        self,
+        query: str,
+        documents_with_metadata: List[Dict],
+        top_k: int = None,
+        use_cascade: Optional[bool] = None
+    ) -> List[Tuple[Dict, float]]:
+        try:
+            if top_k is None:
+                top_k = settings.RERANK_TOP_K
+
+            documents_with_metadata = self.prune_candidates(query, documents_with_metadata, top_k, use_cascade)
+            documents = [doc["text"] for doc in documents_with_metadata]
+            scores = await self.ascore(query, documents, self._doc_keys(documents_with_metadata))
+            results = self._rank_with_metadata(documents_with_metadata, scores, top_k)
+
+            logger.debug(f"Reranked {len(documents_with_metadata)} documents, returning top {len(results)}")
+            return results
+
+        except Exception as e:
+            logger.error(f"Failed to rerank documents with metadata: {e}")
+            raise
+
+    def get_stats(self) -> Dict:
+        return {
+            "score_cache": self.score_cache.get_stats(),
+            "batcher": self.pair_batcher.get_stats() if self.pair_batcher is not None else {"enabled": False},
+        }
+
+
+reranker_service = RerankerService()
@@ -0,0 +1,169 @@
+import logging
+import math
+import re
+import threading
+from typing import Dict, Optional
+import numpy as np
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+COMPARISON_PATTERN = re.compile(
+    r"\b(compare|comparison|versus|vs\.?|difference between|differences between|pros and cons|"
+    r"relationship between|similarities|contrast)\b",
+    re.IGNORECASE
+)
+CONJUNCTION_PATTERN = re.compile(r"\b(and|or|as well as|along with|both|each|respectively)\b", re.IGNORECASE)
+VAGUE_START_PATTERN = re.compile(r"^\s*(it|this|that|they|these|those|tell me|explain|anything|stuff)\b", re.IGNORECASE)
+QUESTION_WORD_PATTERN = re.compile(r"\b(what|who|when|where|which|why|how)\b", re.IGNORECASE)
+
+FEATURE_NAMES = ("length", "questions", "comparison", "conjunctions", "enumeration", "vague", "keyword")
+HEURISTIC_WEIGHTS = np.array([2.0, 1.5, 1.6, 0.5, 1.2, 2.0, -1.5])
+HEURISTIC_BIAS = -2.5
+
+
+def query_features(query: str) -> np.ndarray:
+    words = query.split()
+    num_words = len(words)
+    question_words = len(QUESTION_WORD_PATTERN.findall(query))
+    vague = VAGUE_START_PATTERN.search(query) is not None
+    return np.array([
+        min(num_words, 48) / 24,
+        max(query.count("?"), question_words, 1) - 1,
+        1.0 if COMPARISON_PATTERN.search(query) else 0.0,
+        min(len(CONJUNCTION_PATTERN.findall(query)), 3),
+        1.0 if query.count(",") >= 2 or query.count(";") >= 1 else 0.0,
+        1.0 if vague else 0.0,
+        1.0 if num_words <= 4 and "?" not in query and not vague else 0.0,
+    ], dtype=np.float32)
+
+
+def _sigmoid(x: float) -> float:
+    return 1.0 / (1.0 + math.exp(-max(min(x, 30.0), -30.0)))
+
+
+class QueryRouter:
+    def __init__(self):
+        self.path = settings.MODELS_CACHE_DIR / "query_router.npz"
+        self._lock = threading.Lock()
+        self._weights: Optional[np.ndarray] = None
+        self._num_samples = 0
+        self._num_correct = 0
+        self._updates_since_save = 0
+        self._stats = {"direct": 0, "rewrite": 0, "llm": 0}
+        self._load()
+
+    def _load(self):
+        try:
+            if self.path.exists():
+                with np.load(self.path) as data:
+                    self._weights = data["weights"]
+                    self._num_samples = int(data["num_samples"])
+                    self._num_correct = int(data["num_correct"])
+                logger.info(f"Loaded query router model trained on {self._num_samples} queries")
+        except Exception as e:
+            logger.warning(f"Failed to load query router model, starting fresh: {e}")
+            self._weights = None
+            self._num_samples = 0
+            self._num_correct = 0
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "wb") as f:
+                np.savez(
+                    f,
+                    weights=self._weights,
+                    num_samples=self._num_samples,
+                    num_correct=self._num_correct
+                )
+            self._updates_since_save = 0
+        except Exception as e:
+            logger.warning(f"Failed to save query router model: {e}")
+
+    @staticmethod
+    def _model_input(features: np.ndarray, embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(embedding)
+        if norm > 0:
+            embedding = embedding / norm
+        return np.concatenate([embedding, features, [1.0]]).astype(np.float32)
+
+    @staticmethod
+    def heuristic_probability(features: np.ndarray) -> float:
+        return _sigmoid(float(features @ HEURISTIC_WEIGHTS) + HEURISTIC_BIAS)
+
+    @property
+    def model_ready(self) -> bool:
+        return self._weights is not None and self._num_samples >= settings.QUERY_ROUTER_MIN_SAMPLES
+
+    def _model_probability(self, x: np.ndarray) -> Optional[float]:
+        if self._weights is None or self._weights.shape != x.shape:
+            return None
+        return _sigmoid(float(x @ self._weights))
+
+    def route(self, query: str, embedding: Optional[np.ndarray] = None) -> Dict:
+        features = query_features(query)
+        heuristic = self.heuristic_probability(features)
+        probability = heuristic
+        source = "heuristic"
+
+        if embedding is not None and self.model_ready:
+            with self._lock:
+                model = self._model_probability(self._model_input(features, embedding))
+            if model is not None:
+                probability = model
+                source = "model"
+
+        if probability <= settings.QUERY_ROUTER_SIMPLE_THRESHOLD:
+            route = "direct"
+        elif probability >= settings.QUERY_ROUTER_COMPLEX_THRESHOLD:
+            route = "rewrite"
+        else:
+            route = "llm"
+        self._stats[route] += 1
+
+        return {
+            "route": route,
+            "p_complex": probability,
+            "heuristic_p_complex": heuristic,
+            "confidence": max(probability, 1.0 - probability),
+            "source": source,
+        }
+
+    def observe(self, query: str, embedding: Optional[np.ndarray], should_rewrite: bool):
+        if embedding is None:
+            return
+
+        x = self._model_input(query_features(query), embedding)
+        label = 1.0 if should_rewrite else 0.0
+        with self._lock:
+            if self._weights is None or self._weights.shape != x.shape:
+                self._weights = np.zeros_like(x)
+                self._weights[-1 - len(FEATURE_NAMES):-1] = HEURISTIC_WEIGHTS
+                self._weights[-1] = HEURISTIC_BIAS
+                self._num_samples = 0
+                self._num_correct = 0
+
+            probability = self._model_probability(x)
+            self._num_correct += int((probability >= 0.5) == should_rewrite)
+            self._num_samples += 1
+
+            gradient = (probability - label) * x + settings.QUERY_ROUTER_L2 * self._weights
+            self._weights -= settings.QUERY_ROUTER_LEARNING_RATE * gradient
+
+            self._updates_since_save += 1
+            if self._updates_since_save >= settings.QUERY_ROUTER_SAVE_EVERY:
+                self._save()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "model_ready": self.model_ready,
+                "training_samples": self._num_samples,
+                "online_accuracy": self._num_correct / self._num_samples if self._num_samples else 0.0,
+            }
+
+
+query_router = QueryRouter()
@@ -0,0 +1,205 @@
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PQ_CENTROIDS = 256
+PQ_TRAIN_ITERATIONS = 20
+PQ_TRAIN_ROWS = 40 * PQ_CENTROIDS
+TRAIN_SAMPLE_ROWS = 65536
+ENCODE_BLOCK_ROWS = 65536
+
+
+class Float32Codec:
+    name = "float32"
+    exact = True
+    train_rows = TRAIN_SAMPLE_ROWS
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    @property
+    def code_bytes(self) -> int:
+        return self.dimension * 4
+
+    def train(self, sample: np.ndarray):
+        pass
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float32)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        return queries @ codes.T
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        pass
+
+
+class Float16Codec(Float32Codec):
+    name = "float16"
+    exact = False
+
+    @property
+    def code_bytes(self) -> int:
+        return self.dimension * 2
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float16)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        return queries @ codes.astype(np.float32).T
+
+
+class Int8Codec(Float32Codec):
+    name = "int8"
+    exact = False
+
+    def __init__(self, dimension: int):
+        super().__init__(dimension)
+        self.low = np.full(dimension, -1.0, dtype=np.float32)
+        self.scale = np.full(dimension, 2.0 / 255, dtype=np.float32)
+
+    @property
+    def code_bytes(self) -> int:
+        return self.dimension
+
+    def train(self, sample: np.ndarray):
+        self.low = sample.min(axis=0).astype(np.float32)
+        self.scale = np.maximum(sample.max(axis=0) - self.low, 1e-6).astype(np.float32) / 255
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint((vectors - self.low) / self.scale), 0, 255).astype(np.uint8)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        return (queries * self.scale) @ codes.astype(np.float32).T + (queries @ self.low)[:, None]
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"low": self.low, "scale": self.scale}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        self.low = state["low"]
+        self.scale = state["scale"]
+
+
+def _subvectors(dimension: int, requested: int) -> int:
+    return max(count for count in range(1, min(requested, dimension) + 1) if dimension % count == 0)
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (centroids ** 2).sum(axis=1) - 2 * vectors @ centroids.T
+    return distances.argmin(axis=1)
+
+
+def _kmeans(vectors: np.ndarray, num_centroids: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = vectors[rng.choice(len(vectors), num_centroids, replace=False)].copy()
+    for _ in range(PQ_TRAIN_ITERATIONS):
+        assignments = _assign(vectors, centroids)
+        counts = np.bincount(assignments, minlength=num_centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+    return centroids
+
+
+class PQCodec(Float32Codec):
+    name = "pq"
+    exact = False
+    train_rows = PQ_TRAIN_ROWS
+
+    def __init__(self, dimension: int, subvectors: int = 48):
+        super().__init__(dimension)
+        self.subvectors = _subvectors(dimension, subvectors)
+        self.subdimension = dimension // self.subvectors
+        self.centroids = np.zeros((self.subvectors, PQ_CENTROIDS, self.subdimension), dtype=np.float32)
+
+    @property
+    def code_bytes(self) -> int:
+        return self.subvectors
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.reshape(len(vectors), self.subvectors, self.subdimension)
+
+    def train(self, sample: np.ndarray):
+        rng = np.random.default_rng(0)
+        num_centroids = min(PQ_CENTROIDS, len(sample))
+        parts = self._split(np.asarray(sample, dtype=np.float32))
+        self.centroids = np.zeros((self.subvectors, PQ_CENTROIDS, self.subdimension), dtype=np.float32)
+        for j in range(self.subvectors):
+            self.centroids[j, :num_centroids] = _kmeans(parts[:, j], num_centroids, rng)
+            self.centroids[j, num_centroids:] = self.centroids[j, 0]
+        logger.info(
+            f"Trained product quantizer: {self.subvectors} x {num_centroids} centroids on {len(sample)} vectors"
+        )
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        parts = self._split(np.asarray(vectors, dtype=np.float32))
+        codes = np.empty((len(vectors), self.subvectors), dtype=np.uint8)
+        for j in range(self.subvectors):
+            codes[:, j] = _assign(parts[:, j], self.centroids[j])
+        return codes
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        tables = np.einsum("qjd,jcd->qjc", self._split(queries), self.centroids)
+        scores = np.zeros((len(queries), len(codes)), dtype=np.float32)
+        for j in range(self.subvectors):
+            scores += tables[:, j, codes[:, j]]
+        return scores
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"centroids": self.centroids}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        self.centroids = state["centroids"]
+
+
+CODECS = {codec.name: codec for codec in (Float32Codec, Float16Codec, Int8Codec, PQCodec)}
+
+
+def create_codec(name: str, dimension: int, pq_subvectors: int = 48):
+    if name not in CODECS:
+        raise ValueError(f"VECTOR_INDEX_CODEC must be one of {tuple(CODECS)}, got {name!r}")
+    if name == "pq":
+        return PQCodec(dimension, pq_subvectors)
+    return CODECS[name](dimension)
+
+
+def train_sample(vectors: np.ndarray, rows: int = TRAIN_SAMPLE_ROWS) -> np.ndarray:
+    if len(vectors) <= rows:
+        return np.asarray(vectors, dtype=np.float32)
+    picked = np.sort(np.random.default_rng(0).choice(len(vectors), rows, replace=False))
+    return np.asarray(vectors[picked], dtype=np.float32)
+
+
+def encode_all(codec, vectors: np.ndarray) -> np.ndarray:
+    return np.concatenate([
+        codec.encode(np.asarray(vectors[start:start + ENCODE_BLOCK_ROWS], dtype=np.float32))
+        for start in range(0, len(vectors), ENCODE_BLOCK_ROWS)
+    ]) if len(vectors) else codec.encode(np.zeros((0, codec.dimension), dtype=np.float32))
+
+
+def save_codec(codec, path: Path):
+    np.savez(path, name=np.asarray(codec.name), **codec.state())
+
+
+def load_codec(path: Path, name: str, dimension: int, pq_subvectors: int = 48) -> Optional[object]:
+    if not path.exists():
+        return None
+    codec = create_codec(name, dimension, pq_subvectors)
+    expected = codec.state()
+    with np.load(path) as data:
+        if str(data["name"]) != name or set(data.files) - {"name"} != set(expected):
+            return None
+        state = {key: data[key] for key in expected}
+    if any(state[key].shape != value.shape for key, value in expected.items()):
+        logger.info(f"Discarding {name} codec at {path}: its shape no longer matches the configured codec")
+        return None
+    codec.load_state(state)
+    return codec
@@ -0,0 +1,1145 @@
+import copy
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from app.core import settings
+from app.services.vector_codecs import (
+    CODECS, PQ_TRAIN_ROWS, create_codec, encode_all, load_codec, save_codec, train_sample
+)
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("chroma", "numpy", "hnsw")
+VECTOR_DTYPE = np.float32
+SEARCH_BLOCK_ROWS = 65536
+INT_MISSING = np.iinfo(np.int64).min
+DEFAULT_INCLUDE = ("documents", "metadatas", "distances")
+FAISS_REQUIREMENT = "faiss-cpu>=1.9.0"
+
+COMPARISONS = {
+    "$eq": np.equal,
+    "$ne": np.not_equal,
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, keep, axis=1)
+        rows = np.take_along_axis(rows, keep, axis=1)
+    return scores, rows
+
+
+def _sorted_top_k(scores: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    scores, rows = _top_k(scores, rows, k)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(rows, order, axis=1)
+
+
+def _column_kind(values: List) -> str:
+    present = [value for value in values if value is not None]
+    if all(isinstance(value, bool) for value in present):
+        return "bool"
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+        return "int"
+    if all(isinstance(value, (int, float)) for value in present):
+        return "float"
+    return "str"
+
+
+def _encode_column(values: List) -> Tuple[Dict, np.ndarray]:
+    kind = _column_kind(values)
+    if kind == "str":
+        vocab = sorted({str(value) for value in values if value is not None})
+        index = {value: i for i, value in enumerate(vocab)}
+        codes = np.fromiter(
+            (-1 if value is None else index[str(value)] for value in values), dtype=np.int32, count=len(values)
+        )
+        return {"kind": kind, "vocab": vocab}, codes
+    if kind == "int":
+        return {"kind": kind}, np.fromiter(
+            (INT_MISSING if value is None else value for value in values), dtype=np.int64, count=len(values)
+        )
+    if kind == "bool":
+        return {"kind": kind}, np.fromiter(
+            (-1 if value is None else int(value) for value in values), dtype=np.int8, count=len(values)
+        )
+    return {"kind": kind}, np.fromiter(
+        (np.nan if value is None else value for value in values), dtype=np.float64, count=len(values)
+    )
+
+
+def _missing(kind: str, num_rows: int) -> np.ndarray:
+    if kind == "str":
+        return np.full(num_rows, -1, dtype=np.int32)
+    if kind == "int":
+        return np.full(num_rows, INT_MISSING, dtype=np.int64)
+    if kind == "bool":
+        return np.full(num_rows, -1, dtype=np.int8)
+    return np.full(num_rows, np.nan, dtype=np.float64)
+
+
+class _Columns:
+    def __init__(self, num_rows: int = 0, schema: Optional[Dict[str, Dict]] = None, arrays: Optional[Dict] = None):
+        self.num_rows = num_rows
+        self.schema = schema or {}
+        self.arrays = arrays or {}
+        self._vocab = {
+            key: np.asarray(spec["vocab"], dtype=object)
+            for key, spec in self.schema.items() if spec["kind"] == "str"
+        }
+        self._vocab_index = {
+            key: {value: i for i, value in enumerate(spec["vocab"])}
+            for key, spec in self.schema.items() if spec["kind"] == "str"
+        }
+
+    @classmethod
+    def from_metadatas(cls, metadatas: List[Dict]) -> "_Columns":
+        schema, arrays = {}, {}
+        for key in dict.fromkeys(key for metadata in metadatas for key in metadata):
+            schema[key], arrays[key] = _encode_column([metadata.get(key) for metadata in metadatas])
+        return cls(len(metadatas), schema, arrays)
+
+    @classmethod
+    def concat(cls, parts: List["_Columns"]) -> "_Columns":
+        num_rows = sum(part.num_rows for part in parts)
+        schema, arrays = {}, {}
+        for key in dict.fromkeys(key for part in parts for key in part.schema):
+            kinds = {part.schema[key]["kind"] for part in parts if key in part.schema}
+            if kinds == {"str"}:
+                vocab = sorted({value for part in parts if key in part.schema for value in part.schema[key]["vocab"]})
+                index = {value: i for i, value in enumerate(vocab)}
+                pieces = []
+                for part in parts:
+                    if key not in part.schema:
+                        pieces.append(_missing("str", part.num_rows))
+                        continue
+                    lookup = np.array([index[value] for value in part.schema[key]["vocab"]] + [-1], dtype=np.int32)
+                    pieces.append(lookup[part.arrays[key]])
+                schema[key], arrays[key] = {"kind": "str", "vocab": vocab}, np.concatenate(pieces)
+            elif len(kinds) == 1:
+                kind = kinds.pop()
+                schema[key] = {"kind": kind}
+                arrays[key] = np.concatenate([
+                    part.arrays[key] if key in part.schema else _missing(kind, part.num_rows) for part in parts
+                ])
+            else:
+                schema[key], arrays[key] = _encode_column([
+                    part.value(key, i) for part in parts for i in range(part.num_rows)
+                ])
+        return cls(num_rows, schema, arrays)
+
+    def take(self, rows: np.ndarray) -> "_Columns":
+        return _Columns(len(rows), self.schema, {key: array[rows] for key, array in self.arrays.items()})
+
+    @classmethod
+    def load(cls, path: Path) -> "_Columns":
+        meta = json.loads((path / "columns.json").read_text())
+        with np.load(path / "columns.npz") as data:
+            arrays = {key: data[f"c{i}"] for i, key in enumerate(meta["schema"])}
+        return cls(meta["num_rows"], meta["schema"], arrays)
+
+    def save(self, path: Path):
+        (path / "columns.json").write_text(json.dumps({"num_rows": self.num_rows, "schema": self.schema}))
+        np.savez(path / "columns.npz", **{f"c{i}": self.arrays[key] for i, key in enumerate(self.schema)})
+
+    def value(self, key: str, row: int):
+        spec = self.schema.get(key)
+        if spec is None:
+            return None
+        value = self.arrays[key][row]
+        kind = spec["kind"]
+        if kind == "str":
+            return spec["vocab"][value] if value >= 0 else None
+        if kind == "int":
+            return int(value) if value != INT_MISSING else None
+        if kind == "bool":
+            return bool(value) if value >= 0 else None
+        return float(value) if not np.isnan(value) else None
+
+    def row(self, row: int) -> Dict:
+        metadata = {}
+        for key in self.schema:
+            value = self.value(key, row)
+            if value is not None:
+                metadata[key] = value
+        return metadata
+
+    def mask(self, where: Dict) -> np.ndarray:
+        result = np.ones(self.num_rows, dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    result &= self.mask(clause)
+            elif key == "$or":
+                matched = np.zeros(self.num_rows, dtype=bool)
+                for clause in condition:
+                    matched |= self.mask(clause)
+                result &= matched
+            else:
+                if not isinstance(condition, dict):
+                    condition = {"$eq": condition}
+                for op, operand in condition.items():
+                    result &= self._field_mask(key, op, operand)
+        return result
+
+    def _field_mask(self, key: str, op: str, operand) -> np.ndarray:
+        if op not in COMPARISONS and op not in ("$in", "$nin"):
+            raise ValueError(f"Unsupported where operator: {op}")
+        spec = self.schema.get(key)
+        if spec is None:
+            return np.zeros(self.num_rows, dtype=bool)
+
+        values = self.arrays[key]
+        operands = list(operand) if op in ("$in", "$nin") else [operand]
+        if spec["kind"] == "str":
+            operands = [value for value in operands if isinstance(value, str)]
+            present = values >= 0
+            if op in ("$eq", "$ne", "$in", "$nin"):
+                index = self._vocab_index[key]
+                hit = np.isin(values, [index[value] for value in operands if value in index])
+            elif operands:
+                hit = np.append(COMPARISONS[op](self._vocab[key], operands[0]).astype(bool), False)[values]
+            else:
+                hit = np.zeros(self.num_rows, dtype=bool)
+        else:
+            operands = [value for value in operands if isinstance(value, (int, float))]
+            if spec["kind"] == "int":
+                present = values != INT_MISSING
+            elif spec["kind"] == "bool":
+                present = values >= 0
+            else:
+                present = ~np.isnan(values)
+            if op in ("$eq", "$ne", "$in", "$nin"):
+                hit = np.isin(values, operands)
+            elif operands:
+                hit = COMPARISONS[op](values, operands[0])
+            else:
+                hit = np.zeros(self.num_rows, dtype=bool)
+
+        if op in ("$ne", "$nin"):
+            return present & ~hit
+        return present & hit
+
+
+class _ReadWriteLock:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        held = getattr(self._local, "reads", 0)
+        with self._cond:
+            if self._writer != me:
+                while self._writer is not None or (self._waiting_writers and not held):
+                    self._cond.wait()
+            self._readers += 1
+        self._local.reads = held + 1
+        try:
+            yield
+        finally:
+            self._local.reads = held
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me:
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._waiting_writers -= 1
+                self._writer = me
+            self._writer_depth += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer_depth -= 1
+                if not self._writer_depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
+
+class VectorIndex:
+    engine = None
+
+    def __init__(self, path: Path, name: str):
+        self.name = name
+        self.path = path
+        self.compact_threshold = settings.VECTOR_INDEX_COMPACT_THRESHOLD
+        self.codec_name = settings.VECTOR_INDEX_CODEC
+        self._lock = _ReadWriteLock()
+        self._log = None
+        self._vector_log = None
+        self._compacting = False
+        self._open()
+
+    def _base_dir(self, generation: int) -> Path:
+        return self.path / f"base-{generation}"
+
+    def _log_path(self, generation: int) -> Path:
+        return self.path / f"delta-{generation}.jsonl"
+
+    def _vector_log_path(self, generation: int) -> Path:
+        return self.path / f"delta-{generation}.f32"
+
+    def _write_meta(self):
+        meta = {"dimension": self.dimension, "vector_dtype": np.dtype(VECTOR_DTYPE).name}
+        meta_tmp = self.path / "index.json.tmp"
+        meta_tmp.write_text(json.dumps(meta))
+        os.replace(meta_tmp, self.path / "index.json")
+
+    def _open(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        current = self.path / "CURRENT"
+        self._generation = int(current.read_text().strip()) if current.exists() else 0
+        meta_path = self.path / "index.json"
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        self.dimension = meta.get("dimension")
+        vector_dtype = meta.get("vector_dtype", np.dtype(VECTOR_DTYPE).name)
+        if vector_dtype != np.dtype(VECTOR_DTYPE).name:
+            raise ValueError(
+                f"Vector index {self.name} stores {vector_dtype} vectors, expected {np.dtype(VECTOR_DTYPE).name}"
+            )
+
+        base_dir = self._base_dir(self._generation)
+        if (base_dir / "ids.npy").exists():
+            self._base_vectors = np.load(base_dir / "vectors.npy", mmap_mode="r")
+            self._base_ids = np.load(base_dir / "ids.npy", mmap_mode="r")
+            self._base_id_keys = np.load(base_dir / "id_keys.npy", mmap_mode="r")
+            self._base_id_rows = np.load(base_dir / "id_rows.npy", mmap_mode="r")
+            self._base_text_offsets = np.load(base_dir / "text_offsets.npy", mmap_mode="r")
+            texts_path = base_dir / "texts.bin"
+            self._base_texts = (
+                np.memmap(texts_path, dtype=np.uint8, mode="r") if texts_path.stat().st_size else np.zeros(0, np.uint8)
+            )
+            self._base_columns = _Columns.load(base_dir)
+            self._tombstones = set(np.load(base_dir / "tombstones.npy").tolist())
+        else:
+            self._base_vectors = np.zeros((0, self.dimension or 0), dtype=VECTOR_DTYPE)
+            self._base_ids = np.zeros(0, dtype="S1")
+            self._base_id_keys = np.zeros(0, dtype="S1")
+            self._base_id_rows = np.zeros(0, dtype=np.int64)
+            self._base_text_offsets = np.zeros(1, dtype=np.int64)
+            self._base_texts = np.zeros(0, dtype=np.uint8)
+            self._base_columns = _Columns()
+            self._tombstones = set()
+
+        self._delta_ids: List[str] = []
+        self._delta_texts: List[str] = []
+        self._delta_metadatas: List[Dict] = []
+        self._delta_vectors = np.zeros((0, self.dimension or 0), dtype=VECTOR_DTYPE)
+        self._delta_rows: Dict[str, int] = {}
+        self._delta_columns: Optional[_Columns] = None
+        self._alive: Optional[np.ndarray] = None
+        self._engine_ready = False
+
+        self._log_generation = self._generation
+        self._replay_log(self._generation)
+        while self._log_path(self._log_generation + 1).exists():
+            self._log_generation += 1
+            logger.warning(f"Replaying vector index log of {self.name} left by an unfinished compaction")
+            self._replay_log(self._log_generation)
+        self._open_logs()
+        self._open_engine()
+        self._engine_ready = True
+        logger.info(
+            f"Opened {self.engine} vector index {self.name}: {self.count()} live rows "
+            f"({self._base_n} in base segment, {len(self._delta_ids)} in delta)"
+        )
+
+    def _open_logs(self):
+        self._log = open(self._log_path(self._log_generation), "a", encoding="utf-8")
+        self._vector_log = open(self._vector_log_path(self._log_generation), "ab")
+
+    def _replay_log(self, generation: int):
+        log_path = self._log_path(generation)
+        vector_log_path = self._vector_log_path(generation)
+        if not log_path.exists() or self.dimension is None:
+            return
+
+        vectors = np.fromfile(vector_log_path, dtype=VECTOR_DTYPE) if vector_log_path.exists() else np.zeros(0)
+        vectors = vectors[:len(vectors) // self.dimension * self.dimension].reshape(-1, self.dimension)
+        first = len(self._delta_ids)
+        added = []
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping truncated entry in vector index log of {self.name}")
+                    continue
+                if entry["op"] == "add":
+                    if len(self._delta_ids) - first + len(added) >= len(vectors):
+                        logger.warning(f"Vector index log of {self.name} is ahead of its vectors, stopping replay")
+                        break
+                    added.append(entry)
+                elif entry["op"] == "delete":
+                    self._apply_adds(added, vectors[self._pending(first, added)])
+                    added = []
+                    self._apply_delete(entry["ids"])
+        self._apply_adds(added, vectors[self._pending(first, added)])
+
+        replayed = len(self._delta_ids) - first
+        if replayed < len(vectors):
+            logger.warning(f"Truncating vector index log of {self.name} to {replayed} rows")
+            with open(vector_log_path, "ab") as f:
+                f.truncate(replayed * self.dimension * np.dtype(VECTOR_DTYPE).itemsize)
+
+    def _pending(self, first: int, added: List[Dict]) -> slice:
+        start = len(self._delta_ids) - first
+        return slice(start, start + len(added))
+
+    def _open_engine(self):
+        pass
+
+    def _add_to_engine(self, vectors: np.ndarray):
+        pass
+
+    def _compact_engine(self, base_dir: Path, rows: np.ndarray, purge: bool):
+        pass
+
+    def _close_engine(self):
+        pass
+
+    @property
+    def _base_n(self) -> int:
+        return len(self._base_ids)
+
+    @property
+    def _num_rows(self) -> int:
+        return self._base_n + len(self._delta_ids)
+
+    def _ensure_dimension(self, dimension: int):
+        if self.dimension is None:
+            self.dimension = dimension
+            self._write_meta()
+            self._base_vectors = self._base_vectors.reshape(0, dimension)
+            self._delta_vectors = self._delta_vectors.reshape(0, dimension)
+        elif self.dimension != dimension:
+            raise ValueError(f"Embedding dimension {dimension} does not match index dimension {self.dimension}")
+
+    def _write_log(self, entries: List[Dict], vectors: np.ndarray):
+        self._vector_log.write(vectors.astype(VECTOR_DTYPE).tobytes())
+        self._vector_log.flush()
+        os.fsync(self._vector_log.fileno())
+        self._log.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        self._log.flush()
+        os.fsync(self._log.fileno())
+
+    def _rows(self, ids: List[str]) -> List[Optional[int]]:
+        rows = []
+        for chunk_id in ids:
+            row = self._delta_rows.get(chunk_id)
+            if row is None and self._base_n:
+                key = chunk_id.encode("utf-8")
+                position = int(np.searchsorted(self._base_id_keys, key))
+                while position < self._base_n and bytes(self._base_id_keys[position]) == key:
+                    candidate = int(self._base_id_rows[position])
+                    if candidate not in self._tombstones:
+                        row = candidate
+                        break
+                    position += 1
+            rows.append(row)
+        return rows
+
+    def _apply_adds(self, entries: List[Dict], vectors: np.ndarray):
+        if not entries:
+            return
+        start = self._num_rows
+        for i, entry in enumerate(entries):
+            self._delta_ids.append(entry["id"])
+            self._delta_texts.append(entry["text"])
+            self._delta_metadatas.append(entry["metadata"])
+            self._delta_rows[entry["id"]] = start + i
+        self._delta_vectors = np.concatenate([self._delta_vectors, vectors.astype(VECTOR_DTYPE)])
+        self._delta_columns = None
+        self._alive = None
+        if self._engine_ready:
+            self._add_to_engine(np.asarray(vectors, dtype=np.float32))
+
+    def _apply_delete(self, ids: List[str]) -> int:
+        removed = 0
+        for chunk_id, row in zip(ids, self._rows(ids)):
+            if row is None:
+                continue
+            self._tombstones.add(row)
+            self._delta_rows.pop(chunk_id, None)
+            removed += 1
+        if removed:
+            self._alive = None
+        return removed
+
+    def _write(
+        self,
+        ids: List[str],
+        embeddings,
+        metadatas: Optional[List[Dict]],
+        documents: Optional[List[str]],
+        replace: bool
+    ):
+        if not ids:
+            return
+        vectors = _normalize(embeddings)
+        metadatas = metadatas or [{} for _ in ids]
+        documents = documents or ["" for _ in ids]
+        latest = {chunk_id: i for i, chunk_id in enumerate(ids)}
+
+        with self._lock.write():
+            self._ensure_dimension(vectors.shape[1])
+            existing = [chunk_id for chunk_id, row in zip(latest, self._rows(list(latest))) if row is not None]
+            if existing and not replace:
+                logger.warning(f"Skipping {len(existing)} ids already present in vector index {self.name}")
+                for chunk_id in existing:
+                    del latest[chunk_id]
+            if not latest:
+                return
+
+            rows = list(latest.values())
+            entries = [{"op": "delete", "ids": existing}] if replace and existing else []
+            added = [
+                {"op": "add", "id": chunk_id, "text": documents[i], "metadata": metadatas[i]}
+                for chunk_id, i in latest.items()
+            ]
+            self._write_log(entries + added, vectors[rows])
+            if replace and existing:
+                self._apply_delete(existing)
+            self._apply_adds(added, vectors[rows])
+            purge = self._compaction_due()
+        if purge is not None:
+            self._compact(purge)
+
+    def add(
+        self,
+        ids: List[str],
+        embeddings,
+        metadatas: Optional[List[Dict]] = None,
+        documents: Optional[List[str]] = None
+    ):
+        self._write(ids, embeddings, metadatas, documents, replace=False)
+
+    def upsert(
+        self,
+        ids: List[str],
+        embeddings,
+        metadatas: Optional[List[Dict]] = None,
+        documents: Optional[List[str]] = None
+    ):
+        self._write(ids, embeddings, metadatas, documents, replace=True)
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        with self._lock.write():
+            if ids is None:
+                if where is None:
+                    return
+                ids = self.get(where=where, include=[])["ids"]
+            elif where is not None:
+                ids = self.get(ids=ids, where=where, include=[])["ids"]
+            if not ids:
+                return
+            self._log.write(json.dumps({"op": "delete", "ids": list(ids)}) + "\n")
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._apply_delete(list(ids))
+            purge = self._compaction_due()
+        if purge is not None:
+            self._compact(purge)
+
+    def count(self) -> int:
+        with self._lock.read():
+            return self._num_rows - len(self._tombstones)
+
+    def _alive_mask(self) -> np.ndarray:
+        if self._alive is None:
+            alive = np.ones(self._num_rows, dtype=bool)
+            if self._tombstones:
+                alive[np.fromiter(self._tombstones, dtype=np.int64)] = False
+            self._alive = alive
+        return self._alive
+
+    def _where_mask(self, where: Dict) -> np.ndarray:
+        if self._delta_columns is None:
+            self._delta_columns = _Columns.from_metadatas(self._delta_metadatas)
+        return np.concatenate([self._base_columns.mask(where), self._delta_columns.mask(where)])
+
+    def _allowed(self, where: Optional[Dict]) -> Optional[np.ndarray]:
+        if where:
+            return self._alive_mask() & self._where_mask(where)
+        return self._alive_mask() if self._tombstones else None
+
+    def _materialize(self, rows: List[int], include) -> Dict:
+        base_n = self._base_n
+        ids, documents, metadatas = [], [], []
+        for row in rows:
+            if row < base_n:
+                ids.append(self._base_ids[row].decode("utf-8"))
+                if "documents" in include:
+                    start, end = self._base_text_offsets[row], self._base_text_offsets[row + 1]
+                    documents.append(self._base_texts[start:end].tobytes().decode("utf-8"))
+                if "metadatas" in include:
+                    metadatas.append(self._base_columns.row(row))
+            else:
+                ids.append(self._delta_ids[row - base_n])
+                if "documents" in include:
+                    documents.append(self._delta_texts[row - base_n])
+                if "metadatas" in include:
+                    metadatas.append(dict(self._delta_metadatas[row - base_n]))
+        return {
+            "ids": ids,
+            "documents": documents if "documents" in include else None,
+            "metadatas": metadatas if "metadatas" in include else None,
+        }
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        include=("documents", "metadatas")
+    ) -> Dict:
+        with self._lock.read():
+            if ids is not None:
+                rows = np.asarray([row for row in self._rows(ids) if row is not None], dtype=np.int64)
+                if where and len(rows):
+                    rows = rows[self._where_mask(where)[rows]]
+            else:
+                allowed = self._allowed(where)
+                rows = np.arange(self._num_rows) if allowed is None else np.flatnonzero(allowed)
+            rows = rows[offset:offset + limit if limit is not None else None]
+            return self._materialize(rows.tolist(), include)
+
+    def _vector_blocks(self, rows: Optional[np.ndarray]) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        base_vectors = self._base_vectors
+        delta_vectors = self._delta_vectors
+        base_n = self._base_n
+        if rows is None:
+            for start in range(0, base_n, SEARCH_BLOCK_ROWS):
+                end = min(start + SEARCH_BLOCK_ROWS, base_n)
+                yield np.arange(start, end), np.asarray(base_vectors[start:end], dtype=np.float32)
+            if len(self._delta_ids):
+                yield np.arange(base_n, self._num_rows), np.asarray(delta_vectors, dtype=np.float32)
+            return
+
+        for start in range(0, len(rows), SEARCH_BLOCK_ROWS):
+            block_rows = rows[start:start + SEARCH_BLOCK_ROWS]
+            in_base = block_rows < base_n
+            vectors = np.empty((len(block_rows), self.dimension), dtype=np.float32)
+            vectors[in_base] = base_vectors[block_rows[in_base]]
+            vectors[~in_base] = delta_vectors[block_rows[~in_base] - base_n]
+            yield block_rows, vectors
+
+    def _exact_search(self, queries: np.ndarray, k: int, rows: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        top_scores = np.zeros((len(queries), 0), dtype=np.float32)
+        top_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for block_rows, vectors in self._vector_blocks(rows):
+            scores = queries @ vectors.T
+            top_scores, top_rows = _top_k(
+                np.concatenate([top_scores, scores], axis=1),
+                np.concatenate([top_rows, np.broadcast_to(block_rows, scores.shape)], axis=1),
+                k
+            )
+        return _sorted_top_k(top_scores, top_rows, k)
+
+    def _shortlist(self, k: int) -> int:
+        return k * max(settings.VECTOR_INDEX_RESCORE_FACTOR, 1)
+
+    def _rescore(
+        self,
+        queries: np.ndarray,
+        scores: np.ndarray,
+        rows: np.ndarray,
+        k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if settings.VECTOR_INDEX_RESCORE_FACTOR <= 0:
+            return _sorted_top_k(np.where(rows >= 0, scores, -np.inf), rows, k)
+        candidates = np.unique(rows[rows >= 0])
+        exact = np.full(rows.shape, -np.inf, dtype=np.float32)
+        if len(candidates):
+            vectors = np.concatenate([vectors for _, vectors in self._vector_blocks(candidates)])
+            positions = np.searchsorted(candidates, np.maximum(rows, 0))
+            exact_scores = np.take_along_axis(queries @ vectors.T, positions, axis=1)
+            exact = np.where(rows >= 0, exact_scores, -np.inf)
+        return _sorted_top_k(exact, rows, k)
+
+    def _search(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def query(
+        self,
+        query_embeddings,
+        n_results: int = 10,
+        where: Optional[Dict] = None,
+        include=DEFAULT_INCLUDE
+    ) -> Dict:
+        queries = _normalize(query_embeddings)
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock.read():
+            if self.dimension is None or not self._num_rows:
+                for key in results:
+                    results[key] = [[] for _ in queries]
+                return results
+
+            allowed = self._allowed(where)
+            if allowed is not None and not allowed.any():
+                scores = np.zeros((len(queries), 0), dtype=np.float32)
+                rows = np.zeros((len(queries), 0), dtype=np.int64)
+            else:
+                scores, rows = self._search(queries, n_results, allowed)
+
+            for query_scores, query_rows in zip(scores, rows):
+                valid = query_rows >= 0
+                materialized = self._materialize(query_rows[valid].tolist(), include)
+                for key in ("ids", "documents", "metadatas"):
+                    results[key].append(materialized[key])
+                results["distances"].append((1.0 - query_scores[valid]).tolist())
+        return results
+
+    def _compaction_due(self) -> Optional[bool]:
+        if self._tombstones and len(self._tombstones) >= max(self.compact_threshold, self._num_rows // 4):
+            return True
+        if len(self._delta_ids) >= max(self.compact_threshold, self._base_n // 8):
+            return False
+        return None
+
+    def _begin_compaction(self, purge: bool) -> "VectorIndex":
+        logger.info(
+            f"Compacting vector index {self.name}: {self._base_n} base + {len(self._delta_ids)} delta rows, "
+            f"{len(self._tombstones)} tombstones ({'purging' if purge else 'keeping'} tombstones)"
+        )
+        snapshot = copy.copy(self)
+        snapshot._delta_ids = list(self._delta_ids)
+        snapshot._delta_texts = list(self._delta_texts)
+        snapshot._delta_metadatas = list(self._delta_metadatas)
+        snapshot._tombstones = set(self._tombstones)
+        snapshot._alive = None
+
+        self._compacting = True
+        self._log.close()
+        self._vector_log.close()
+        self._log_generation += 1
+        self._open_logs()
+        return snapshot
+
+    def _write_generation(self, new_generation: int, purge: bool):
+        rows = np.flatnonzero(self._alive_mask()) if purge else np.arange(self._num_rows)
+        tmp_dir = self.path / f"base-{new_generation}.tmp"
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+
+        vectors = np.lib.format.open_memmap(
+            tmp_dir / "vectors.npy", mode="w+", dtype=VECTOR_DTYPE, shape=(len(rows), self.dimension)
+        )
+        written = 0
+        for block_rows, block in self._vector_blocks(rows):
+            vectors[written:written + len(block_rows)] = block
+            written += len(block_rows)
+        vectors.flush()
+        del vectors
+
+        ids = np.concatenate([
+            np.asarray(self._base_ids),
+            np.asarray([chunk_id.encode("utf-8") for chunk_id in self._delta_ids], dtype="S")
+        ])[rows] if self._num_rows else np.zeros(0, dtype="S1")
+        order = np.argsort(ids, kind="stable")
+        np.save(tmp_dir / "ids.npy", ids)
+        np.save(tmp_dir / "id_keys.npy", ids[order])
+        np.save(tmp_dir / "id_rows.npy", order.astype(np.int64))
+
+        delta_texts = [text.encode("utf-8") for text in self._delta_texts]
+        base_texts_path = self._base_dir(self._generation) / "texts.bin"
+        with open(tmp_dir / "texts.bin", "wb") as f:
+            if purge:
+                lengths = np.zeros(len(rows), dtype=np.int64)
+                for i, row in enumerate(rows.tolist()):
+                    if row < self._base_n:
+                        text = self._base_texts[self._base_text_offsets[row]:self._base_text_offsets[row + 1]].tobytes()
+                    else:
+                        text = delta_texts[row - self._base_n]
+                    f.write(text)
+                    lengths[i] = len(text)
+            else:
+                if base_texts_path.exists():
+                    with open(base_texts_path, "rb") as base_texts:
+                        shutil.copyfileobj(base_texts, f)
+                f.write(b"".join(delta_texts))
+                lengths = np.concatenate([
+                    np.diff(np.asarray(self._base_text_offsets)),
+                    np.asarray([len(text) for text in delta_texts], dtype=np.int64)
+                ])
+        np.save(tmp_dir / "text_offsets.npy", np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64))
+
+        if self._delta_columns is None:
+            self._delta_columns = _Columns.from_metadatas(self._delta_metadatas)
+        columns = _Columns.concat([self._base_columns, self._delta_columns])
+        (columns.take(rows) if purge else columns).save(tmp_dir)
+        tombstones = [] if purge else sorted(self._tombstones)
+        np.save(tmp_dir / "tombstones.npy", np.asarray(tombstones, dtype=np.int64))
+        self._compact_engine(tmp_dir, rows, purge)
+
+        target = self._base_dir(new_generation)
+        if target.exists():
+            shutil.rmtree(target)
+        os.replace(tmp_dir, target)
+
+    def _finish_compaction(self, new_generation: int):
+        current_tmp = self.path / "CURRENT.tmp"
+        current_tmp.write_text(str(new_generation))
+        os.replace(current_tmp, self.path / "CURRENT")
+
+        old_generation = self._generation
+        self.close()
+        self._compacting = False
+        self._open()
+        for generation in range(old_generation, new_generation):
+            shutil.rmtree(self._base_dir(generation), ignore_errors=True)
+            self._log_path(generation).unlink(missing_ok=True)
+            self._vector_log_path(generation).unlink(missing_ok=True)
+
+    def _compact(self, purge: bool):
+        with self._lock.write():
+            if self._compacting:
+                return
+            snapshot = self._begin_compaction(purge)
+            new_generation = self._log_generation
+        try:
+            snapshot._write_generation(new_generation, purge)
+        except Exception:
+            with self._lock.write():
+                self._compacting = False
+            raise
+        with self._lock.write():
+            self._finish_compaction(new_generation)
+
+    def compact(self):
+        with self._lock.read():
+            purge = bool(self._tombstones) if self._delta_ids or self._tombstones else None
+        if purge is not None:
+            self._compact(purge)
+
+    def close(self):
+        with self._lock.write():
+            if self._log is not None:
+                self._log.close()
+                self._vector_log.close()
+                self._log = None
+                self._vector_log = None
+            self._close_engine()
+
+    def get_stats(self) -> Dict:
+        with self._lock.read():
+            return {
+                "engine": self.engine,
+                "codec": self.codec_name,
+                "live_rows": self._num_rows - len(self._tombstones),
+                "base_rows": self._base_n,
+                "delta_rows": len(self._delta_ids),
+                "tombstones": len(self._tombstones),
+                "generation": self._generation,
+                "vector_bytes": self._num_rows * (self.dimension or 0) * np.dtype(VECTOR_DTYPE).itemsize,
+            }
+
+
+class ExactVectorIndex(VectorIndex):
+    engine = "numpy"
+
+    def _codec_paths(self, base_dir: Path) -> Tuple[Path, Path]:
+        return base_dir / f"codes-{self.codec_name}.npy", base_dir / f"codec-{self.codec_name}.npz"
+
+    def _open_engine(self):
+        self._codec = None
+        self._base_codes = None
+        if self.dimension is None:
+            return
+
+        self._codec = create_codec(self.codec_name, self.dimension, settings.VECTOR_INDEX_PQ_SUBVECTORS)
+        if self._codec.exact:
+            self._base_codes = self._base_vectors
+            return
+        if not self._base_n:
+            self._base_codes = self._codec.encode(np.zeros((0, self.dimension), dtype=np.float32))
+            return
+
+        codes_path, codec_path = self._codec_paths(self._base_dir(self._generation))
+        codec = load_codec(codec_path, self.codec_name, self.dimension, settings.VECTOR_INDEX_PQ_SUBVECTORS)
+        if codec is not None and codes_path.exists():
+            self._codec = codec
+            self._base_codes = np.load(codes_path)
+            if len(self._base_codes) == self._base_n:
+                return
+
+        logger.info(f"Encoding {self._base_n} rows of vector index {self.name} as {self.codec_name}")
+        self._codec.train(train_sample(self._base_vectors, self._codec.train_rows))
+        self._base_codes = encode_all(self._codec, self._base_vectors)
+        np.save(codes_path, self._base_codes)
+        save_codec(self._codec, codec_path)
+
+    def _add_to_engine(self, vectors: np.ndarray):
+        if self._codec is None:
+            self._open_engine()
+
+    def _compact_engine(self, base_dir: Path, rows: np.ndarray, purge: bool):
+        if not self._base_n or self._codec.exact:
+            return
+        base_n = self._base_n
+        codes = np.concatenate([
+            self._base_codes[rows[rows < base_n]],
+            encode_all(self._codec, self._delta_vectors[rows[rows >= base_n] - base_n])
+        ])
+        codes_path, codec_path = self._codec_paths(base_dir)
+        np.save(codes_path, codes)
+        save_codec(self._codec, codec_path)
+
+    def _close_engine(self):
+        self._codec = None
+        self._base_codes = None
+
+    def _scan(self, queries: np.ndarray, k: int, rows: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        base_n = self._base_n
+        if rows is None:
+            blocks = (
+                (np.arange(start, min(start + SEARCH_BLOCK_ROWS, base_n)), slice(start, start + SEARCH_BLOCK_ROWS))
+                for start in range(0, base_n, SEARCH_BLOCK_ROWS)
+            )
+            delta_rows = np.arange(base_n, self._num_rows)
+        else:
+            base_rows = rows[rows < base_n]
+            blocks = (
+                (base_rows[start:start + SEARCH_BLOCK_ROWS],) * 2
+                for start in range(0, len(base_rows), SEARCH_BLOCK_ROWS)
+            )
+            delta_rows = rows[rows >= base_n]
+
+        top_scores = np.zeros((len(queries), 0), dtype=np.float32)
+        top_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        scored = chain(
+            ((block_rows, self._codec.scores(queries, self._base_codes[codes])) for block_rows, codes in blocks),
+            [(delta_rows, queries @ self._delta_vectors[delta_rows - base_n].T)] if len(delta_rows) else []
+        )
+        for block_rows, scores in scored:
+            top_scores, top_rows = _top_k(
+                np.concatenate([top_scores, scores], axis=1),
+                np.concatenate([top_rows, np.broadcast_to(block_rows, scores.shape)], axis=1),
+                k
+            )
+        return top_scores, top_rows
+
+    def _search(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        rows = None if allowed is None else np.flatnonzero(allowed)
+        if self._codec.exact:
+            return _sorted_top_k(*self._scan(queries, k, rows), k)
+        return self._rescore(queries, *self._scan(queries, self._shortlist(k), rows), k)
+
+    def get_stats(self) -> Dict:
+        with self._lock.read():
+            stats = super().get_stats()
+            stats["code_bytes"] = 0 if self._base_codes is None else int(self._base_codes.nbytes)
+            return stats
+
+
+def _import_faiss():
+    try:
+        import faiss
+    except ImportError:
+        logger.error(f"The hnsw vector store engine requires faiss. Install with: pip install '{FAISS_REQUIREMENT}'")
+        raise
+    missing = [
+        name for name in ("SearchParametersHNSW", "IDSelectorBitmap", "IO_FLAG_MMAP_IFC") if not hasattr(faiss, name)
+    ]
+    if missing:
+        raise ImportError(
+            f"faiss {getattr(faiss, '__version__', 'unknown')} lacks {', '.join(missing)}; "
+            f"the hnsw engine needs {FAISS_REQUIREMENT}"
+        )
+    return faiss
+
+
+class HNSWVectorIndex(VectorIndex):
+    engine = "hnsw"
+
+    def _graph_codec(self, num_rows: int) -> str:
+        if self.codec_name == "pq" and num_rows < PQ_TRAIN_ROWS:
+            return "float16"
+        return self.codec_name
+
+    def _graph_path(self, base_dir: Path, codec: str) -> Path:
+        return base_dir / f"hnsw-{codec}.faiss"
+
+    def _new_graph(self, codec: str):
+        faiss = self._faiss
+        m = settings.VECTOR_INDEX_HNSW_M
+        if codec == "float32":
+            graph = faiss.IndexHNSWFlat(self.dimension, m, faiss.METRIC_INNER_PRODUCT)
+        elif codec == "pq":
+            subvectors = create_codec("pq", self.dimension, settings.VECTOR_INDEX_PQ_SUBVECTORS).subvectors
+            graph = faiss.IndexHNSWPQ(self.dimension, subvectors, m, 8, faiss.METRIC_INNER_PRODUCT)
+        else:
+            quantizer = faiss.ScalarQuantizer.QT_fp16 if codec == "float16" else faiss.ScalarQuantizer.QT_8bit
+            graph = faiss.IndexHNSWSQ(self.dimension, quantizer, m, faiss.METRIC_INNER_PRODUCT)
+        graph.hnsw.efConstruction = settings.VECTOR_INDEX_HNSW_EF_CONSTRUCTION
+        return graph
+
+    def _build_graph(self, codec: str, rows: np.ndarray):
+        graph = self._new_graph(codec)
+        if not graph.is_trained:
+            graph.train(train_sample(self._base_vectors, PQ_TRAIN_ROWS))
+        target = graph
+        if codec == "pq":
+            target = self._new_graph("float16")
+            for _, vectors in self._vector_blocks(rows):
+                graph.storage.add(vectors)
+        for _, vectors in self._vector_blocks(rows):
+            target.add(vectors)
+        if codec == "pq":
+            graph.hnsw = target.hnsw
+            graph.ntotal = target.ntotal
+        return graph
+
+    def _open_engine(self):
+        self._faiss = _import_faiss()
+        self._base_graph = None
+        self._delta_graph = None
+        self._graph_codec_name = self._graph_codec(self._base_n)
+        if self.dimension is None:
+            return
+
+        graph_path = self._graph_path(self._base_dir(self._generation), self._graph_codec_name)
+        if self._base_n:
+            if graph_path.exists():
+                self._base_graph = self._faiss.read_index(str(graph_path), self._faiss.IO_FLAG_MMAP_IFC)
+            if self._base_graph is None or self._base_graph.ntotal != self._base_n:
+                logger.info(
+                    f"Building {self._graph_codec_name} HNSW graph for {self._base_n} rows of vector index {self.name}"
+                )
+                graph = self._build_graph(self._graph_codec_name, np.arange(self._base_n))
+                self._faiss.write_index(graph, str(graph_path))
+                self._base_graph = self._faiss.read_index(str(graph_path), self._faiss.IO_FLAG_MMAP_IFC)
+        if len(self._delta_ids):
+            self._delta_graph = self._new_graph("float32")
+            self._delta_graph.add(self._delta_vectors)
+
+    def _add_to_engine(self, vectors: np.ndarray):
+        if self._delta_graph is None:
+            self._delta_graph = self._new_graph("float32")
+        self._delta_graph.add(vectors)
+
+    def _compact_engine(self, base_dir: Path, rows: np.ndarray, purge: bool):
+        codec = self._graph_codec_name
+        if not self._base_n or self._graph_codec(len(rows)) != codec:
+            return
+        if purge or codec == "pq":
+            graph = self._build_graph(codec, rows)
+        else:
+            graph = self._faiss.read_index(str(self._graph_path(self._base_dir(self._generation), codec)))
+            graph.add(self._delta_vectors)
+        self._faiss.write_index(graph, str(self._graph_path(base_dir, codec)))
+
+    def _close_engine(self):
+        self._base_graph = None
+        self._delta_graph = None
+
+    def _search_graph(self, graph, queries: np.ndarray, k: int, allowed: Optional[np.ndarray], offset: int):
+        if allowed is not None and not allowed.any():
+            return np.zeros((len(queries), 0), dtype=np.float32), np.zeros((len(queries), 0), dtype=np.int64)
+        bitmap = None
+        params = self._faiss.SearchParametersHNSW()
+        params.efSearch = max(settings.VECTOR_INDEX_HNSW_EF_SEARCH, k)
+        if allowed is not None:
+            bitmap = np.packbits(allowed, bitorder="little")
+            params.sel = self._faiss.IDSelectorBitmap(len(allowed), self._faiss.swig_ptr(bitmap))
+        scores, rows = graph.search(queries, k, params=params)
+        return scores, np.where(rows >= 0, rows + offset, -1)
+
+    def _search(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        if allowed is not None and int(allowed.sum()) <= settings.VECTOR_INDEX_EXACT_SEARCH_MAX_ROWS:
+            return self._exact_search(queries, k, np.flatnonzero(allowed))
+
+        shortlist = k if self._graph_codec_name == "float32" else self._shortlist(k)
+        base_n = self._base_n
+        parts = []
+        if self._base_graph is not None:
+            parts.append(self._search_graph(
+                self._base_graph, queries, shortlist, None if allowed is None else allowed[:base_n], 0
+            ))
+        if self._delta_graph is not None:
+            parts.append(self._search_graph(
+                self._delta_graph, queries, shortlist, None if allowed is None else allowed[base_n:], base_n
+            ))
+        scores = np.concatenate([part[0] for part in parts], axis=1)
+        rows = np.concatenate([part[1] for part in parts], axis=1)
+        if shortlist == k:
+            return _sorted_top_k(np.where(rows >= 0, scores, -np.inf), rows, k)
+        return self._rescore(queries, scores, rows, k)
+
+
+class LocalVectorClient:
+    def __init__(self, path: Path, engine: str):
+        self.path = path
+        self.engine = engine
+        self._index_class = {"numpy": ExactVectorIndex, "hnsw": HNSWVectorIndex}[engine]
+        self._indexes: Dict[str, VectorIndex] = {}
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def list_collections(self) -> List[str]:
+        return sorted(path.name for path in self.path.iterdir() if path.is_dir())
+
+    def get_collection(self, name: str) -> VectorIndex:
+        if name not in self._indexes:
+            if not (self.path / name).is_dir():
+                raise ValueError(f"Collection {name} does not exist")
+            self._indexes[name] = self._index_class(self.path / name, name)
+        return self._indexes[name]
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict] = None) -> VectorIndex:
+        if name not in self._indexes:
+            self._indexes[name] = self._index_class(self.path / name, name)
+        return self._indexes[name]
+
+    def delete_collection(self, name: str):
+        index = self._indexes.pop(name, None)
+        if index is not None:
+            index.close()
+        shutil.rmtree(self.path / name, ignore_errors=True)
+
+
+def create_vector_client(engine: str):
+    if engine not in ENGINES:
+        raise ValueError(f"VECTOR_STORE_ENGINE must be one of {ENGINES}, got {engine!r}")
+    if engine == "chroma":
+        import chromadb
+
+        return chromadb.PersistentClient(path=str(settings.DATABASE_PATH))
+    if settings.VECTOR_INDEX_CODEC not in CODECS:
+        raise ValueError(f"VECTOR_INDEX_CODEC must be one of {tuple(CODECS)}, got {settings.VECTOR_INDEX_CODEC!r}")
+    return LocalVectorClient(settings.VECTOR_INDEX_PATH, engine)
@@ -1,108 +1,354 @@
+import hashlib
 import logging
-from typing import List, Dict, Tuple
-import chromadb
+import re
+import time
+from typing import Iterator, List, Dict, Optional, Tuple, Union
+import numpy as np
 from app.core import settings
+from app.services.vector_index import create_vector_client
 
 logger = logging.getLogger(__name__)
 
+MAIN_COLLECTION = "documents"
+PARTITION_MODES = ("none", "tenant", "document")
+
+
+def build_where(
+    document_ids: Optional[List[str]] = None,
+    page_from: Optional[int] = None,
+    page_to: Optional[int] = None
+) -> Optional[Dict]:
+    clauses = []
+    if document_ids is not None:
+        clauses.append({"document_id": {"$in": list(document_ids)}})
+    if page_from is not None:
+        clauses.append({"page_number": {"$gte": page_from}})
+    if page_to is not None:
+        clauses.append({"page_number": {"$lte": page_to}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
 
 class VectorStoreService:
     def __init__(self):
         self.client = None
         self.collection = None
+        self.engine = settings.VECTOR_STORE_ENGINE
+        self.partition_by = settings.VECTOR_STORE_PARTITION_BY
+        if self.partition_by not in PARTITION_MODES:
+            raise ValueError(f"VECTOR_STORE_PARTITION_BY must be one of {PARTITION_MODES}, got {self.partition_by!r}")
+        self.write_batch_size = settings.VECTOR_STORE_WRITE_BATCH_SIZE
+        self._collections: Dict[str, object] = {}
+        self._write_stats = {"rows_written": 0, "write_batches": 0, "write_seconds": 0.0}
         self._initialize_db()
 
     def _initialize_db(self):
-        logger.info(f"Initializing ChromaDB at {settings.DATABASE_PATH}")
+        logger.info(f"Initializing {self.engine} vector store (partitioned by {self.partition_by})")
         try:
-            self.client = chromadb.PersistentClient(
-                path=str(settings.DATABASE_PATH)
+            self.client = create_vector_client(self.engine)
+
+            self.collection = self._get_or_create(MAIN_COLLECTION)
+            for collection in self.client.list_collections():
+                name = getattr(collection, "name", collection)
+                if name.startswith(f"{MAIN_COLLECTION}_") and name not in self._collections:
+                    self._collections[name] = self.client.get_collection(name=name)
+            max_batch_size = self._client_max_batch_size()
+            if max_batch_size:
+                self.write_batch_size = min(self.write_batch_size, max_batch_size)
+            logger.info("Vector store initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize vector store: {e}")
+            raise
+
+    def _get_or_create(self, name: str):
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self.client.get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
+            self._collections[name] = collection
+        return collection
+
+    @staticmethod
+    def _tenant_partition(tenant: str) -> str:
+        if tenant == settings.DEFAULT_TENANT:
+            return MAIN_COLLECTION
+        slug = re.sub(r"[^a-zA-Z0-9_-]", "", tenant)[:32]
+        digest = hashlib.sha1(tenant.encode("utf-8")).hexdigest()[:8]
+        return f"{MAIN_COLLECTION}_t_{slug}_{digest}"
+
+    def _partition(self, document_id: Optional[str] = None, tenant: Optional[str] = None) -> Optional[str]:
+        if self.partition_by == "none":
+            return MAIN_COLLECTION
+        if self.partition_by == "tenant":
+            return self._tenant_partition(tenant) if tenant is not None else None
+        return f"{MAIN_COLLECTION}_d_{document_id}" if document_id is not None else None
+
+    def _scoped_collections(
+        self,
+        document_ids: Optional[List[str]] = None,
+        tenant: Optional[str] = None
+    ) -> List:
+        if self.partition_by == "none":
+            return [self.collection]
+        if self.partition_by == "tenant" and tenant is not None:
+            names = {self._tenant_partition(tenant)}
+        elif self.partition_by == "document":
+            if document_ids is None:
+                raise ValueError("VECTOR_STORE_PARTITION_BY=document requires a document scope")
+            names = {self._partition(document_id=document_id) for document_id in document_ids} | {MAIN_COLLECTION}
+        else:
+            names = set(self._collections)
+        return [self._collections[name] for name in sorted(names) if name in self._collections]
+
+    def _client_max_batch_size(self) -> int:
+        try:
+            return self.client.get_max_batch_size()
+        except Exception:
+            return getattr(self.client, "max_batch_size", 0)
+
+    def _write(
+        self,
+        write,
+        chunk_texts: List[str],
+        embeddings: Union[np.ndarray, List[List[float]]],
+        metadatas: List[Dict],
+        ids: List[str]
+    ) -> int:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        start = time.perf_counter()
+        for offset in range(0, len(ids), self.write_batch_size):
+            end = offset + self.write_batch_size
+            write(
+                ids=ids[offset:end],
+                embeddings=list(embeddings[offset:end]),
+                metadatas=metadatas[offset:end],
+                documents=chunk_texts[offset:end]
             )
+            self._write_stats["write_batches"] += 1
+        elapsed = time.perf_counter() - start
+        self._write_stats["rows_written"] += len(ids)
+        self._write_stats["write_seconds"] += elapsed
+        return elapsed
+
+    def _write_partitioned(
+        self,
+        method: str,
+        chunk_texts: List[str],
+        embeddings: Union[np.ndarray, List[List[float]]],
+        metadatas: List[Dict],
+        ids: List[str]
+    ) -> float:
+        if self.partition_by == "none":
+            return self._write(getattr(self.collection, method), chunk_texts, embeddings, metadatas, ids)
 
-            self.collection = self.client.get_or_create_collection(
-                name="documents",
-                metadata={"hnsw:space": "cosine"}
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        rows_by_partition: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            name = self._partition(metadata.get("document_id"), metadata.get("tenant", settings.DEFAULT_TENANT))
+            rows_by_partition.setdefault(name, []).append(i)
+
+        elapsed = 0.0
+        for name, rows in rows_by_partition.items():
+            elapsed += self._write(
+                getattr(self._get_or_create(name), method),
+                [chunk_texts[i] for i in rows],
+                embeddings[rows],
+                [metadatas[i] for i in rows],
+                [ids[i] for i in rows]
             )
-            logger.info("ChromaDB initialized successfully")
+        return elapsed
+
+    def add_documents(
+        self,
+        chunk_texts: List[str],
+        embeddings: Union[np.ndarray, List[List[float]]],
+        metadatas: List[Dict],
+        ids: List[str]
+    ) -> bool:
+        try:
+            elapsed = self._write_partitioned("add", chunk_texts, embeddings, metadatas, ids)
+            logger.info(f"Added {len(ids)} documents to vector store ({len(ids) / max(elapsed, 1e-9):.0f} rows/s)")
+            return True
         except Exception as e:
-            logger.error(f"Failed to initialize ChromaDB: {e}")
+            logger.error(f"Failed to add documents to vector store: {e}")
             raise
 
-    def add_documents(
+    def upsert_documents(
         self,
         chunk_texts: List[str],
-        embeddings: List[List[float]],
+        embeddings: Union[np.ndarray, List[List[float]]],
         metadatas: List[Dict],
         ids: List[str]
     ) -> bool:
         try:
-            self.collection.add(
-                ids=ids,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                documents=chunk_texts
+            elapsed = self._write_partitioned("upsert", chunk_texts, embeddings, metadatas, ids)
+            logger.info(
+                f"Upserted {len(ids)} documents into vector store ({len(ids) / max(elapsed, 1e-9):.0f} rows/s)"
             )
-            logger.info(f"Added {len(ids)} documents to vector store")
             return True
         except Exception as e:
-            logger.error(f"Failed to add documents to vector store: {e}")
+            logger.error(f"Failed to upsert documents into vector store: {e}")
             raise
 
     def search(
         self,
         query_embedding: List[float],
-        top_k: int = None
+        top_k: int = None,
+        scope: Optional[Dict] = None
     ) -> List[Dict]:
+        return self.search_batch([query_embedding], top_k=top_k, scope=scope)[0]
+
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = None,
+        scope: Optional[Dict] = None
+    ) -> List[List[Dict]]:
         try:
             if top_k is None:
                 top_k = settings.RETRIEVAL_TOP_K
+            scope = scope or {}
 
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                include=["documents", "metadatas", "distances"]
-            )
-
-            retrieved_docs = []
-            if results and results["documents"]:
-                for i, (doc, metadata, distance) in enumerate(
-                    zip(
-                        results["documents"][0],
-                        results["metadatas"][0],
-                        results["distances"][0]
+            hits: List[List[Tuple[float, str, Dict]]] = [[] for _ in query_embeddings]
+            if scope.get("document_ids") != []:
+                where = build_where(scope.get("document_ids"), scope.get("page_from"), scope.get("page_to"))
+                for collection in self._scoped_collections(scope.get("document_ids"), scope.get("tenant")):
+                    results = collection.query(
+                        query_embeddings=query_embeddings,
+                        n_results=top_k,
+                        where=where,
+                        include=["documents", "metadatas", "distances"]
                     )
-                ):
-                    similarity_score = 1 - distance
-                    retrieved_docs.append({
+                    if not results or not results["documents"]:
+                        continue
+                    for query_idx in range(len(query_embeddings)):
+                        hits[query_idx].extend(zip(
+                            results["distances"][query_idx],
+                            results["documents"][query_idx],
+                            results["metadatas"][query_idx]
+                        ))
+
+            all_retrieved = []
+            for query_hits in hits:
+                query_hits.sort(key=lambda hit: hit[0])
+                all_retrieved.append([
+                    {
                         "text": doc,
                         "metadata": metadata,
-                        "similarity_score": similarity_score,
+                        "similarity_score": 1 - distance,
                         "rank": i + 1
-                    })
+                    }
+                    for i, (distance, doc, metadata) in enumerate(query_hits[:top_k])
+                ])
 
-            logger.debug(f"Retrieved {len(retrieved_docs)} documents from vector store")
-            return retrieved_docs
+            logger.debug(
+                f"Retrieved {sum(len(docs) for docs in all_retrieved)} documents "
+                f"for {len(query_embeddings)} queries from vector store"
+            )
+            return all_retrieved
 
         except Exception as e:
             logger.error(f"Failed to search vector store: {e}")
             raise
 
-    def delete_document(self, document_id: str) -> bool:
+    def get_by_ids(self, ids: List[str], scope: Optional[Dict] = None) -> List[Dict]:
         try:
+            scope = scope or {}
+            if not ids or scope.get("document_ids") == []:
+                return []
+
+            where = build_where(scope.get("document_ids"), scope.get("page_from"), scope.get("page_to"))
+            found = {}
+            for collection in self._scoped_collections(scope.get("document_ids"), scope.get("tenant")):
+                results = collection.get(
+                    ids=ids,
+                    where=where,
+                    include=["documents", "metadatas"]
+                )
+                found.update(
+                    (chunk_id, (doc, metadata))
+                    for chunk_id, doc, metadata in zip(results["ids"], results["documents"], results["metadatas"])
+                )
+
+            return [
+                {
+                    "text": found[chunk_id][0],
+                    "metadata": found[chunk_id][1],
+                    "similarity_score": 0.0
+                }
+                for chunk_id in ids
+                if chunk_id in found
+            ]
+
+        except Exception as e:
+            logger.error(f"Failed to get documents by id: {e}")
+            raise
+
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[Tuple[str, str, Dict]]:
+        for collection in list(self._collections.values()):
+            offset = 0
+            while True:
+                results = collection.get(
+                    limit=batch_size,
+                    offset=offset,
+                    include=["documents", "metadatas"]
+                )
+                if not results["ids"]:
+                    break
+                yield from zip(results["ids"], results["documents"], results["metadatas"])
+                offset += len(results["ids"])
+
+    def _owning_collections(self, document_id: Optional[str], tenant: Optional[str]) -> List:
+        name = self._partition(document_id, tenant)
+        if name is None:
+            return list(self._collections.values())
+        names = {name, MAIN_COLLECTION}
+        return [self._collections[name] for name in sorted(names) if name in self._collections]
+
+    def delete_document(self, document_id: str, tenant: Optional[str] = None) -> bool:
+        try:
+            partition = self._partition(document_id, tenant)
+            if self.partition_by == "document" and partition in self._collections:
+                self.client.delete_collection(name=partition)
+                del self._collections[partition]
             where_filter = {"document_id": {"$eq": document_id}}
-            self.collection.delete(where=where_filter)
+            for collection in self._owning_collections(document_id, tenant):
+                collection.delete(where=where_filter)
             logger.info(f"Deleted document {document_id} from vector store")
             return True
         except Exception as e:
             logger.error(f"Failed to delete document {document_id}: {e}")
             raise
 
+    def delete_chunks(
+        self,
+        chunk_ids: List[str],
+        document_id: Optional[str] = None,
+        tenant: Optional[str] = None
+    ) -> bool:
+        try:
+            if chunk_ids:
+                for collection in self._owning_collections(document_id, tenant):
+                    collection.delete(ids=chunk_ids)
+                logger.info(f"Deleted {len(chunk_ids)} chunks from vector store")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete chunks from vector store: {e}")
+            raise
+
     def get_collection_stats(self) -> Dict:
         try:
-            count = self.collection.count()
+            count = sum(collection.count() for collection in list(self._collections.values()))
+            write_seconds = self._write_stats["write_seconds"]
             return {
                 "total_chunks": count,
-                "collection_name": self.collection.name
+                "collection_name": self.collection.name,
+                "engine": self.engine,
+                "partition_by": self.partition_by,
+                "partitions": len(self._collections),
+                "write_batch_size": self.write_batch_size,
+                **self._write_stats,
+                "rows_per_second": self._write_stats["rows_written"] / write_seconds if write_seconds else 0.0
             }
         except Exception as e:
             logger.error(f"Failed to get collection stats: {e}")
@@ -110,11 +356,10 @@ class VectorStoreService:
 
     def clear_collection(self) -> bool:
         try:
-            self.client.delete_collection(name="documents")
-            self.collection = self.client.get_or_create_collection(
-                name="documents",
-                metadata={"hnsw:space": "cosine"}
-            )
+            for name in list(self._collections):
+                self.client.delete_collection(name=name)
+            self._collections.clear()
+            self.collection = self._get_or_create(MAIN_COLLECTION)
             logger.info("Cleared vector store")
             return True
         except Exception as e:
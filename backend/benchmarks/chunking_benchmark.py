@@ -0,0 +1,111 @@
+import argparse
+import logging
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, List
+from app.core import settings
+from app.services.chunking import chunking_service
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+VOCABULARY = (
+    "the system retrieval document page index query vector embedding model pump pressure "
+    "maintenance hydraulic revenue quarter segment report analysis method result table figure "
+    "section value process operator training warranty inspection filter fluid seal cycle"
+).split()
+
+
+def synthetic_document(pages: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    page_texts = []
+    for _ in range(pages):
+        paragraphs = []
+        for _ in range(rng.randint(3, 6)):
+            sentences = [
+                " ".join(rng.choices(VOCABULARY, k=rng.randint(8, 24))).capitalize() + rng.choice(".?!")
+                for _ in range(rng.randint(2, 6))
+            ]
+            paragraphs.append(" ".join(sentences))
+        page_texts.append("\n\n".join(paragraphs))
+    return "\n\n".join(page_texts)
+
+
+class CountingTokenizer:
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.calls = 0
+
+    def encode(self, text: str) -> List[int]:
+        self.calls += 1
+        return self.tokenizer.encode(text, verbose=False)
+
+
+def legacy_chunks(text: str, tokenizer: CountingTokenizer) -> List[int]:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP,
+        length_function=lambda t: len(tokenizer.encode(t)),
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+    return [len(tokenizer.encode(chunk)) for chunk in splitter.split_text(text)]
+
+
+def single_pass_chunks(text: str, tokenizer: CountingTokenizer) -> List[int]:
+    tokenizer.calls += 1
+    return [span["token_count"] for span in chunking_service.split_text(text)]
+
+
+def run(name: str, chunker: Callable, text: str):
+    tokenizer = CountingTokenizer(chunking_service.tokenizer)
+    start = time.perf_counter()
+    token_counts = chunker(text, tokenizer)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    oversized = sum(1 for count in token_counts if count > settings.CHUNK_SIZE)
+    logger.info(
+        f"{name:>12} {elapsed_ms:>10.1f} {tokenizer.calls:>10} {len(token_counts):>7} "
+        f"{statistics.fmean(token_counts):>8.1f} {max(token_counts):>5} {oversized:>9}"
+    )
+    return elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the single-pass token-offset chunker against the legacy recursive splitter"
+    )
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--file", type=Path, help="Chunk this text file instead of synthetic documents")
+    parser.add_argument(
+        "--legacy-max-pages", type=int, default=500,
+        help="Skip the legacy splitter above this many pages (it re-tokenizes every candidate split)"
+    )
+    args = parser.parse_args()
+
+    documents = [(args.file.name, args.file.read_text(), 0)] if args.file else [
+        (f"{pages} pages", synthetic_document(pages), pages) for pages in args.pages
+    ]
+
+    logger.info(f"chunk_size={settings.CHUNK_SIZE} chunk_overlap={settings.CHUNK_OVERLAP}")
+    for label, text, pages in documents:
+        logger.info(f"\n{label}: {len(text):,} chars")
+        logger.info(
+            f"{'chunker':>12} {'time ms':>10} {'tok calls':>10} {'chunks':>7} {'avg tok':>8} {'max':>5} {'oversized':>9}"
+        )
+        fast_ms = run("single-pass", single_pass_chunks, text)
+        if pages > args.legacy_max_pages:
+            logger.info(f"{'legacy':>12} skipped (more than {args.legacy_max_pages} pages)")
+            continue
+        try:
+            legacy_ms = run("legacy", legacy_chunks, text)
+        except ImportError:
+            logger.info(f"{'legacy':>12} skipped (langchain-text-splitters not installed)")
+            continue
+        logger.info(f"{'speedup':>12} {legacy_ms / fast_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
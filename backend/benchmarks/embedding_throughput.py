@@ -0,0 +1,83 @@
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+from app.core import settings
+from app.services import embedding_service
+from app.services.batching import MicroBatcher
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+BASE_QUERIES = [
+    "What are the safety requirements for the pressure valve?",
+    "Summarize the quarterly revenue figures",
+    "Who is responsible for incident escalation?",
+    "How do I reset the controller to factory settings?",
+    "List the warranty exclusions",
+]
+
+
+def make_queries(n: int, run_id: str) -> List[str]:
+    return [f"{BASE_QUERIES[i % len(BASE_QUERIES)]} ({run_id}-{i})" for i in range(n)]
+
+
+def measure(embed_fn: Callable[[str], object], queries: List[str], concurrency: int) -> float:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        list(pool.map(embed_fn, queries))
+        elapsed = time.perf_counter() - start
+    return len(queries) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare query-embedding throughput with and without micro-batching"
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--queries-per-level", type=int, default=256)
+    parser.add_argument("--window-ms", type=float, default=settings.EMBEDDING_BATCH_WINDOW_MS)
+    parser.add_argument("--max-batch-size", type=int, default=settings.EMBEDDING_MAX_BATCH_SIZE)
+    args = parser.parse_args()
+
+    model = embedding_service.model
+    model.encode(BASE_QUERIES, convert_to_numpy=True)
+
+    def encode_single(query: str):
+        return model.encode(query, convert_to_numpy=True)
+
+    batcher = MicroBatcher(
+        name="benchmark-embedding",
+        process_batch=lambda queries: list(
+            model.encode(queries, batch_size=len(queries), show_progress_bar=False, convert_to_numpy=True)
+        ),
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.window_ms
+    )
+
+    def encode_batched(query: str):
+        return batcher.submit(query).result()
+
+    logger.info(
+        f"Micro-batching window {args.window_ms}ms, max batch {args.max_batch_size}, "
+        f"{args.queries_per_level} queries per level"
+    )
+    logger.info(f"{'concurrency':>12} {'unbatched q/s':>14} {'batched q/s':>12} {'speedup':>8} {'avg batch':>10}")
+    for concurrency in args.concurrency:
+        unbatched_qps = measure(encode_single, make_queries(args.queries_per_level, f"u{concurrency}"), concurrency)
+
+        stats_before = batcher.get_stats()
+        batched_qps = measure(encode_batched, make_queries(args.queries_per_level, f"b{concurrency}"), concurrency)
+        stats_after = batcher.get_stats()
+
+        batches = stats_after["batches"] - stats_before["batches"]
+        avg_batch = (stats_after["items"] - stats_before["items"]) / batches if batches else 0.0
+        logger.info(
+            f"{concurrency:>12} {unbatched_qps:>14.1f} {batched_qps:>12.1f} "
+            f"{batched_qps / unbatched_qps:>7.2f}x {avg_batch:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import logging
+import statistics
+import time
+from pathlib import Path
+from typing import List
+from app.core import settings
+from app.services import embedding_service, reranker_service, vector_store_service
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERIES = [
+    "What is the main topic of the document?",
+    "Summarize the key findings.",
+    "What methodology was used?",
+    "List the limitations mentioned by the authors.",
+    "What are the recommended next steps?",
+]
+
+
+def chunk_ids(ranked) -> List[str]:
+    return [doc["metadata"].get("chunk_id") for doc, _ in ranked]
+
+
+def timed_rerank(query: str, candidates: List[dict], top_k: int, use_cascade: bool):
+    reranker_service.score_cache.clear()
+    start = time.perf_counter()
+    ranked = reranker_service.rerank_with_metadata(query, candidates, top_k=top_k, use_cascade=use_cascade)
+    return ranked, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare cascade reranking against the full cross-encoder: recall@k and latency"
+    )
+    parser.add_argument("--queries-file", type=Path, help="Text file with one query per line")
+    parser.add_argument("--retrieval-top-k", type=int, default=settings.RETRIEVAL_TOP_K)
+    parser.add_argument("--rerank-top-k", type=int, default=settings.RERANK_TOP_K)
+    parser.add_argument("--stage1-sizes", type=int, nargs="+", default=[settings.RERANK_CASCADE_CANDIDATES])
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        queries = [line.strip() for line in args.queries_file.read_text().splitlines() if line.strip()]
+
+    candidate_sets = []
+    for query in queries:
+        query_embedding = embedding_service.embed_query(query)
+        candidates = vector_store_service.search(query_embedding.tolist(), top_k=args.retrieval_top_k)
+        if candidates:
+            candidate_sets.append((query, candidates))
+
+    if not candidate_sets:
+        logger.error("No documents retrieved; upload documents before running the evaluation")
+        return
+
+    reranker_service.rerank_with_metadata(candidate_sets[0][0], candidate_sets[0][1][:2], use_cascade=False)
+
+    full_results = {}
+    full_latencies = []
+    for query, candidates in candidate_sets:
+        ranked, latency_ms = timed_rerank(query, candidates, args.rerank_top_k, use_cascade=False)
+        full_results[query] = set(chunk_ids(ranked))
+        full_latencies.append(latency_ms)
+
+    full_mean = statistics.fmean(full_latencies)
+    logger.info(
+        f"{len(candidate_sets)} queries, {args.retrieval_top_k} candidates each, "
+        f"recall@{args.rerank_top_k} measured against the full reranker"
+    )
+    logger.info(f"{'stage 1 size':>13} {'recall':>8} {'full ms':>9} {'cascade ms':>11} {'saved':>7}")
+
+    original_candidates = settings.RERANK_CASCADE_CANDIDATES
+    try:
+        for stage1_size in args.stage1_sizes:
+            settings.RERANK_CASCADE_CANDIDATES = stage1_size
+            recalls = []
+            cascade_latencies = []
+            for query, candidates in candidate_sets:
+                ranked, latency_ms = timed_rerank(query, candidates, args.rerank_top_k, use_cascade=True)
+                reference = full_results[query]
+                if reference:
+                    recalls.append(len(reference & set(chunk_ids(ranked))) / len(reference))
+                cascade_latencies.append(latency_ms)
+
+            cascade_mean = statistics.fmean(cascade_latencies)
+            mean_recall = statistics.fmean(recalls) if recalls else 0.0
+            logger.info(
+                f"{stage1_size:>13} {mean_recall:>8.3f} {full_mean:>9.1f} "
+                f"{cascade_mean:>11.1f} {1 - cascade_mean / full_mean:>6.1%}"
+            )
+    finally:
+        settings.RERANK_CASCADE_CANDIDATES = original_candidates
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import logging
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, List
+import numpy as np
+from app.core import settings
+from app.services.inference_backend import SUPPORTED_BACKENDS, load_cross_encoder, load_sentence_transformer
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY = "What maintenance is required for the hydraulic pump?"
+DEFAULT_PASSAGES = [
+    "The hydraulic pump must be inspected every 500 operating hours for leaks and worn seals.",
+    "Quarterly revenue grew 12% year over year, driven by the services segment.",
+    "Replace the pump filter cartridge annually or when the pressure differential exceeds 2 bar.",
+    "Employees must complete safety training before operating heavy machinery.",
+    "Hydraulic fluid should be changed every 2,000 hours using ISO VG 46 grade oil.",
+    "The warranty does not cover damage caused by unauthorized modifications.",
+    "Noise from the pump usually indicates cavitation due to low fluid levels.",
+    "The conference will take place in the main auditorium on the third floor.",
+]
+
+
+def time_call(func: Callable, repeats: int) -> float:
+    func()
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def rank_agreement(reference: np.ndarray, candidate: np.ndarray, top_k: int) -> tuple:
+    reference_order = np.argsort(-reference)
+    candidate_order = np.argsort(-candidate)
+    top_k = min(top_k, len(reference))
+    overlap = len(set(reference_order[:top_k]) & set(candidate_order[:top_k])) / top_k
+
+    reference_ranks = np.argsort(reference_order)
+    candidate_ranks = np.argsort(candidate_order)
+    n = len(reference)
+    spearman = 1 - 6 * np.sum((reference_ranks - candidate_ranks) ** 2) / (n * (n ** 2 - 1)) if n > 1 else 1.0
+    return overlap, float(spearman)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Parity and latency of the embedding and reranker models on each inference backend"
+    )
+    parser.add_argument("--backends", nargs="+", default=list(SUPPORTED_BACKENDS))
+    parser.add_argument("--passages-file", type=Path, help="Text file with one passage per line")
+    parser.add_argument("--query", default=DEFAULT_QUERY)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--top-k", type=int, default=settings.RERANK_TOP_K)
+    args = parser.parse_args()
+
+    passages: List[str] = DEFAULT_PASSAGES
+    if args.passages_file:
+        passages = [line.strip() for line in args.passages_file.read_text().splitlines() if line.strip()]
+    pairs = [[args.query, passage] for passage in passages]
+
+    reference_embedder = load_sentence_transformer(settings.EMBEDDING_MODEL, backend="torch")
+    reference_reranker = load_cross_encoder(settings.RERANKER_MODEL, backend="torch")
+    reference_embeddings = reference_embedder.encode(passages, convert_to_numpy=True, normalize_embeddings=True)
+    reference_scores = np.asarray(reference_reranker.predict(pairs, show_progress_bar=False))
+
+    logger.info(f"{len(passages)} passages, median of {args.repeats} runs, device {settings.DEVICE}")
+    logger.info(
+        f"{'backend':>11} {'embed ms':>9} {'min cos':>8} {'mean cos':>9} "
+        f"{'rerank ms':>10} {'top-k overlap':>14} {'spearman':>9}"
+    )
+    for backend in args.backends:
+        try:
+            embedder = load_sentence_transformer(settings.EMBEDDING_MODEL, backend=backend)
+            reranker = load_cross_encoder(settings.RERANKER_MODEL, backend=backend)
+        except Exception as e:
+            logger.warning(f"{backend:>11} unavailable: {e}")
+            continue
+
+        embeddings = embedder.encode(passages, convert_to_numpy=True, normalize_embeddings=True)
+        cosines = np.sum(embeddings * reference_embeddings, axis=1)
+        scores = np.asarray(reranker.predict(pairs, show_progress_bar=False))
+        overlap, spearman = rank_agreement(reference_scores, scores, args.top_k)
+
+        embed_ms = time_call(lambda: embedder.encode(passages, convert_to_numpy=True), args.repeats)
+        rerank_ms = time_call(lambda: reranker.predict(pairs, show_progress_bar=False), args.repeats)
+
+        logger.info(
+            f"{backend:>11} {embed_ms:>9.1f} {cosines.min():>8.4f} {cosines.mean():>9.4f} "
+            f"{rerank_ms:>10.1f} {overlap:>14.2f} {spearman:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import logging
+import socket
+import threading
+import time
+from typing import Dict, List
+from app.core import settings
+from benchmarks.load_test import percentile
+from benchmarks.mock_openai import MockBehavior, create_app
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logging.getLogger("app.services.llm").setLevel(logging.CRITICAL)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
+
+SCENARIOS = {
+    "healthy": MockBehavior(),
+    "tail-stalls": MockBehavior(stall_rate=0.05, stall_ms=3000.0),
+    "server-errors": MockBehavior(error_rate=0.2),
+    "rate-limited": MockBehavior(rate_limit_rate=0.3),
+}
+
+
+def start_mock_server(app) -> str:
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+async def run_calls(service, kind: str, num_calls: int, concurrency: int, run_id: str) -> Dict:
+    latencies_ms: List[float] = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with gate:
+            start = time.perf_counter()
+            try:
+                if kind == "rewrite":
+                    await service.rewrite_query(f"query {run_id}-{i}")
+                elif kind == "generate":
+                    await service.generate_response(f"query {run_id}-{i}", ["context"])
+                else:
+                    async for _ in service.generate_response_stream(f"query {run_id}-{i}", ["context"]):
+                        pass
+            except Exception:
+                return
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(num_calls)))
+    return {
+        "failed": service.get_stats()["failures"],
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+    }
+
+
+async def run(args):
+    from app.services.llm import LLMService
+
+    behavior = MockBehavior()
+    app = create_app(behavior)
+    settings.OPENAI_BASE_URL = start_mock_server(app)
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "mock"
+    settings.LLM_MAX_CONCURRENCY = args.max_concurrency
+    logger.info(f"Mock OpenAI server at {settings.OPENAI_BASE_URL}, {args.calls} calls per run")
+    logger.info(
+        f"{'scenario':>14} {'call':>9} {'hedging':>8} {'failed':>6} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'retries':>8} {'hedges':>7}"
+    )
+
+    for scenario in args.scenarios:
+        app.state.behavior = SCENARIOS[scenario]
+        for kind in args.calls_kinds:
+            for hedging in ([False, True] if kind == "rewrite" else [False]):
+                settings.LLM_REWRITE_HEDGING_ENABLED = hedging
+                service = LLMService()
+                result = await run_calls(service, kind, args.calls, args.concurrency, f"{scenario}-{kind}-{hedging}")
+                stats = service.get_stats()
+                await service.aclose()
+                logger.info(
+                    f"{scenario:>14} {kind:>9} {str(hedging):>8} {result['failed']:>6} "
+                    f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+                    f"{stats['retries']:>8} {stats['hedges_launched']:>7}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exercise LLMService deadlines, retries, concurrency limits and hedging against a local mock server"
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--calls-kinds", nargs="+", choices=["rewrite", "generate", "stream"], default=["rewrite", "stream"])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-concurrency", type=int, default=settings.LLM_MAX_CONCURRENCY)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List
+import httpx
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERIES = [
+    "What is the main topic of the document?",
+    "Summarize the key findings.",
+    "What methodology was used?",
+    "List the limitations mentioned by the authors.",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[rank]
+
+
+def summarize(latencies_ms: List[float]) -> Dict:
+    return {
+        "count": len(latencies_ms),
+        "p50_ms": percentile(latencies_ms, 50),
+        "p99_ms": percentile(latencies_ms, 99),
+        "mean_ms": statistics.fmean(latencies_ms) if latencies_ms else 0.0,
+    }
+
+
+async def query_client(
+    client: httpx.AsyncClient,
+    base_url: str,
+    queries: List[str],
+    requests_per_client: int,
+    latencies_ms: List[float],
+    errors: List[str]
+):
+    for i in range(requests_per_client):
+        payload = {"query": queries[i % len(queries)], "top_k": 10, "use_reranker": True}
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"{base_url}/api/query", json=payload)
+            response.raise_for_status()
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            errors.append(str(e))
+
+
+async def health_prober(
+    client: httpx.AsyncClient,
+    base_url: str,
+    interval_s: float,
+    latencies_ms: List[float],
+    stop: asyncio.Event
+):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            response = await client.get(f"{base_url}/health")
+            response.raise_for_status()
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+        except Exception:
+            pass
+        await asyncio.sleep(interval_s)
+
+
+async def run_level(
+    base_url: str,
+    concurrency: int,
+    requests_per_client: int,
+    queries: List[str],
+    timeout_s: float
+) -> Dict:
+    query_latencies: List[float] = []
+    health_latencies: List[float] = []
+    errors: List[str] = []
+    stop = asyncio.Event()
+
+    limits = httpx.Limits(max_connections=concurrency + 1)
+    async with httpx.AsyncClient(timeout=timeout_s, limits=limits) as client:
+        prober = asyncio.create_task(health_prober(client, base_url, 0.1, health_latencies, stop))
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            query_client(client, base_url, queries, requests_per_client, query_latencies, errors)
+            for _ in range(concurrency)
+        ])
+        wall_time_s = time.perf_counter() - start
+        stop.set()
+        await prober
+
+    return {
+        "concurrency": concurrency,
+        "wall_time_s": wall_time_s,
+        "throughput_qps": len(query_latencies) / wall_time_s if wall_time_s > 0 else 0.0,
+        "errors": len(errors),
+        "query": summarize(query_latencies),
+        "health": summarize(health_latencies),
+    }
+
+
+def print_report(label: str, results: List[Dict], baseline: List[Dict] = None):
+    logger.info(f"\n=== {label} ===")
+    logger.info(
+        f"{'clients':>8} {'qps':>8} {'p50 ms':>10} {'p99 ms':>10} "
+        f"{'health p50':>11} {'health p99':>11} {'errors':>7}"
+    )
+    baseline_by_level = {r["concurrency"]: r for r in (baseline or [])}
+    for r in results:
+        logger.info(
+            f"{r['concurrency']:>8} {r['throughput_qps']:>8.2f} "
+            f"{r['query']['p50_ms']:>10.1f} {r['query']['p99_ms']:>10.1f} "
+            f"{r['health']['p50_ms']:>11.1f} {r['health']['p99_ms']:>11.1f} {r['errors']:>7}"
+        )
+        before = baseline_by_level.get(r["concurrency"])
+        if before:
+            logger.info(
+                f"{'before':>8} {before['throughput_qps']:>8.2f} "
+                f"{before['query']['p50_ms']:>10.1f} {before['query']['p99_ms']:>10.1f} "
+                f"{before['health']['p50_ms']:>11.1f} {before['health']['p99_ms']:>11.1f} {before['errors']:>7}"
+            )
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Load test /api/query at several concurrency levels and report p50/p99 latency"
+    )
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests-per-client", type=int, default=5)
+    parser.add_argument("--queries-file", type=Path, help="Text file with one query per line")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--label", default="current")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, help="JSON results from a previous run (e.g. before the change)")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        queries = [line.strip() for line in args.queries_file.read_text().splitlines() if line.strip()]
+
+    results = []
+    for concurrency in args.concurrency:
+        logger.info(f"Running {concurrency} concurrent clients x {args.requests_per_client} requests...")
+        results.append(
+            await run_level(args.base_url, concurrency, args.requests_per_client, queries, args.timeout)
+        )
+
+    baseline = json.loads(args.compare.read_text())["results"] if args.compare else None
+    print_report(args.label, results, baseline)
+
+    if args.output:
+        args.output.write_text(json.dumps({"label": args.label, "results": results}, indent=2))
+        logger.info(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
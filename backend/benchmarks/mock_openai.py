@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.requests import ClientDisconnect
+
+REWRITE_RESPONSE = json.dumps({"should_rewrite": False, "rewritten_queries": None})
+ANSWER_TOKENS = "According to the provided context [1], the answer is grounded in the indexed documents .".split(" ")
+
+
+@dataclass
+class MockBehavior:
+    latency_ms: float = 50.0
+    jitter_ms: float = 20.0
+    stall_rate: float = 0.0
+    stall_ms: float = 5000.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    token_interval_ms: float = 5.0
+
+
+def _completion(model: str, content: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+        ],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason: str = None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def create_app(behavior: MockBehavior) -> FastAPI:
+    app = FastAPI(title="Mock OpenAI")
+    app.state.behavior = behavior
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        try:
+            body = await request.json()
+        except ClientDisconnect:
+            return Response(status_code=499)
+        app.state.requests += 1
+        model = body.get("model", "mock")
+        behavior = app.state.behavior
+
+        roll = random.random()
+        if roll < behavior.rate_limit_rate:
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                status_code=429,
+                headers={"retry-after": "0.1"}
+            )
+        if roll < behavior.rate_limit_rate + behavior.error_rate:
+            return JSONResponse({"error": {"message": "Internal error", "type": "server_error"}}, status_code=500)
+
+        delay_ms = max(0.0, random.gauss(behavior.latency_ms, behavior.jitter_ms))
+        if random.random() < behavior.stall_rate:
+            delay_ms += behavior.stall_ms
+        await asyncio.sleep(delay_ms / 1000)
+
+        is_rewrite = "query optimization" in body["messages"][0]["content"]
+        if not body.get("stream"):
+            content = REWRITE_RESPONSE if is_rewrite else " ".join(ANSWER_TOKENS)
+            return JSONResponse(_completion(model, content))
+
+        async def stream():
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+            for i, token in enumerate(ANSWER_TOKENS):
+                await asyncio.sleep(behavior.token_interval_ms / 1000)
+                yield _chunk(completion_id, model, {"content": token if i == 0 else f" {token}"})
+            yield _chunk(completion_id, model, {}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible chat completions server for offline testing")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall-ms", type=float, default=5000.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    behavior = MockBehavior(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        stall_rate=args.stall_rate,
+        stall_ms=args.stall_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate
+    )
+    uvicorn.run(create_app(behavior), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import logging
+import time
+from app.core import settings
+from app.services.ocr import create_ocr_backend, ocr_service
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def run_sequential(pdf_path: str, num_pages: int) -> float:
+    start = time.perf_counter()
+    for _, image in ocr_service.iter_pdf_pages(pdf_path, 1, 1, num_pages):
+        ocr_service.extract_text_from_page(image)
+    return num_pages / (time.perf_counter() - start)
+
+
+def run_scheduled(pdf_path: str, num_pages: int) -> float:
+    start = time.perf_counter()
+    ocr_service.ocr_pdf_pages(pdf_path, list(range(1, num_pages + 1)))
+    return num_pages / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="OCR pages/s per backend: page-at-a-time vs the overlapped, batched scheduler"
+    )
+    parser.add_argument("pdf", help="PDF to rasterize and OCR")
+    parser.add_argument("--backends", nargs="+", default=["tesseract", "deepseek"])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--dpi", type=int, nargs="+", default=[settings.OCR_RENDER_DPI])
+    parser.add_argument("--max-pages", type=int, default=20)
+    args = parser.parse_args()
+
+    num_pages = min(args.max_pages, ocr_service.get_pdf_page_count(args.pdf))
+    logger.info(f"{num_pages} pages of {args.pdf}")
+    logger.info(f"{'backend':>10} {'dpi':>5} {'batch':>6} {'sequential p/s':>15} {'scheduled p/s':>14} {'speedup':>8}")
+
+    for backend in args.backends:
+        try:
+            ocr_service._backend = create_ocr_backend(backend)
+            ocr_service.ocr_pdf_pages(args.pdf, [1])
+        except Exception as e:
+            logger.info(f"{backend:>10} unavailable: {e}")
+            continue
+
+        for dpi in args.dpi:
+            settings.OCR_RENDER_DPI = dpi
+            sequential = run_sequential(args.pdf, num_pages)
+            for batch_size in args.batch_sizes:
+                settings.OCR_BATCH_SIZE = batch_size
+                scheduled = run_scheduled(args.pdf, num_pages)
+                logger.info(
+                    f"{backend:>10} {dpi:>5} {batch_size:>6} {sequential:>15.2f} {scheduled:>14.2f} "
+                    f"{scheduled / sequential:>7.2f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
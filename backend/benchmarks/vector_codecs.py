@@ -0,0 +1,85 @@
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from app.core import settings
+from app.services.vector_index import LocalVectorClient
+from benchmarks.vector_index_engines import ground_truth, iter_corpus, make_block, make_centers, recall
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logging.getLogger("app").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+def run_queries(collection, queries: np.ndarray, k: int):
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append(collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])["ids"][0])
+    return len(queries) / (time.perf_counter() - start), results
+
+
+def directory_bytes(path: Path, name: str) -> int:
+    return sum(file.stat().st_size for file in path.rglob(name))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Vector codecs: resident bytes per vector, QPS and recall@k with and without float32 rescoring"
+    )
+    parser.add_argument("--engines", nargs="+", default=["numpy", "hnsw"])
+    parser.add_argument("--codecs", nargs="+", default=["float32", "float16", "int8", "pq"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20000, 100000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=1024)
+    parser.add_argument("--noise", type=float, default=0.6)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--rescore-factors", type=int, nargs="+", default=[0, 4, 10])
+    args = parser.parse_args()
+
+    centers = make_centers(args.clusters, args.dimension)
+    logger.info(
+        f"{'engine':>7} {'codec':>8} {'chunks':>9} {'bytes/vec':>10} {'ratio':>6} {'build s':>8} "
+        f"{'rescore':>8} {'QPS':>8} {f'recall@{args.k}':>10}"
+    )
+    for size in args.sizes:
+        queries = make_block(centers, size + 10 ** 9, args.queries, args.noise)
+        truth, _ = ground_truth(centers, size, args.batch_size, args.noise, queries, args.k, np.zeros(0))
+
+        for engine in args.engines:
+            for codec in args.codecs:
+                path = Path(tempfile.mkdtemp(prefix=f"vector_codec_bench_{engine}_{codec}_"))
+                settings.VECTOR_INDEX_PATH = path
+                settings.VECTOR_INDEX_CODEC = codec
+                try:
+                    collection = LocalVectorClient(path, engine).get_or_create_collection("documents")
+                    start = time.perf_counter()
+                    for ids, vectors, metadatas, documents in iter_corpus(centers, size, args.batch_size, args.noise):
+                        collection.add(ids=ids, embeddings=vectors, metadatas=metadatas, documents=documents)
+                    collection.compact()
+                    build_seconds = time.perf_counter() - start
+
+                    if engine == "numpy":
+                        code_bytes = collection.get_stats()["code_bytes"] / size
+                    else:
+                        code_bytes = directory_bytes(path, f"hnsw-{collection._graph_codec_name}.faiss") / size
+                    for factor in args.rescore_factors:
+                        settings.VECTOR_INDEX_RESCORE_FACTOR = factor
+                        qps, results = run_queries(collection, queries, args.k)
+                        logger.info(
+                            f"{engine:>7} {codec:>8} {size:>9} {code_bytes:>10.1f} "
+                            f"{args.dimension * 4 / code_bytes:>6.1f} {build_seconds:>8.1f} "
+                            f"{factor:>8} {qps:>8.1f} {recall(results, truth, args.k):>10.3f}"
+                        )
+                    collection.close()
+                finally:
+                    shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
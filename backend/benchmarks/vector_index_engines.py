@@ -0,0 +1,145 @@
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from app.core import settings
+from app.services.vector_index import LocalVectorClient
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logging.getLogger("app").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
+
+CHUNKS_PER_DOCUMENT = 100
+
+
+def make_centers(clusters: int, dimension: int) -> np.ndarray:
+    return np.random.default_rng(0).standard_normal((clusters, dimension), dtype=np.float32)
+
+
+def make_block(centers: np.ndarray, start: int, size: int, noise: float) -> np.ndarray:
+    rng = np.random.default_rng(start + 1)
+    assignments = rng.integers(0, len(centers), size)
+    vectors = centers[assignments] + noise * rng.standard_normal((size, centers.shape[1]), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def iter_corpus(centers: np.ndarray, size: int, batch_size: int, noise: float):
+    for start in range(0, size, batch_size):
+        count = min(batch_size, size - start)
+        rows = range(start, start + count)
+        yield (
+            [f"chunk-{i}" for i in rows],
+            make_block(centers, start, count, noise),
+            [{"document_id": f"doc-{i // CHUNKS_PER_DOCUMENT}", "chunk_index": i % CHUNKS_PER_DOCUMENT} for i in rows],
+            [f"chunk {i}" for i in rows],
+        )
+
+
+def ground_truth(centers, size, batch_size, noise, queries, k, allowed_documents):
+    shape = (len(queries), 0)
+    truth = [np.zeros(shape, dtype=np.float32), np.zeros(shape, dtype=np.int64)]
+    filtered = [np.zeros(shape, dtype=np.float32), np.zeros(shape, dtype=np.int64)]
+    for start in range(0, size, batch_size):
+        count = min(batch_size, size - start)
+        rows = np.arange(start, start + count)
+        scores = queries @ make_block(centers, start, count, noise).T
+        for best, mask in ((truth, slice(None)), (filtered, np.isin(rows // CHUNKS_PER_DOCUMENT, allowed_documents))):
+            block_scores, block_rows = scores[:, mask], np.broadcast_to(rows[mask], scores[:, mask].shape)
+            merged_scores = np.concatenate([best[0], block_scores], axis=1)
+            merged_rows = np.concatenate([best[1], block_rows], axis=1)
+            keep = np.argsort(-merged_scores, axis=1)[:, :k]
+            best[0] = np.take_along_axis(merged_scores, keep, axis=1)
+            best[1] = np.take_along_axis(merged_rows, keep, axis=1)
+    return truth[1], filtered[1]
+
+
+def open_collection(engine: str, path: Path):
+    if engine == "chroma":
+        import chromadb
+
+        client = chromadb.PersistentClient(path=str(path))
+        collection = client.get_or_create_collection(name="documents", metadata={"hnsw:space": "cosine"})
+        return collection, client.get_max_batch_size()
+    return LocalVectorClient(path, engine).get_or_create_collection("documents"), 0
+
+
+def recall(results, truth: np.ndarray, k: int) -> float:
+    hits = [
+        len({int(chunk_id.split("-")[1]) for chunk_id in ids[:k]} & set(expected.tolist()))
+        for ids, expected in zip(results, truth)
+    ]
+    return sum(hits) / (len(truth) * k)
+
+
+def run_queries(collection, queries: np.ndarray, k: int, where=None):
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append(collection.query(query_embeddings=[query.tolist()], n_results=k, where=where)["ids"][0])
+    return len(queries) / (time.perf_counter() - start), results
+
+
+def directory_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Vector store engines: build rate, single-query QPS and recall@k against exact search"
+    )
+    parser.add_argument("--engines", nargs="+", default=["numpy", "hnsw", "chroma"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=1024)
+    parser.add_argument("--noise", type=float, default=0.6)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--filter-documents", type=float, default=0.01)
+    args = parser.parse_args()
+
+    centers = make_centers(args.clusters, args.dimension)
+    logger.info(
+        f"{'engine':>7} {'chunks':>9} {'build rows/s':>13} {'disk MB':>8} "
+        f"{'QPS':>8} {f'recall@{args.k}':>10} {'filtered QPS':>13} {'filtered recall':>16}"
+    )
+    for size in args.sizes:
+        queries = make_block(centers, size + 10 ** 9, args.queries, args.noise)
+        num_documents = max(1, size // CHUNKS_PER_DOCUMENT)
+        allowed_documents = np.random.default_rng(size).choice(
+            num_documents, max(1, int(num_documents * args.filter_documents)), replace=False
+        )
+        where = {"document_id": {"$in": [f"doc-{document}" for document in allowed_documents.tolist()]}}
+        truth, filtered_truth = ground_truth(
+            centers, size, args.batch_size, args.noise, queries, args.k, allowed_documents
+        )
+
+        for engine in args.engines:
+            path = Path(tempfile.mkdtemp(prefix=f"vector_index_bench_{engine}_"))
+            settings.VECTOR_INDEX_PATH = path
+            try:
+                collection, max_batch_size = open_collection(engine, path)
+                batch_size = min(args.batch_size, max_batch_size) if max_batch_size else args.batch_size
+                start = time.perf_counter()
+                for ids, vectors, metadatas, documents in iter_corpus(centers, size, batch_size, args.noise):
+                    collection.add(ids=ids, embeddings=vectors, metadatas=metadatas, documents=documents)
+                if engine != "chroma":
+                    collection.compact()
+                build_rate = size / (time.perf_counter() - start)
+
+                qps, results = run_queries(collection, queries, args.k)
+                filtered_qps, filtered_results = run_queries(collection, queries, args.k, where)
+                logger.info(
+                    f"{engine:>7} {size:>9} {build_rate:>13.0f} {directory_size(path) / 2 ** 20:>8.1f} "
+                    f"{qps:>8.1f} {recall(results, truth, args.k):>10.3f} "
+                    f"{filtered_qps:>13.1f} {recall(filtered_results, filtered_truth, args.k):>16.3f}"
+                )
+            finally:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
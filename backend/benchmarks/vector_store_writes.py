@@ -0,0 +1,87 @@
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from app.core import settings
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def make_documents(num_documents: int, chunks_per_document: int, dimension: int, run_id: str):
+    rng = np.random.default_rng(0)
+    for doc in range(num_documents):
+        embeddings = rng.standard_normal((chunks_per_document, dimension), dtype=np.float32)
+        ids = [f"{run_id}-{doc}-{i}" for i in range(chunks_per_document)]
+        texts = [f"chunk {i} of document {doc}" for i in range(chunks_per_document)]
+        metadatas = [{"document_id": f"{run_id}-{doc}", "chunk_index": i} for i in range(chunks_per_document)]
+        yield texts, embeddings, metadatas, ids
+
+
+def run_per_document_add(store, documents) -> float:
+    rows = 0
+    start = time.perf_counter()
+    for texts, embeddings, metadatas, ids in documents:
+        store.collection.add(ids=ids, embeddings=embeddings.tolist(), metadatas=metadatas, documents=texts)
+        rows += len(ids)
+    return rows / (time.perf_counter() - start)
+
+
+def run_coalesced_upsert(store, documents, flush_rows: int) -> float:
+    rows = 0
+    pending = []
+    start = time.perf_counter()
+
+    def flush():
+        store.upsert_documents(
+            chunk_texts=[text for doc in pending for text in doc[0]],
+            embeddings=np.vstack([doc[1] for doc in pending]),
+            metadatas=[metadata for doc in pending for metadata in doc[2]],
+            ids=[chunk_id for doc in pending for chunk_id in doc[3]]
+        )
+        pending.clear()
+
+    for document in documents:
+        pending.append(document)
+        rows += len(document[3])
+        if sum(len(doc[3]) for doc in pending) >= flush_rows:
+            flush()
+    if pending:
+        flush()
+    return rows / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Vector store rows/s: per-document add of Python lists vs coalesced, batched numpy upserts"
+    )
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--chunks-per-document", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--flush-rows", type=int, default=settings.INGESTION_FLUSH_CHUNKS)
+    args = parser.parse_args()
+
+    settings.DATABASE_PATH = Path(tempfile.mkdtemp(prefix="vector_store_bench_"))
+    from app.services.vector_store import vector_store_service as store
+
+    logger.info(f"Chroma at {settings.DATABASE_PATH}, write batch size {store.write_batch_size}")
+    logger.info(f"{'chunks/doc':>10} {'rows':>8} {'add rows/s':>11} {'upsert rows/s':>14} {'speedup':>8}")
+    for chunks_per_document in args.chunks_per_document:
+        rows = args.documents * chunks_per_document
+        baseline = run_per_document_add(
+            store, make_documents(args.documents, chunks_per_document, args.dimension, f"a{chunks_per_document}")
+        )
+        coalesced = run_coalesced_upsert(
+            store,
+            make_documents(args.documents, chunks_per_document, args.dimension, f"u{chunks_per_document}"),
+            args.flush_rows
+        )
+        logger.info(
+            f"{chunks_per_document:>10} {rows:>8} {baseline:>11.0f} {coalesced:>14.0f} {coalesced / baseline:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
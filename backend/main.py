@@ -1,12 +1,35 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core import settings
+from app.core.concurrency import shutdown_model_executor
 from app.api import upload, query
+from app.services import ingestion_service, lexical_index_service, llm_service, vector_store_service
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.HYBRID_SEARCH_ENABLED:
+        try:
+            await asyncio.to_thread(lexical_index_service.ensure_built, vector_store_service)
+        except Exception as e:
+            logger.error(f"Failed to build lexical index, hybrid search will return dense results only: {e}")
+    await ingestion_service.start()
+    yield
+    await ingestion_service.stop()
+    await llm_service.aclose()
+    shutdown_model_executor()
+
 
 app = FastAPI(
     title=settings.API_TITLE,
     description="RAG Application with DeepSeek OCR and Granite Embeddings",
-    version=settings.API_VERSION
+    version=settings.API_VERSION,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -66,6 +66,8 @@ export const FileUpload: React.FC<FileUploadProps> = ({
       'image/*': ['.png', '.jpg', '.jpeg'],
       'application/vnd.openxmlformats-officedocument.wordprocessingml.document': ['.docx'],
       'application/vnd.openxmlformats-officedocument.presentationml.presentation': ['.pptx'],
+      'text/plain': ['.txt'],
+      'text/markdown': ['.md'],
     },
   });
 
@@ -106,7 +108,7 @@ export const FileUpload: React.FC<FileUploadProps> = ({
         </p>
 
         <p className="text-sm text-gray-500">
-          Supported: PDF, Images (PNG, JPG), DOCX, PPTX
+          Supported: PDF, Images (PNG, JPG), DOCX, PPTX, TXT, MD
         </p>
       </div>
 